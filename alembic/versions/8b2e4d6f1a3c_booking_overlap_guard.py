@@ -0,0 +1,32 @@
+"""Booking overlap guard
+
+Revision ID: 8b2e4d6f1a3c
+Revises: 3f1a9c2d7e10
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a3c'
+down_revision: Union[str, Sequence[str], None] = '3f1a9c2d7e10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from app.models.initialization import BOOKING_GUARD_DDL
+    for statement in BOOKING_GUARD_DDL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS bookings_no_overlap_update")
+    op.execute("DROP TRIGGER IF EXISTS bookings_no_overlap_insert")
+    op.drop_index('ix_bookings_room_date', table_name='bookings')
@@ -0,0 +1,30 @@
+"""Booking date indexes
+
+Revision ID: c4d8e2a6b9f1
+Revises: 8b2e4d6f1a3c
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e2a6b9f1'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d6f1a3c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_bookings_date', 'bookings', ['date'], unique=False)
+    op.create_index('ix_bookings_user_date', 'bookings', ['user_id', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bookings_user_date', table_name='bookings')
+    op.drop_index('ix_bookings_date', table_name='bookings')
@@ -0,0 +1,46 @@
+"""Bookings archive table
+
+Revision ID: e7a3b5c9d2f4
+Revises: c4d8e2a6b9f1
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3b5c9d2f4'
+down_revision: Union[str, Sequence[str], None] = 'c4d8e2a6b9f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('bookings_archive',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('room_id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('start_time', sa.String(length=5), nullable=False),
+    sa.Column('end_time', sa.String(length=5), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('participants', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_bookings_archive_room_date', 'bookings_archive', ['room_id', 'date'], unique=False)
+    op.create_index('ix_bookings_archive_user_date', 'bookings_archive', ['user_id', 'date'], unique=False)
+    op.create_index('ix_bookings_archive_date', 'bookings_archive', ['date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bookings_archive_date', table_name='bookings_archive')
+    op.drop_index('ix_bookings_archive_user_date', table_name='bookings_archive')
+    op.drop_index('ix_bookings_archive_room_date', table_name='bookings_archive')
+    op.drop_table('bookings_archive')
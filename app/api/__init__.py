@@ -4,6 +4,8 @@ from .bookings import bookings_router
 from .admin import admin_router
 from .roles import roles_router
 from .debug import debug_router
+from .scheduling import scheduling_router
+from .calendar import calendar_router
 
 __all__ = [
     'users_router', 
@@ -11,5 +13,7 @@ __all__ = [
     'bookings_router', 
     'admin_router', 
     'roles_router',
-    'debug_router'
+    'debug_router',
+    'scheduling_router',
+    'calendar_router'
 ]
\ No newline at end of file
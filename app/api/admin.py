@@ -1,13 +1,23 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload
 from app.models import User, Room, Booking, Role, async_session
+from app.services.import_service import ImportService, IMPORT_CHUNK_SIZE
+from app.services.archive_service import ArchiveService, ARCHIVE_CHUNK_SIZE
+from app.services.deletion_service import DELETE_CHUNK_SIZE
+from app.services.user_service import UserService
+from app.exceptions.user_exceptions import UserNotFound
+from app.utils.jobs import background_jobs
+import io
+import traceback
 
 admin_router = APIRouter()
 
 @admin_router.get("/users")
 async def get_all_users():
     async with async_session() as session:
-        result = await session.execute(select(User))
+        result = await session.execute(select(User).options(selectinload(User.role)))
         users = result.scalars().all()
         return [user.to_dict() for user in users]
 
@@ -30,6 +40,45 @@ async def update_user_role(user_id: str, data: dict):
         await session.commit()
         return user.to_dict()
 
+@admin_router.delete("/users/{user_id}")
+async def delete_user(
+    user_id: str,
+    background: bool = Query(False),
+    chunk_size: int = Query(DELETE_CHUNK_SIZE, ge=100, le=50000)
+):
+    """Удаление пользователя с бронированиями; background=true - фоновая задача (202, прогресс в /api/admin/jobs)"""
+    try:
+        async with async_session() as session:
+            if background:
+                await UserService.get_user_by_id(session, user_id)
+                
+                async def run(progress):
+                    async with async_session() as job_session:
+                        return await UserService.delete_user(job_session, user_id, chunk_size, progress)
+                
+                return JSONResponse(status_code=202, content=background_jobs.submit("delete_user", user_id, run))
+            stats = await UserService.delete_user(session, user_id, chunk_size)
+        print(f"🗑️ Пользователь {user_id} удален, бронирований: {stats['bookings']}")
+        return {"status": "User deleted", **stats}
+    except UserNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        print(f"❌ Ошибка удаления пользователя: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+@admin_router.get("/jobs")
+async def list_jobs():
+    """Фоновые задачи этого процесса (последние JOBS_HISTORY)"""
+    return background_jobs.list()
+
+@admin_router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = background_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @admin_router.get("/stats")
 async def get_stats():
     async with async_session() as session:
@@ -49,4 +98,45 @@ async def get_stats():
             "totalUsers": users_count or 0,
             "totalRooms": rooms_count or 0,
             "totalBookings": bookings_count or 0
-        }
\ No newline at end of file
+        }
+
+@admin_router.post("/import")
+async def import_bookings(
+    file: UploadFile = File(...),
+    format: str = Query(None, pattern="^(csv|ics)$"),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=100, le=50000),
+    dry_run: bool = False
+):
+    """Массовый импорт бронирований из CSV или ICS; файл читается построчно в потоке, без загрузки
+    целиком. dry_run держит принятые интервалы в памяти (по паре комната-дата)"""
+    try:
+        file_format = ImportService.detect_format(file.filename, format)
+        lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        async with async_session() as session:
+            stats = await ImportService.import_rows(
+                session, ImportService.parse(lines, file_format), chunk_size=chunk_size, dry_run=dry_run
+            )
+        print(f"📥 Импорт {file.filename}: {stats['imported']}/{stats['read']} строк, {stats['rowsPerSecond']} строк/с")
+        return stats
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Ошибка импорта: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+@admin_router.post("/archive")
+async def archive_bookings(
+    horizon_days: int = Query(None, ge=1),
+    chunk_size: int = Query(ARCHIVE_CHUNK_SIZE, ge=100, le=50000)
+):
+    """Перенос прошедших бронирований старше горизонта в bookings_archive"""
+    try:
+        async with async_session() as session:
+            stats = await ArchiveService.archive_old_bookings(session, horizon_days, chunk_size)
+        print(f"🗄️ Архивировано бронирований: {stats['moved']} (до {stats['cutoff']})")
+        return stats
+    except Exception as e:
+        print(f"❌ Ошибка архивации: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
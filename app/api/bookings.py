@@ -1,28 +1,38 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from datetime import date, datetime
 import traceback
-import uuid
 
 from app.models import get_db, Booking, User, Room
-from app.services.booking_service import BookingService
-from app.schemes.booking_schema import BookingCreateSchema
+from app.services.booking_service import BookingService, _time
+from app.services.archive_service import ArchiveService
+from app.schemes.booking_schema import BookingCreateSchema, BookingUpdateSchema, BookingBatchUpdateSchema
 from app.exceptions.booking_exceptions import BookingNotFound, TimeSlotNotAvailable, InvalidBookingData
+from app.repositories.booking_repository import BookingRepository
+from app.utils.locks import booking_locks
+from app.utils.ids import new_id
+from app.utils.query_budget import query_budget
 
 bookings_router = APIRouter()
 
 @bookings_router.get("/")
+@query_budget(5)
 async def get_all_bookings(
     db: AsyncSession = Depends(get_db),
     room_id: str = Query(None),
     user_id: str = Query(None),
-    booking_date: date = Query(None)
+    booking_date: date = Query(None),
+    date_from: date = Query(None),
+    date_to: date = Query(None)
 ):
     try:
         print(f"📅 Запрос бронирований: room_id={room_id}, user_id={user_id}, date={booking_date}")
         
-        query = select(Booking)
+        # Владельцы подгружаются одним запросом на всю выборку (to_dict использует только user)
+        query = select(Booking).options(selectinload(Booking.user))
         
         filters = []
         if room_id:
@@ -35,6 +45,10 @@ async def get_all_bookings(
                 filters.append(Booking.date == date_obj)
             else:
                 filters.append(Booking.date == booking_date)
+        if date_from:
+            filters.append(Booking.date >= date_from)
+        if date_to:
+            filters.append(Booking.date <= date_to)
         
         if filters:
             query = query.where(and_(*filters))
@@ -42,11 +56,15 @@ async def get_all_bookings(
         result = await db.execute(query)
         bookings = result.scalars().all()
         
-        # Загружаем связанные данные
-        bookings_list = []
-        for booking in bookings:
-            await db.refresh(booking, ['user', 'room'])
-            bookings_list.append(booking.to_dict())
+        bookings_list = [booking.to_dict() for booking in bookings]
+        
+        # Архив читается, только если диапазон уходит в прошлое дальше горизонта архивации
+        range_from = booking_date or date_from
+        if await ArchiveService.reaches_archive(db, range_from):
+            archived = await ArchiveService.get_archived_bookings(
+                db, room_id, user_id, range_from, booking_date or date_to
+            )
+            bookings_list = [booking.to_dict() for booking in archived] + bookings_list
         
         print(f"✅ Найдено {len(bookings_list)} бронирований")
         return bookings_list
@@ -92,36 +110,54 @@ async def create_booking(booking_data: BookingCreateSchema, db: AsyncSession = D
         except ValueError:
             raise HTTPException(status_code=400, detail="Неверный формат даты. Используйте YYYY-MM-DD")
         
-        # Проверяем доступность времени
-        conflicting = await db.execute(
-            select(Booking).where(
-                and_(
-                    Booking.room_id == room_id,
-                    Booking.date == booking_date,
-                    or_(
-                        and_(Booking.start_time < end_time, Booking.end_time > start_time)
+        # Время хранится как "HH:MM" и сравнивается строками (в том числе триггером в БД),
+        # поэтому "9:00" приводится к "09:00" до проверки занятости
+        try:
+            start_time, end_time = _time(start_time), _time(end_time)
+        except InvalidBookingData as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if end_time <= start_time:
+            raise HTTPException(status_code=400, detail="Время окончания должно быть позже времени начала")
+        
+        # Проверка и вставка под блокировкой комнаты на дату: параллельные запросы
+        # к одной комнате выполняются по очереди, к разным - не мешают друг другу
+        async with booking_locks.lock(room_id, booking_date):
+            # Проверяем доступность времени
+            conflicting = await db.execute(
+                select(Booking.id).where(
+                    and_(
+                        Booking.room_id == room_id,
+                        Booking.date == booking_date,
+                        Booking.start_time < end_time,
+                        Booking.end_time > start_time
                     )
-                )
+                ).limit(1)
             )
-        )
-        
-        if conflicting.scalar():
-            raise HTTPException(status_code=400, detail="Это время уже занято")
-        
-        # Создаем бронирование
-        new_booking = Booking(
-            id=f"booking_{uuid.uuid4().hex[:8]}",
-            room_id=room_id,
-            user_id=user_id,
-            date=booking_date,
-            start_time=start_time,
-            end_time=end_time,
-            title=title,
-            participants=",".join(participants) if participants else ""
-        )
-        
-        db.add(new_booking)
-        await db.commit()
+            
+            if conflicting.scalar():
+                raise HTTPException(status_code=400, detail="Это время уже занято")
+            
+            # Создаем бронирование
+            new_booking = Booking(
+                id=new_id("booking"),
+                room_id=room_id,
+                user_id=user_id,
+                date=booking_date,
+                start_time=start_time,
+                end_time=end_time,
+                title=title,
+                participants=",".join(participants) if participants else ""
+            )
+            
+            db.add(new_booking)
+            try:
+                await db.commit()
+            except IntegrityError as e:
+                # Другой процесс успел занять слот - сработал триггер в БД
+                await db.rollback()
+                if BookingRepository.is_overlap_error(e):
+                    raise HTTPException(status_code=400, detail="Это время уже занято")
+                raise
         await db.refresh(new_booking)
         
         # Загружаем связи
@@ -137,23 +173,58 @@ async def create_booking(booking_data: BookingCreateSchema, db: AsyncSession = D
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
+@bookings_router.patch("/")
+async def move_bookings(data: BookingBatchUpdateSchema, db: AsyncSession = Depends(get_db)):
+    """Пакетный перенос бронирований (drag-and-drop): все изменения в одной транзакции"""
+    try:
+        bookings = await BookingService.update_bookings(
+            db, [(item.id, BookingUpdateSchema(**item.model_dump(exclude={"id"}))) for item in data.bookings]
+        )
+        print(f"✅ Перенесено бронирований: {len(bookings)}")
+        return {"updated": [booking.to_dict() for booking in bookings]}
+    except BookingNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (InvalidBookingData, TimeSlotNotAvailable) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Ошибка при переносе бронирований: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+@bookings_router.patch("/{booking_id}")
+async def update_booking(booking_id: str, data: BookingUpdateSchema, db: AsyncSession = Depends(get_db)):
+    """Перенос, изменение длительности или названия бронирования"""
+    try:
+        print(f"✏️ Изменение бронирования {booking_id}: {data}")
+        booking = await BookingService.update_booking(db, booking_id, data)
+        return booking.to_dict()
+    except BookingNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (InvalidBookingData, TimeSlotNotAvailable) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Ошибка при изменении бронирования: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
 @bookings_router.get("/{booking_id}")
+@query_budget(3)
 async def get_booking(booking_id: str, db: AsyncSession = Depends(get_db)):
     try:
         print(f"🔍 Получение бронирования: {booking_id}")
         
         # Используем SQLAlchemy для получения бронирования
+        # Связанные данные загружаются вместе с бронированием, без повторного SELECT в refresh
         result = await db.execute(
-            select(Booking).where(Booking.id == booking_id)
+            select(Booking)
+            .where(Booking.id == booking_id)
+            .options(selectinload(Booking.user), selectinload(Booking.room))
         )
         booking = result.scalar()
         
         if not booking:
             raise HTTPException(status_code=404, detail="Бронирование не найдено")
         
-        # Загружаем связанные данные
-        await db.refresh(booking, ['user', 'room'])
-        
         print(f"✅ Бронирование найдено: {booking.title}")
         return booking.to_dict()
         
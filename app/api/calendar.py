@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import get_db
+from app.services.calendar_service import CalendarService
+
+calendar_router = APIRouter()
+
+ICS_MEDIA_TYPE = "text/calendar; charset=utf-8"
+
+async def _feed_response(request: Request, key, make_feed):
+    """304 по ETag, готовое тело из кэша или потоковая генерация с записью в кэш"""
+    etag = CalendarService.etag(key)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    cached = CalendarService.get_cached(key)
+    if cached is not None:
+        return Response(content=cached, media_type=ICS_MEDIA_TYPE, headers={**headers, "X-Cache": "HIT"})
+
+    feed = await make_feed()
+    return StreamingResponse(feed, media_type=ICS_MEDIA_TYPE, headers={**headers, "X-Cache": "MISS"})
+
+@calendar_router.get("/rooms/{room_id}.ics")
+async def room_calendar(room_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """iCalendar-лента бронирований комнаты"""
+    key = CalendarService.room_feed_key(room_id)
+
+    async def make_feed():
+        feed = await CalendarService.room_feed(db, room_id, key)
+        if feed is None:
+            raise HTTPException(status_code=404, detail="Комната не найдена")
+        return feed
+
+    return await _feed_response(request, key, make_feed)
+
+@calendar_router.get("/users/{user_id}.ics")
+async def user_calendar(user_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """iCalendar-лента пользователя: его бронирования и встречи, где он участник"""
+    key = await CalendarService.user_feed_key(db, user_id)
+    if key is None:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    async def make_feed():
+        return CalendarService.user_feed(user_id, key)
+
+    return await _feed_response(request, key, make_feed)
@@ -1,149 +1,285 @@
-from fastapi import APIRouter, HTTPException
-from sqlalchemy import select, text
+from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi.responses import Response, PlainTextResponse, StreamingResponse
+from sqlalchemy import select, text, func, case, or_
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models import async_session, User, Room, Booking, Role
-import bcrypt
+from app.models import async_session, User, Room, Booking, Role, BookingArchive
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Optional
+import asyncio
+import json
+import os
 
 debug_router = APIRouter()
 
+# Отладочные выгрузки не читают таблицы целиком: по умолчанию страница из
+# DEBUG_DEFAULT_LIMIT строк (не больше DEBUG_MAX_LIMIT), полная выгрузка - только
+# потоком (stream=true, NDJSON). Сводные цифры считаются в SQL.
+DEBUG_DEFAULT_LIMIT = int(os.getenv("DEBUG_DEFAULT_LIMIT", "100"))
+DEBUG_MAX_LIMIT = int(os.getenv("DEBUG_MAX_LIMIT", "1000"))
+DEBUG_STREAM_BATCH = int(os.getenv("DEBUG_STREAM_BATCH", "500"))
+# bcrypt - сотни миллисекунд CPU на пароль: проверка идет в отдельном пуле потоков
+# и не больше чем для DEBUG_PASSWORD_CHECK_MAX пользователей за запрос
+PASSWORD_CHECK_MAX = int(os.getenv("DEBUG_PASSWORD_CHECK_MAX", "50"))
+PASSWORD_CHECK_WORKERS = int(os.getenv("DEBUG_PASSWORD_CHECK_WORKERS", "2"))
+
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_CHECK_WORKERS, thread_name_prefix="debug-bcrypt")
+
+def _rows(query, order_by, limit: Optional[int], offset: int, sample: Optional[float], stream: bool):
+    """Страница строк; sample - случайная доля строк (0..1], отбор на стороне SQLite"""
+    if sample is not None:
+        query = query.where(func.abs(func.random() % 1000000) < int(sample * 1000000))
+    if not stream:
+        limit = min(limit or DEBUG_DEFAULT_LIMIT, DEBUG_MAX_LIMIT)
+    query = query.order_by(*order_by).offset(offset)
+    return query.limit(limit) if limit else query
+
+def _ndjson(query, serialize):
+    """Потоковая выгрузка: строка JSON на запись, курсор читается пачками"""
+    async def lines():
+        async with async_session() as session:
+            result = await session.stream(query.execution_options(yield_per=DEBUG_STREAM_BATCH))
+            async for partition in result.partitions():
+                yield "".join(json.dumps(serialize(row), ensure_ascii=False) + "\n" for row in partition).encode("utf-8")
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def _user_row(row):
+    return {
+        "id": row.id,
+        "name": f"{row.first_name} {row.last_name}",
+        "email": row.email,
+        "password_length": row.password_length or 0,
+        "password_preview": row.password_preview + "..." if row.password_preview else "none",
+        "role_id": row.role_id
+    }
+
+def _room_row(row):
+    return {
+        "id": row.id,
+        "name": row.name,
+        "capacity": row.capacity,
+        "price": row.price,
+        "amenities": row.amenities,
+        "created_at": row.created_at.isoformat() if row.created_at else None
+    }
+
+def _booking_row(row):
+    return {
+        "id": row.id,
+        "room_id": row.room_id,
+        "user_id": row.user_id,
+        "date": row.date.isoformat() if row.date else None,
+        "start_time": row.start_time,
+        "end_time": row.end_time,
+        "title": row.title,
+        "participants": row.participants,
+        "created_at": row.created_at.isoformat() if row.created_at else None
+    }
+
 @debug_router.get("/users")
-async def debug_users():
+async def debug_users(limit: Optional[int] = Query(None, ge=1), offset: int = Query(0, ge=0),
+                      sample: Optional[float] = Query(None, gt=0, le=1), stream: bool = False):
     """Отладочный endpoint для проверки пользователей"""
+    query = _rows(
+        select(User.id, User.first_name, User.last_name, User.email, User.role_id,
+               func.length(User.password).label("password_length"),
+               func.substr(User.password, 1, 30).label("password_preview")),
+        (User.id,), limit, offset, sample, stream
+    )
+    if stream:
+        return _ndjson(query, _user_row)
+
     async with async_session() as session:
         try:
             # Проверяем таблицы
             result = await session.execute(text("SELECT name FROM sqlite_master WHERE type='table'"))
             tables = result.fetchall()
             
-            # Проверяем пользователей
-            users_result = await session.execute(select(User))
-            users = users_result.scalars().all()
+            # Сводка по всем пользователям - агрегатами в SQL
+            total, hashed, empty = (await session.execute(select(
+                func.count(),
+                func.coalesce(func.sum(case((User.password.like("$2%"), 1), else_=0)), 0),
+                func.coalesce(func.sum(case((or_(User.password.is_(None), User.password == ""), 1), else_=0)), 0)
+            ))).one()
+            by_role = (await session.execute(
+                select(User.role_id, func.count()).group_by(User.role_id)
+            )).all()
             
             # Проверяем роли
-            roles_result = await session.execute(select(Role))
-            roles = roles_result.scalars().all()
+            roles_result = await session.execute(select(Role.id, Role.name))
+            roles = roles_result.all()
+            
+            users = (await session.execute(query)).all()
             
             return {
                 "tables": [t[0] for t in tables],
-                "users_count": len(users),
-                "users": [
-                    {
-                        "id": u.id,
-                        "name": f"{u.first_name} {u.last_name}",
-                        "email": u.email,
-                        "password_length": len(u.password) if u.password else 0,
-                        "password_preview": u.password[:30] + "..." if u.password else "none",
-                        "role_id": u.role_id
-                    } for u in users
-                ],
+                "users_count": total,
+                "stats": {
+                    "hashed_passwords": hashed,
+                    "empty_passwords": empty,
+                    "by_role": {str(role_id): count for role_id, count in by_role}
+                },
+                "offset": offset,
+                "returned": len(users),
+                "users": [_user_row(u) for u in users],
                 "roles": [{"id": r.id, "name": r.name} for r in roles]
             }
         except Exception as e:
             return {"error": str(e)}
 
 @debug_router.get("/rooms")
-async def debug_rooms():
+async def debug_rooms(limit: Optional[int] = Query(None, ge=1), offset: int = Query(0, ge=0),
+                      sample: Optional[float] = Query(None, gt=0, le=1), stream: bool = False):
     """Отладочный endpoint для проверки комнат"""
+    query = _rows(
+        select(Room.id, Room.name, Room.capacity, Room.price, Room.amenities, Room.created_at),
+        (Room.id,), limit, offset, sample, stream
+    )
+    if stream:
+        return _ndjson(query, _room_row)
+
     async with async_session() as session:
         try:
-            result = await session.execute(select(Room))
-            rooms = result.scalars().all()
+            total, capacity, max_capacity, avg_price = (await session.execute(select(
+                func.count(), func.coalesce(func.sum(Room.capacity), 0),
+                func.max(Room.capacity), func.avg(Room.price)
+            ))).one()
+            rooms = (await session.execute(query)).all()
             
             return {
-                "rooms_count": len(rooms),
-                "rooms": [
-                    {
-                        "id": r.id,
-                        "name": r.name,
-                        "capacity": r.capacity,
-                        "price": r.price,
-                        "amenities": r.amenities,
-                        "created_at": r.created_at.isoformat() if r.created_at else None
-                    } for r in rooms
-                ]
+                "rooms_count": total,
+                "stats": {
+                    "total_capacity": capacity,
+                    "max_capacity": max_capacity,
+                    "avg_price": round(avg_price, 2) if avg_price is not None else None
+                },
+                "offset": offset,
+                "returned": len(rooms),
+                "rooms": [_room_row(r) for r in rooms]
             }
         except Exception as e:
             return {"error": str(e)}
 
 @debug_router.get("/bookings")
-async def debug_bookings():
+async def debug_bookings(limit: Optional[int] = Query(None, ge=1), offset: int = Query(0, ge=0),
+                         sample: Optional[float] = Query(None, gt=0, le=1), stream: bool = False):
     """Отладочный endpoint для проверки бронирований"""
+    query = _rows(
+        select(Booking.id, Booking.room_id, Booking.user_id, Booking.date, Booking.start_time,
+               Booking.end_time, Booking.title, Booking.participants, Booking.created_at),
+        (Booking.date.desc(), Booking.start_time), limit, offset, sample, stream
+    )
+    if stream:
+        return _ndjson(query, _booking_row)
+
     async with async_session() as session:
         try:
-            result = await session.execute(select(Booking))
-            bookings = result.scalars().all()
+            total, first_date, last_date, upcoming = (await session.execute(select(
+                func.count(), func.min(Booking.date), func.max(Booking.date),
+                func.coalesce(func.sum(case((Booking.date >= date.today(), 1), else_=0)), 0)
+            ))).one()
+            archived = await session.scalar(select(func.count()).select_from(BookingArchive))
+            busiest = (await session.execute(
+                select(Booking.room_id, func.count().label("bookings"))
+                .group_by(Booking.room_id)
+                .order_by(func.count().desc())
+                .limit(10)
+            )).all()
+            bookings = (await session.execute(query)).all()
             
             return {
-                "bookings_count": len(bookings),
-                "bookings": [
-                    {
-                        "id": b.id,
-                        "room_id": b.room_id,
-                        "user_id": b.user_id,
-                        "date": b.date.isoformat() if b.date else None,
-                        "start_time": b.start_time,
-                        "end_time": b.end_time,
-                        "title": b.title,
-                        "participants": b.participants,
-                        "created_at": b.created_at.isoformat() if b.created_at else None
-                    } for b in bookings
-                ]
+                "bookings_count": total,
+                "stats": {
+                    "first_date": first_date.isoformat() if first_date else None,
+                    "last_date": last_date.isoformat() if last_date else None,
+                    "upcoming": upcoming,
+                    "archived": archived,
+                    "by_room": {room_id: count for room_id, count in busiest}
+                },
+                "offset": offset,
+                "returned": len(bookings),
+                "bookings": [_booking_row(b) for b in bookings]
             }
         except Exception as e:
             return {"error": str(e)}
 
+def _check_password(password: str):
+    """Тип хранения пароля и совпадение с 'password123' (выполняется в пуле потоков)"""
+    import bcrypt
+    password_correct = False
+    password_type = "unknown"
+    
+    if password:
+        # Пробуем проверить как bcrypt хеш
+        try:
+            if bcrypt.checkpw(b"password123", password.encode('utf-8')):
+                password_correct = True
+                password_type = "bcrypt"
+        except:
+            pass
+        
+        # Пробуем как plain text
+        if password == "password123":
+            password_correct = True
+            password_type = "plain"
+        
+        # Пробуем как хешированный пароль
+        if password.startswith("$2b$"):
+            password_type = "bcrypt_hash"
+    
+    return password_type, password_correct
+
 @debug_router.get("/passwords")
-async def debug_passwords():
-    """Отладочный endpoint для проверки паролей"""
+async def debug_passwords(limit: int = Query(20, ge=1), offset: int = Query(0, ge=0)):
+    """Отладочный endpoint для проверки паролей (не больше DEBUG_PASSWORD_CHECK_MAX за запрос)"""
+    limit = min(limit, PASSWORD_CHECK_MAX)
     async with async_session() as session:
         try:
-            result = await session.execute(select(User))
-            users = result.scalars().all()
-            
-            debug_info = []
-            for user in users:
-                # Проверяем текущий пароль
-                password_correct = False
-                password_type = "unknown"
-                
-                if user.password:
-                    # Пробуем проверить как bcrypt хеш
-                    try:
-                        if bcrypt.checkpw(b"password123", user.password.encode('utf-8')):
-                            password_correct = True
-                            password_type = "bcrypt"
-                    except:
-                        pass
-                    
-                    # Пробуем как plain text
-                    if user.password == "password123":
-                        password_correct = True
-                        password_type = "plain"
-                    
-                    # Пробуем как хешированный пароль
-                    if user.password.startswith("$2b$"):
-                        password_type = "bcrypt_hash"
-                
-                debug_info.append({
-                    "id": user.id,
-                    "name": f"{user.first_name} {user.last_name}",
-                    "email": user.email,
-                    "password_exists": bool(user.password),
-                    "password_length": len(user.password) if user.password else 0,
-                    "password_preview": user.password[:20] + "..." if user.password else "none",
-                    "password_type": password_type,
-                    "password_correct_for_'password123'": password_correct
-                })
-            
-            return {
-                "users": debug_info
-            }
+            total, hashed, plain = (await session.execute(select(
+                func.count(),
+                func.coalesce(func.sum(case((User.password.like("$2b$%"), 1), else_=0)), 0),
+                func.coalesce(func.sum(case((User.password == "password123", 1), else_=0)), 0)
+            ))).one()
+            result = await session.execute(
+                select(User.id, User.first_name, User.last_name, User.email, User.password)
+                .order_by(User.id).offset(offset).limit(limit)
+            )
+            users = result.all()
         except Exception as e:
             return {"error": str(e)}
+    
+    # Соединение с БД уже возвращено в пул, bcrypt не держит цикл событий
+    loop = asyncio.get_running_loop()
+    checks = await asyncio.gather(*(
+        loop.run_in_executor(_password_executor, _check_password, user.password) for user in users
+    ))
+    
+    debug_info = []
+    for user, (password_type, password_correct) in zip(users, checks):
+        debug_info.append({
+            "id": user.id,
+            "name": f"{user.first_name} {user.last_name}",
+            "email": user.email,
+            "password_exists": bool(user.password),
+            "password_length": len(user.password) if user.password else 0,
+            "password_preview": user.password[:20] + "..." if user.password else "none",
+            "password_type": password_type,
+            "password_correct_for_'password123'": password_correct
+        })
+    
+    return {
+        "total_users": total,
+        "bcrypt_hashed": hashed,
+        "plain_password123": plain,
+        "offset": offset,
+        "checked": len(debug_info),
+        "users": debug_info
+    }
 
 @debug_router.post("/fix-passwords")
 async def fix_passwords():
     """Исправление паролей (хеширование plain text паролей)"""
+    import bcrypt
     async with async_session() as session:
         try:
             result = await session.execute(select(User))
@@ -184,6 +320,7 @@ async def reset_demo_data():
         try:
             # Удаляем все данные (осторожно!)
             await session.execute(text("DELETE FROM bookings"))
+            await session.execute(text("DELETE FROM bookings_archive"))
             await session.execute(text("DELETE FROM users"))
             await session.execute(text("DELETE FROM rooms"))
             await session.execute(text("DELETE FROM role"))
@@ -195,7 +332,22 @@ async def reset_demo_data():
             
             # Импортируем функцию инициализации
             from app.models import init_db
-            await init_db()
+            await init_db(force=True)
+            
+            from app.services.user_service import UserService
+            from app.services.room_service import RoomService
+            from app.services.calendar_service import invalidate_all
+            from app.services.archive_service import ArchiveService
+            from app.services.invalidation_service import publish
+            from app.api.roles import invalidate_roles
+            invalidate_all()
+            ArchiveService.reset_cache()
+            invalidate_roles()
+            async with async_session() as publish_session:
+                await publish(publish_session, "reset")
+            async with async_session() as index_session:
+                await UserService.load_search_index(index_session)
+                await RoomService.load_search_index(index_session)
             
             return {
                 "message": "Демо-данные сброшены",
@@ -216,6 +368,11 @@ async def health_check():
         "timestamp": "2024-01-15T12:00:00Z"
     }
 
+@debug_router.get("/startup")
+async def startup_report(request: Request):
+    """Длительность этапов запуска приложения"""
+    return getattr(request.app.state, "startup_report", {})
+
 @debug_router.get("/database-info")
 async def database_info():
     """Информация о базе данных"""
@@ -250,4 +407,87 @@ async def database_info():
                 ]
             }
         except Exception as e:
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
+
+@debug_router.get("/database-stats")
+async def database_stats():
+    """Строки и страницы по таблицам, индексы, размер WAL, кэши и планы горячих запросов"""
+    from app.services.introspection_service import IntrospectionService
+    try:
+        return await IntrospectionService.report()
+    except Exception as e:
+        return {"error": str(e)}
+
+@debug_router.get("/maintenance")
+async def maintenance_stats():
+    """Метрики фоновых задач обслуживания"""
+    from app.services.maintenance_service import maintenance_scheduler
+    return maintenance_scheduler.stats()
+
+@debug_router.post("/maintenance/{job_name}")
+async def run_maintenance_job(job_name: str):
+    """Внеочередной запуск задачи обслуживания"""
+    from app.services.maintenance_service import maintenance_scheduler
+    if job_name not in maintenance_scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    result = await maintenance_scheduler.run_job(job_name)
+    if result is None:
+        raise HTTPException(status_code=409, detail="Job is already running")
+    return {"job": job_name, "result": result, "stats": maintenance_scheduler.jobs[job_name].stats()}
+
+@debug_router.get("/invalidation")
+async def invalidation_stats():
+    """Состояние опроса change_log (сброс кэшей между процессами)"""
+    from app.services.invalidation_service import change_watcher
+    return change_watcher.stats()
+
+@debug_router.get("/profiles")
+async def list_profiles():
+    """Последние профили запросов (см. app/utils/profiling.py)"""
+    from app.utils import profiling
+    return {"enabled": profiling.PROFILING_ENABLED, "sampleRate": profiling.PROFILE_SAMPLE_RATE,
+            "mode": profiling.PROFILE_MODE, "profiles": profiling.list_profiles()}
+
+@debug_router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: int, format: str = Query("text", pattern="^(text|pstats|collapsed)$")):
+    """Профиль: text - отчет, pstats - файл для pstats/snakeviz, collapsed - для flame graph"""
+    from app.utils import profiling
+    entry = profiling.get_profile(profile_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return PlainTextResponse(profiling.render_text(entry))
+    key = "_pstats" if format == "pstats" else "_collapsed"
+    if key not in entry:
+        raise HTTPException(status_code=400, detail=f"Profile was recorded in {entry['mode']} mode")
+    if format == "pstats":
+        return Response(entry[key], media_type="application/octet-stream",
+                        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'})
+    return PlainTextResponse(entry[key], headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'})
+
+@debug_router.get("/queries")
+async def query_stats(limit: int = Query(20, ge=1, le=500)):
+    """Статистика SQL: самые затратные отпечатки, медленные запросы с планом, последние запросы к API"""
+    from app.models import database
+    from app.utils.query_metrics import recent_requests
+    with database._stats_lock:
+        fingerprints = sorted(database.fingerprint_stats.items(), key=lambda item: -item[1][1])[:limit]
+    return {
+        "enabled": database.SQL_INSTRUMENTATION,
+        "slowQueryMs": database.SLOW_QUERY_MS,
+        "fingerprints": [
+            {"fingerprint": key, "count": count, "totalMs": round(total, 2),
+             "avgMs": round(total / count, 3), "maxMs": round(maximum, 2)}
+            for key, (count, total, maximum) in fingerprints
+        ],
+        "slowQueries": list(reversed(database.slow_queries))[:limit],
+        "recentRequests": list(reversed(recent_requests))[:limit]
+    }
+
+@debug_router.delete("/queries")
+async def reset_query_stats():
+    from app.models.database import reset_query_stats
+    from app.utils.query_metrics import recent_requests
+    reset_query_stats()
+    recent_requests.clear()
+    return {"status": "reset"}
@@ -2,15 +2,24 @@ from fastapi import APIRouter, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models import Role, async_session
+from app.services.invalidation_service import on_change
 
 roles_router = APIRouter()
 
+# Список ролей меняется редко, а читается на каждой странице администрирования
+_roles_cache = [None]
+
+@on_change("role", "reset")
+def invalidate_roles(key=None):
+    _roles_cache[0] = None
+
 @roles_router.get("/")
 async def get_all_roles():
-    async with async_session() as session:
-        result = await session.execute(select(Role))
-        roles = result.scalars().all()
-        return [role.to_dict() for role in roles]
+    if _roles_cache[0] is None:
+        async with async_session() as session:
+            result = await session.execute(select(Role))
+            _roles_cache[0] = [role.to_dict() for role in result.scalars().all()]
+    return _roles_cache[0]
 
 @roles_router.get("/{role_id}")
 async def get_role(role_id: int):
@@ -31,6 +40,7 @@ async def create_role(data: dict):
         new_role = Role(name=data["name"], description=data.get("description", ""))
         session.add(new_role)
         await session.commit()
+        invalidate_roles()
         return new_role.to_dict()
 
 @roles_router.put("/{role_id}")
@@ -44,6 +54,7 @@ async def update_role(role_id: int, data: dict):
         role.name = data.get("name", role.name)
         role.description = data.get("description", role.description)
         await session.commit()
+        invalidate_roles()
         return role.to_dict()
 
 @roles_router.delete("/{role_id}")
@@ -56,4 +67,5 @@ async def delete_role(role_id: int):
         
         await session.delete(role)
         await session.commit()
+        invalidate_roles()
         return {"status": "Role deleted"}
\ No newline at end of file
@@ -1,16 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from datetime import date, datetime, timedelta
 import traceback
 
-from app.models import get_db, Room
+from app.models import get_db, async_session, Room
 from app.services.room_service import RoomService
+from app.services.scheduling_service import SchedulingService
 from app.schemes.room_schema import RoomCreateSchema
 from app.exceptions.room_exceptions import RoomNotFound, InvalidRoomData
+from app.exceptions.booking_exceptions import InvalidBookingData
+from app.services.deletion_service import DELETE_CHUNK_SIZE
+from app.utils.jobs import background_jobs
+from app.utils.query_budget import query_budget
 
 rooms_router = APIRouter()
 
 @rooms_router.get("/")
+@query_budget(1)
 async def get_all_rooms(db: AsyncSession = Depends(get_db)):
     try:
         print("🏢 Запрос всех комнат...")
@@ -22,6 +30,60 @@ async def get_all_rooms(db: AsyncSession = Depends(get_db)):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
+@rooms_router.get("/search")
+async def search_rooms(
+    db: AsyncSession = Depends(get_db),
+    min_capacity: int = Query(None, ge=1),
+    min_price: float = Query(None, ge=0),
+    max_price: float = Query(None, ge=0),
+    amenities: str = Query(None, description="Удобства через запятую, нужны все"),
+    booking_date: date = Query(None),
+    start_time: str = Query(None),
+    end_time: str = Query(None)
+):
+    """Поиск комнат: фильтры по вместимости, цене, удобствам и свободному окну"""
+    window = [booking_date, start_time, end_time]
+    if any(window) and not all(window):
+        raise HTTPException(status_code=400, detail="Для проверки занятости укажите booking_date, start_time и end_time")
+    try:
+        # "9:00" -> "09:00": занятость проверяется сравнением строк
+        start_time = datetime.strptime(start_time, "%H:%M").strftime("%H:%M") if start_time else None
+        end_time = datetime.strptime(end_time, "%H:%M").strftime("%H:%M") if end_time else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Неверный формат времени. Используйте HH:MM")
+    if start_time and end_time and end_time <= start_time:
+        raise HTTPException(status_code=400, detail="Время окончания должно быть позже времени начала")
+    
+    return await RoomService.search_rooms(
+        db,
+        min_capacity=min_capacity,
+        min_price=min_price,
+        max_price=max_price,
+        amenities=amenities.split(",") if amenities else None,
+        booking_date=booking_date,
+        start_time=start_time,
+        end_time=end_time
+    )
+
+@rooms_router.get("/timeline")
+@query_budget(4)
+async def get_timeline(
+    date_from: date = Query(...),
+    date_to: date = Query(None, description="По умолчанию - неделя от date_from"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Комнаты с бронированиями за период одним запросом (колоночный формат для календаря)"""
+    try:
+        timeline = await SchedulingService.timeline(db, date_from, date_to or date_from + timedelta(days=6))
+        # Только строки и числа - без jsonable_encoder
+        return JSONResponse(timeline)
+    except InvalidBookingData as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Ошибка при построении таймлайна: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
 @rooms_router.get("/{room_id}")
 async def get_room(room_id: str, db: AsyncSession = Depends(get_db)):
     try:
@@ -57,7 +119,9 @@ async def create_room(data: dict, db: AsyncSession = Depends(get_db)):
         print(f"✅ Комната создана: {room.name} (цена: {room.price} руб/час)")
         return room.to_dict()
         
-    except InvalidRoomData as e:
+    except HTTPException:
+        raise
+    except (ValueError, TypeError, InvalidRoomData) as e:
         print(f"❌ Неверные данные комнаты: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -79,9 +143,11 @@ async def update_room(room_id: str, data: dict, db: AsyncSession = Depends(get_d
         if not room:
             raise HTTPException(status_code=404, detail="Room not found")
         return room.to_dict()
+    except HTTPException:
+        raise
     except RoomNotFound as e:
         raise HTTPException(status_code=404, detail=str(e))
-    except InvalidRoomData as e:
+    except (ValueError, TypeError, InvalidRoomData) as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Ошибка при обновлении комнаты: {str(e)}")
@@ -94,19 +160,35 @@ async def update_room_price(room_id: str, data: dict, db: AsyncSession = Depends
         if not room:
             raise HTTPException(status_code=404, detail="Room not found")
         return room.to_dict()
+    except HTTPException:
+        raise
     except RoomNotFound as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except (ValueError, TypeError, InvalidRoomData) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Ошибка при обновлении цены комнаты: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 @rooms_router.delete("/{room_id}")
-async def delete_room(room_id: str, db: AsyncSession = Depends(get_db)):
+async def delete_room(
+    room_id: str,
+    background: bool = Query(False),
+    chunk_size: int = Query(DELETE_CHUNK_SIZE, ge=100, le=50000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Удаление комнаты с бронированиями; background=true - фоновая задача (202, прогресс в /api/admin/jobs)"""
     try:
-        success = await RoomService.delete_room(db, room_id)
-        if not success:
-            raise HTTPException(status_code=404, detail="Room not found")
-        return {"status": "Room deleted"}
+        if background:
+            await RoomService.get_room_by_id(db, room_id)
+            
+            async def run(progress):
+                async with async_session() as session:
+                    return await RoomService.delete_room(session, room_id, chunk_size, progress)
+            
+            return JSONResponse(status_code=202, content=background_jobs.submit("delete_room", room_id, run))
+        stats = await RoomService.delete_room(db, room_id, chunk_size)
+        return {"status": "Room deleted", **stats}
     except RoomNotFound as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+import traceback
+
+from app.models import get_db
+from app.services.scheduling_service import SchedulingService, BUSINESS_DAY_START, BUSINESS_DAY_END
+from app.schemes.scheduling_schema import CommonFreeTimeSchema, AutoAssignSchema
+from app.exceptions.booking_exceptions import InvalidBookingData, TimeSlotNotAvailable
+from app.exceptions.user_exceptions import UserNotFound
+
+scheduling_router = APIRouter()
+
+@scheduling_router.get("/free-slots")
+async def find_free_slots(
+    db: AsyncSession = Depends(get_db),
+    duration: int = Query(60, ge=5, description="Длительность встречи в минутах"),
+    min_capacity: int = Query(1, ge=1),
+    count: int = Query(3, ge=1, le=100),
+    date_from: date = Query(None),
+    date_to: date = Query(None),
+    day_start: str = Query(BUSINESS_DAY_START),
+    day_end: str = Query(BUSINESS_DAY_END),
+    include_weekends: bool = Query(False)
+):
+    """Ближайшие свободные окна нужной длительности в комнатах подходящей вместимости"""
+    try:
+        return await SchedulingService.find_free_slots(
+            db,
+            duration,
+            date_from=date_from,
+            date_to=date_to,
+            min_capacity=min_capacity,
+            count=count,
+            day_start=day_start,
+            day_end=day_end,
+            include_weekends=include_weekends
+        )
+    except InvalidBookingData as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Ошибка поиска свободных окон: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+@scheduling_router.post("/common-free-time")
+async def find_common_free_time(data: CommonFreeTimeSchema, db: AsyncSession = Depends(get_db)):
+    """Общее свободное время участников (по id или email), при minCapacity - со свободными комнатами"""
+    try:
+        return await SchedulingService.find_common_free_time(
+            db,
+            data.participants,
+            data.dateFrom,
+            data.dateTo,
+            min_duration=data.minDuration,
+            day_start=data.dayStart,
+            day_end=data.dayEnd,
+            include_weekends=data.includeWeekends,
+            min_capacity=data.minCapacity
+        )
+    except UserNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidBookingData as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Ошибка поиска общего времени: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+@scheduling_router.post("/auto-assign")
+async def auto_assign_rooms(data: AutoAssignSchema, db: AsyncSession = Depends(get_db)):
+    """Автоматический подбор комнат для пакета встреч; commit=true создает бронирования"""
+    try:
+        result = await SchedulingService.auto_assign(db, data.requests, data.timeBudgetMs, data.commit)
+        stats = result["stats"]
+        print(f"🧩 Автоподбор: размещено {stats['assigned']} из {stats['requests']} за {stats['elapsedMs']} мс")
+        return result
+    except UserNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TimeSlotNotAvailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        print(f"❌ Ошибка автоподбора комнат: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
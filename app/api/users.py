@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 import traceback
 
@@ -6,11 +6,13 @@ from app.models import User, Room, Booking, Role
 from app.models import get_db
 from app.services.user_service import UserService
 from app.schemes.user_schema import UserLoginSchema, UserCreateSchema, UserRoleUpdateSchema
-from app.exceptions.user_exceptions import UserNotFound, UserAlreadyExists, InvalidUserData
+from app.exceptions.user_exceptions import UserNotFound, UserAlreadyExists, InvalidUserData, TooManyLoginAttempts
+from app.utils.query_budget import query_budget
 
 users_router = APIRouter()
 
 @users_router.get("/")
+@query_budget(2)
 async def get_all_users(db: AsyncSession = Depends(get_db)):
     try:
         print("🔍 Запрос на получение всех пользователей...")
@@ -22,9 +24,16 @@ async def get_all_users(db: AsyncSession = Depends(get_db)):
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
+@users_router.get("/search")
+async def search_users(q: str = Query(..., min_length=1, max_length=100), limit: int = Query(10, ge=1, le=50)):
+    """Автодополнение участников по началу email, имени или фамилии (индекс в памяти)"""
+    return UserService.search_users(q, limit)
+
 @users_router.post("/login")
-async def login(user_data: UserLoginSchema, db: AsyncSession = Depends(get_db)):  # ← Используем схему
+async def login(user_data: UserLoginSchema, request: Request, db: AsyncSession = Depends(get_db)):  # ← Используем схему
     try:
+        # Лимит попыток проверяется до запроса к БД и bcrypt
+        UserService.check_login_rate(request.client.host if request.client else None, user_data.email)
         print("🔐 Запрос на вход в систему")
         print(f"📧 Данные для входа: email={user_data.email}")
         
@@ -48,6 +57,13 @@ async def login(user_data: UserLoginSchema, db: AsyncSession = Depends(get_db)):
         print(f"📊 Данные пользователя: {user_dict}")
         return user_dict
         
+    except TooManyLoginAttempts as e:
+        print(f"⛔ Слишком много попыток входа для {user_data.email}")
+        raise HTTPException(
+            status_code=429,
+            detail="Слишком много попыток входа. Попробуйте позже",
+            headers={"Retry-After": str(int(e.retry_after))}
+        )
     except HTTPException:
         raise
     except ValueError as e:
@@ -102,8 +118,10 @@ async def register(user_data: UserCreateSchema, db: AsyncSession = Depends(get_d
         raise HTTPException(status_code=500, detail=f"Registration error: {str(e)}")
 
 @users_router.post("/login")
-async def login(user_data: UserLoginSchema, db: AsyncSession = Depends(get_db)):
+async def login(user_data: UserLoginSchema, request: Request, db: AsyncSession = Depends(get_db)):
     try:
+        # Лимит попыток проверяется до запроса к БД и bcrypt
+        UserService.check_login_rate(request.client.host if request.client else None, user_data.email)
         print("🔐 Запрос на вход в систему")
         print(f"📧 Данные для входа: email={user_data.email}")
         
@@ -128,6 +146,13 @@ async def login(user_data: UserLoginSchema, db: AsyncSession = Depends(get_db)):
         print(f"📊 Данные пользователя: {user_dict}")
         return user_dict
         
+    except TooManyLoginAttempts as e:
+        print(f"⛔ Слишком много попыток входа для {user_data.email}")
+        raise HTTPException(
+            status_code=429,
+            detail="Слишком много попыток входа. Попробуйте позже",
+            headers={"Retry-After": str(int(e.retry_after))}
+        )
     except HTTPException:
         raise
     except ValueError as e:
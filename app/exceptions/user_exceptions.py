@@ -18,3 +18,8 @@ class InvalidPassword(UserException):
     """Raised when password is invalid"""
     pass
 
+class TooManyLoginAttempts(UserException):
+    """Raised when login attempts exceed the rate limit"""
+    def __init__(self, retry_after: float):
+        super().__init__(f"Too many login attempts, retry after {retry_after:.0f} s")
+        self.retry_after = retry_after
@@ -4,12 +4,15 @@ from .role import Role
 from .user import User
 from .room import Room
 from .booking import Booking
+from .booking_archive import BookingArchive
+from .idempotency import IdempotencyKey
+from .change_log import ChangeLog
 
 # Импортируем функции инициализации
-from .initialization import init_db, init_roles, init_default_data
+from .initialization import init_db, init_roles, init_default_data, SCHEMA_VERSION
 
 __all__ = [
     'Base', 'engine', 'async_session', 'get_db',
-    'User', 'Room', 'Booking', 'Role',
-    'init_db', 'init_roles', 'init_default_data'
+    'User', 'Room', 'Booking', 'BookingArchive', 'Role', 'IdempotencyKey', 'ChangeLog',
+    'init_db', 'init_roles', 'init_default_data', 'SCHEMA_VERSION'
 ]
\ No newline at end of file
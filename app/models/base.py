@@ -1,3 +1,10 @@
 from sqlalchemy.orm import declarative_base
+import os
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+# Строгий режим (тесты, staging): неявная ленивая загрузка связей бросает исключение
+# вместо скрытого запроса на каждую строку. Связи загружаются явно - refresh(obj, [...])
+# или selectinload/joinedload в запросе.
+SQL_STRICT_LOADING = os.getenv("SQL_STRICT_LOADING", "False").lower() == "true"
+RELATIONSHIP_LAZY = "raise" if SQL_STRICT_LOADING else "select"
@@ -1,10 +1,17 @@
-from sqlalchemy import Column, String, Integer, Date, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, Date, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from .base import Base, RELATIONSHIP_LAZY
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Проверка пересечений всегда идет по комнате и дате
+        Index("ix_bookings_room_date", "room_id", "date"),
+        # Выборки по диапазону дат (календарь, поиск окон) и по владельцу
+        Index("ix_bookings_date", "date"),
+        Index("ix_bookings_user_date", "user_id", "date"),
+    )
 
     id = Column(String(36), primary_key=True)
     room_id = Column(String(36), ForeignKey("rooms.id"), nullable=False)
@@ -15,8 +22,8 @@ class Booking(Base):
     title = Column(String(255), nullable=False)
     participants = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
-    user = relationship("User", back_populates="bookings")
-    room = relationship("Room", back_populates="bookings")
+    user = relationship("User", back_populates="bookings", lazy=RELATIONSHIP_LAZY)
+    room = relationship("Room", back_populates="bookings", lazy=RELATIONSHIP_LAZY)
 
     def to_dict(self):
         participants = []
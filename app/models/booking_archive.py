@@ -0,0 +1,30 @@
+from sqlalchemy import Column, String, Date, DateTime, Text, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from .base import Base
+from .booking import Booking
+
+class BookingArchive(Base):
+    """Прошедшие бронирования, перенесенные из bookings (см. ArchiveService).
+    Внешних ключей нет: архив не должен мешать удалению пользователей и комнат"""
+    __tablename__ = "bookings_archive"
+    __table_args__ = (
+        Index("ix_bookings_archive_room_date", "room_id", "date"),
+        Index("ix_bookings_archive_user_date", "user_id", "date"),
+        Index("ix_bookings_archive_date", "date"),
+    )
+
+    id = Column(String(36), primary_key=True)
+    room_id = Column(String(36), nullable=False)
+    user_id = Column(String(36), nullable=False)
+    date = Column(Date, nullable=False)
+    start_time = Column(String(5), nullable=False)
+    end_time = Column(String(5), nullable=False)
+    title = Column(String(255), nullable=False)
+    participants = Column(Text)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    user = relationship("User", primaryjoin="foreign(BookingArchive.user_id) == User.id", viewonly=True, lazy="joined")
+
+    # Формат ответа тот же, что у живых бронирований
+    to_dict = Booking.to_dict
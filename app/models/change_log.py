@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from datetime import datetime
+from .base import Base
+
+class ChangeLog(Base):
+    """Журнал изменений для сброса кэшей в других процессах (см. app/services/invalidation_service.py)"""
+    __tablename__ = "change_log"
+    # AUTOINCREMENT: номера не переиспользуются после очистки старых записей
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    topic = Column(String(32), nullable=False)
+    key = Column(String(1024))
+    origin = Column(String(32), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
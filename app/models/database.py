@@ -1,17 +1,138 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
 from pathlib import Path
 import os
+import re
+import threading
+import time
 
 # Получаем корневую директорию проекта
 BASE_DIR = Path(__file__).parent.parent.parent
 DB_DIR = BASE_DIR / "database"
 DB_DIR.mkdir(exist_ok=True)
 
-DATABASE_URL = f"sqlite+aiosqlite:///{DB_DIR}/soveshchayka.db"
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite+aiosqlite:///{DB_DIR}/soveshchayka.db")
 engine = create_async_engine(DATABASE_URL, echo=False)
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 async def get_db():
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+# --- Учет SQL-запросов -------------------------------------------------------
+# Для каждого запроса к API считаются число SQL-запросов, время в БД и отпечатки
+# (текст запроса без литералов). Медленные запросы попадают в кольцевой буфер
+# вместе с EXPLAIN QUERY PLAN. Значения параметров не сохраняются (email, хеши
+# паролей) - только их типы.
+#
+# Учет стоит регулярного выражения и общей блокировки на каждый запрос, поэтому
+# по умолчанию включен только вместе со строгим режимом (тесты, staging);
+# бюджеты запросов (app/utils/query_budget.py) работают только при включенном учете.
+
+from .base import SQL_STRICT_LOADING
+
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", str(SQL_STRICT_LOADING)).lower() == "true"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "50"))
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "50"))
+MAX_FINGERPRINTS = int(os.getenv("QUERY_STATS_MAX_FINGERPRINTS", "500"))
+
+class RequestQueryStats:
+    __slots__ = ("count", "db_ms", "fingerprints")
+
+    def __init__(self):
+        self.count = 0
+        self.db_ms = 0.0
+        self.fingerprints = {}
+
+# Статистика текущего запроса к API (None - вне запроса, например фоновые задачи)
+current_query_stats = ContextVar("current_query_stats", default=None)
+
+fingerprint_stats = {}  # отпечаток -> [число, суммарные мс, максимум мс]
+slow_queries = deque(maxlen=SLOW_QUERY_BUFFER)
+_stats_lock = threading.Lock()
+_fingerprint_cache = {}
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")
+
+def fingerprint(statement: str) -> str:
+    """Нормализованный текст: литералы и списки параметров IN (...) заменены на ?"""
+    cached = _fingerprint_cache.get(statement)
+    if cached is None:
+        cached = _SPACES.sub(" ", _LITERALS.sub("?", statement)).strip()
+        cached = _IN_LISTS.sub("(?...)", cached)
+        if len(_fingerprint_cache) >= MAX_FINGERPRINTS * 4:
+            _fingerprint_cache.clear()
+        _fingerprint_cache[statement] = cached
+    return cached
+
+def _parameter_types(parameters):
+    values = parameters.values() if isinstance(parameters, dict) else (parameters or ())
+    return [type(value).__name__ for value in values][:50]
+
+def _explain(conn, statement: str, parameters):
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    try:
+        # Курсор драйвера напрямую - без событий SQLAlchemy и без рекурсии
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            return [row[-1] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as e:
+        return [f"explain failed: {e}"]
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if SQL_INSTRUMENTATION:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not SQL_INSTRUMENTATION:
+        return
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = (time.perf_counter() - starts.pop()) * 1000
+    key = fingerprint(statement)
+
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.db_ms += elapsed
+        stats.fingerprints[key] = stats.fingerprints.get(key, 0) + 1
+
+    with _stats_lock:
+        entry = fingerprint_stats.get(key)
+        if entry is None:
+            if len(fingerprint_stats) >= MAX_FINGERPRINTS:
+                # Вытесняем самый редкий отпечаток
+                fingerprint_stats.pop(min(fingerprint_stats, key=lambda k: fingerprint_stats[k][0]))
+            entry = fingerprint_stats[key] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+
+    if elapsed >= SLOW_QUERY_MS and not executemany:
+        slow_queries.append({
+            "at": datetime.utcnow().isoformat(),
+            "ms": round(elapsed, 2),
+            "fingerprint": key,
+            "statement": statement,
+            "parameterTypes": _parameter_types(parameters),
+            "plan": _explain(conn, statement, parameters)
+        })
+
+def reset_query_stats():
+    with _stats_lock:
+        fingerprint_stats.clear()
+        slow_queries.clear()
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime
+from datetime import datetime
+from .base import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    content_type = Column(String(100))
+    response_body = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -1,7 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, text
 from datetime import datetime, timedelta
-import bcrypt
+import time
 from ..models import async_session
 
 from .database import engine
@@ -9,19 +9,103 @@ from .role import Role
 from .user import User
 from .room import Room
 from .booking import Booking
+from .booking_archive import BookingArchive
+from .change_log import ChangeLog
+
+# Версия схемы хранится в PRAGMA user_version. Увеличивайте при изменении
+# таблиц или демо-данных, чтобы при следующем старте выполнилась полная инициализация.
+SCHEMA_VERSION = 6
+
+async def get_schema_version():
+    """Версия схемы, записанная в файл БД (0 - не инициализирована)"""
+    async with engine.connect() as conn:
+        result = await conn.execute(text("PRAGMA user_version"))
+        return result.scalar() or 0
+
+async def set_schema_version(version: int):
+    async with engine.begin() as conn:
+        # PRAGMA не поддерживает параметры, поэтому приводим к int явно
+        await conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+# Защита от двойного бронирования на уровне БД. SQLite допускает одного писателя,
+# поэтому проверка в триггере и вставка атомарны даже для нескольких процессов.
+BOOKING_GUARD_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_bookings_room_date ON bookings (room_id, date)",
+    """
+    CREATE TRIGGER IF NOT EXISTS bookings_no_overlap_insert
+    BEFORE INSERT ON bookings
+    WHEN EXISTS (
+        SELECT 1 FROM bookings
+        WHERE room_id = NEW.room_id AND date = NEW.date
+          AND start_time < NEW.end_time AND end_time > NEW.start_time
+    )
+    BEGIN
+        SELECT RAISE(ABORT, 'booking_overlap');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS bookings_no_overlap_update
+    BEFORE UPDATE OF room_id, date, start_time, end_time ON bookings
+    WHEN EXISTS (
+        SELECT 1 FROM bookings
+        WHERE room_id = NEW.room_id AND date = NEW.date AND id != NEW.id
+          AND start_time < NEW.end_time AND end_time > NEW.start_time
+    )
+    BEGIN
+        SELECT RAISE(ABORT, 'booking_overlap');
+    END
+    """,
+]
+
+def ensure_indexes(sync_conn):
+    """Создание индексов, объявленных в моделях, для уже существующих таблиц
+    (create_all создает индексы только вместе с новой таблицей)"""
+    from .base import Base
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+async def ensure_booking_guards():
+    async with engine.begin() as conn:
+        for statement in BOOKING_GUARD_DDL:
+            await conn.execute(text(statement))
+
+async def init_db(force: bool = False):
+    """Инициализация БД. Возвращает словарь с длительностью этапов в миллисекундах"""
+    timings = {}
+    started = time.perf_counter()
+
+    # Быстрый путь: БД уже инициализирована этой версией схемы - один запрос к метаданным
+    if not force:
+        version = await get_schema_version()
+        timings["schema_check"] = round((time.perf_counter() - started) * 1000, 2)
+        if version == SCHEMA_VERSION:
+            print(f"⚡ Схема v{version} актуальна, инициализация пропущена")
+            return timings
 
-async def init_db():
     print("🔄 Создание таблиц...")
     try:
+        phase = time.perf_counter()
         async with engine.begin() as conn:
             # Создаем все таблицы
             from .base import Base
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(ensure_indexes)
+        await ensure_booking_guards()
+        timings["create_all"] = round((time.perf_counter() - phase) * 1000, 2)
         print("✅ Таблицы созданы успешно")
         
         # Инициализируем роли и данные
+        phase = time.perf_counter()
         await init_roles()
+        timings["init_roles"] = round((time.perf_counter() - phase) * 1000, 2)
+
+        phase = time.perf_counter()
         await init_default_data()
+        timings["init_default_data"] = round((time.perf_counter() - phase) * 1000, 2)
+
+        await set_schema_version(SCHEMA_VERSION)
+        return timings
         
     except Exception as e:
         print(f"❌ Ошибка при создании таблиц: {e}")
@@ -39,11 +123,12 @@ async def init_roles():
                 {"name": "admin", "description": "Администратор"}
             ]
             
+            # Одним запросом получаем уже существующие роли
+            existing = await session.execute(select(Role.name))
+            existing_names = set(existing.scalars().all())
+
             for role_data in roles_to_create:
-                existing = await session.execute(
-                    select(Role).where(Role.name == role_data["name"])
-                )
-                if not existing.scalar():
+                if role_data["name"] not in existing_names:
                     role = Role(
                         name=role_data["name"],
                         description=role_data["description"]
@@ -83,6 +168,8 @@ async def init_default_data():
                     user_role = user_role.scalar()
 
                 def hash_pass(password):
+                    # bcrypt нужен только при первичном заполнении - не грузим его на каждом старте
+                    import bcrypt
                     salt = bcrypt.gensalt()
                     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
                     return hashed.decode('utf-8')
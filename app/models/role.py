@@ -1,6 +1,6 @@
 from sqlalchemy import Column, String, Integer, Text
 from sqlalchemy.orm import relationship
-from .base import Base
+from .base import Base, RELATIONSHIP_LAZY
 
 class Role(Base):
     __tablename__ = "role"
@@ -8,7 +8,7 @@ class Role(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String(50), unique=True, nullable=False)
     description = Column(String(255))
-    users = relationship("User", back_populates="role")
+    users = relationship("User", back_populates="role", lazy=RELATIONSHIP_LAZY)
 
     def to_dict(self):
         return {
@@ -1,7 +1,7 @@
 from sqlalchemy import Column, String, Integer, Text, Float, DateTime
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from .base import Base, RELATIONSHIP_LAZY
 
 class Room(Base):
     __tablename__ = "rooms"
@@ -12,7 +12,7 @@ class Room(Base):
     amenities = Column(Text)
     price = Column(Float, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
-    bookings = relationship("Booking", back_populates="room", cascade="all, delete-orphan")
+    bookings = relationship("Booking", back_populates="room", cascade="all, delete-orphan", lazy=RELATIONSHIP_LAZY)
 
     def to_dict(self):
         return {
@@ -1,7 +1,7 @@
 from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from .base import Base, RELATIONSHIP_LAZY
 
 class User(Base):
     __tablename__ = "users"
@@ -12,9 +12,9 @@ class User(Base):
     email = Column(String(120), unique=True, nullable=False)
     password = Column(String(255), nullable=False)
     role_id = Column(Integer, ForeignKey("role.id"), default=1)
-    role = relationship("Role", back_populates="users")
+    role = relationship("Role", back_populates="users", lazy=RELATIONSHIP_LAZY)
     created_at = Column(DateTime, default=datetime.utcnow)
-    bookings = relationship("Booking", back_populates="user", cascade="all, delete-orphan")
+    bookings = relationship("Booking", back_populates="user", cascade="all, delete-orphan", lazy=RELATIONSHIP_LAZY)
 
     def to_dict(self):
         return {
@@ -2,5 +2,6 @@ from .user_repository import UserRepository
 from .room_repository import RoomRepository
 from .booking_repository import BookingRepository
 from .role_repository import RoleRepository
+from .idempotency_repository import IdempotencyRepository
 
-__all__ = ['UserRepository', 'RoomRepository', 'BookingRepository', 'RoleRepository']
\ No newline at end of file
+__all__ = ['UserRepository', 'RoomRepository', 'BookingRepository', 'RoleRepository', 'IdempotencyRepository']
\ No newline at end of file
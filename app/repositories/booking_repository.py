@@ -1,8 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, and_, or_
+from sqlalchemy.exc import IntegrityError
 from app.models import Booking, Room, User
+from app.utils.locks import booking_locks
+from app.utils.ids import new_id
 from datetime import date, datetime
-import uuid
 
 class BookingRepository:
     @staticmethod
@@ -25,39 +27,79 @@ class BookingRepository:
         result = await session.execute(select(Booking).where(Booking.user_id == user_id))
         return result.scalars().all()
 
+    @staticmethod
+    def bookings_by_date_query(booking_date: date):
+        return select(Booking).where(Booking.date == booking_date)
+
     @staticmethod
     async def get_bookings_by_date(session: AsyncSession, booking_date: date):
-        result = await session.execute(select(Booking).where(Booking.date == booking_date))
+        result = await session.execute(BookingRepository.bookings_by_date_query(booking_date))
         return result.scalars().all()
 
     @staticmethod
-    async def check_availability(session: AsyncSession, room_id: str, booking_date: date, start_time: str, end_time: str):
-        bookings = await BookingRepository.get_room_bookings(session, room_id)
-        day_bookings = [b for b in bookings if b.date == booking_date]
+    def is_overlap_error(error: IntegrityError) -> bool:
+        """Ошибка от триггера bookings_no_overlap_* (пересечение с другим бронированием)"""
+        return "booking_overlap" in str(error.orig)
 
-        for booking in day_bookings:
-            if not (end_time <= booking.start_time or start_time >= booking.end_time):
-                return False
-        return True
+    @staticmethod
+    def availability_query(room_id: str, booking_date: date, start_time: str, end_time: str):
+        # Поиск по индексу (room_id, date) - только пересекающиеся бронирования
+        return select(Booking.id).where(
+            Booking.room_id == room_id,
+            Booking.date == booking_date,
+            Booking.start_time < end_time,
+            Booking.end_time > start_time
+        ).limit(1)
 
     @staticmethod
-    async def create_booking(session: AsyncSession, room_id: str, user_id: str, booking_date: date, start_time: str, end_time: str, title: str, participants: list = None):
-        available = await BookingRepository.check_availability(session, room_id, booking_date, start_time, end_time)
-        if not available:
-            return None
+    def conflicts_query(intervals, exclude_ids=()):
+        """Бронирования, пересекающие хотя бы один из интервалов (room_id, date, start, end).
+        Каждое условие OR - отдельный поиск по индексу (room_id, date)"""
+        query = select(Booking.id, Booking.room_id, Booking.date, Booking.start_time, Booking.end_time).where(or_(*(
+            and_(
+                Booking.room_id == room_id,
+                Booking.date == booking_date,
+                Booking.start_time < end_time,
+                Booking.end_time > start_time
+            )
+            for room_id, booking_date, start_time, end_time in intervals
+        )))
+        if exclude_ids:
+            query = query.where(Booking.id.not_in(exclude_ids))
+        return query
 
-        new_booking = Booking(
-            id=f"booking_{uuid.uuid4().hex[:8]}",
-            room_id=room_id,
-            user_id=user_id,
-            date=booking_date,
-            start_time=start_time,
-            end_time=end_time,
-            title=title,
-            participants=",".join(participants) if participants else ""
+    @staticmethod
+    async def check_availability(session: AsyncSession, room_id: str, booking_date: date, start_time: str, end_time: str):
+        result = await session.execute(
+            BookingRepository.availability_query(room_id, booking_date, start_time, end_time)
         )
-        session.add(new_booking)
-        await session.commit()
+        return result.scalar() is None
+
+    @staticmethod
+    async def create_booking(session: AsyncSession, room_id: str, user_id: str, booking_date: date, start_time: str, end_time: str, title: str, participants: list = None):
+        async with booking_locks.lock(room_id, booking_date):
+            available = await BookingRepository.check_availability(session, room_id, booking_date, start_time, end_time)
+            if not available:
+                return None
+
+            new_booking = Booking(
+                id=new_id("booking"),
+                room_id=room_id,
+                user_id=user_id,
+                date=booking_date,
+                start_time=start_time,
+                end_time=end_time,
+                title=title,
+                participants=",".join(participants) if participants else ""
+            )
+            session.add(new_booking)
+            try:
+                await session.commit()
+            except IntegrityError as e:
+                await session.rollback()
+                if BookingRepository.is_overlap_error(e):
+                    return None
+                raise
         await session.refresh(new_booking)
         return new_booking
 
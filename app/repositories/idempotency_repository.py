@@ -0,0 +1,81 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.models import IdempotencyKey
+
+# status_code строки, запрос по которой еще выполняется (ответа пока нет)
+IN_PROGRESS = 0
+
+class IdempotencyRepository:
+    @staticmethod
+    async def get_key(session: AsyncSession, key: str, ttl_seconds: int) -> Optional[IdempotencyKey]:
+        # Поиск по первичному ключу - один индексированный запрос
+        record = await session.get(IdempotencyKey, key)
+        if record and record.created_at < datetime.utcnow() - timedelta(seconds=ttl_seconds):
+            await session.delete(record)
+            await session.commit()
+            return None
+        return record
+
+    @staticmethod
+    async def claim_key(session: AsyncSession, key: str, request_hash: str) -> bool:
+        """Вставка строки "в работе" до выполнения запроса. Первичный ключ таблицы
+        гарантирует, что из всех процессов ключ получит только один"""
+        session.add(IdempotencyKey(key=key, request_hash=request_hash, status_code=IN_PROGRESS))
+        try:
+            await session.commit()
+            return True
+        except IntegrityError:
+            await session.rollback()
+            return False
+
+    @staticmethod
+    async def reclaim_stale(session: AsyncSession, key: str, claimed_at: datetime) -> bool:
+        """Перехват зависшей строки "в работе" (процесс-владелец упал): условный UPDATE
+        проходит только у одного из ожидающих"""
+        result = await session.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code == IN_PROGRESS,
+                IdempotencyKey.created_at == claimed_at
+            )
+            .values(created_at=datetime.utcnow())
+        )
+        await session.commit()
+        return result.rowcount == 1
+
+    @staticmethod
+    async def save_key(session: AsyncSession, key: str, request_hash: str, status_code: int,
+                       content_type: str, response_body: str) -> IdempotencyKey:
+        record = IdempotencyKey(
+            key=key,
+            request_hash=request_hash,
+            status_code=status_code,
+            content_type=content_type,
+            response_body=response_body
+        )
+        # merge обновляет строку "в работе", вставленную claim_key
+        record = await session.merge(record)
+        await session.commit()
+        return record
+
+    @staticmethod
+    async def release_key(session: AsyncSession, key: str):
+        """Снятие строки "в работе" без ответа (ошибка сервера) - ключ можно повторить"""
+        await session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code == IN_PROGRESS)
+        )
+        await session.commit()
+
+    @staticmethod
+    async def purge_expired(session: AsyncSession, ttl_seconds: int) -> int:
+        threshold = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+        result = await session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.created_at < threshold)
+        )
+        await session.commit()
+        return result.rowcount or 0
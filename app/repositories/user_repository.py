@@ -1,5 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from typing import Optional, List
 
 from app.models import User
@@ -9,13 +10,12 @@ class UserRepository:
     async def get_all_users(session: AsyncSession) -> List[User]:
         try:
             print("📦 Repository: Запрос всех пользователей...")
-            result = await session.execute(select(User))
+            # Роли загружаются одним дополнительным запросом на всех, а не по запросу на пользователя
+            result = await session.execute(select(User).options(selectinload(User.role)))
             users = list(result.scalars().all())
             print(f"📦 Repository: Найдено {len(users)} пользователей")
             
-            # Загружаем связанные данные ролей
             for user in users:
-                await session.refresh(user, ['role'])
                 print(f"  - {user.first_name} {user.last_name} ({user.email}) - роль: {user.role.name if user.role else 'нет'}")
             
             return users
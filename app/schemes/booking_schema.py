@@ -11,10 +11,18 @@ class BookingCreateSchema(BaseModel):
     participants: Optional[List[str]] = []
 
 class BookingUpdateSchema(BaseModel):
+    roomId: Optional[str] = None
+    date: Optional[str] = None
     startTime: Optional[str] = None
     endTime: Optional[str] = None
     title: Optional[str] = None
 
+class BookingMoveSchema(BookingUpdateSchema):
+    id: str
+
+class BookingBatchUpdateSchema(BaseModel):
+    bookings: List[BookingMoveSchema]
+
 class BookingResponseSchema(BaseModel):
     id: str
     roomId: str
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import date
+
+class CommonFreeTimeSchema(BaseModel):
+    participants: List[str] = Field(..., min_length=1, max_length=200)  # id или email
+    dateFrom: date
+    dateTo: date
+    minDuration: int = Field(30, ge=5)
+    dayStart: Optional[str] = None
+    dayEnd: Optional[str] = None
+    includeWeekends: bool = False
+    minCapacity: Optional[int] = Field(None, ge=1)  # если указано - подбираем свободные комнаты
+
+class AutoAssignItemSchema(BaseModel):
+    title: str
+    userId: str
+    date: date
+    startTime: str
+    endTime: str
+    size: int = Field(..., ge=1)  # число участников встречи
+    participants: Optional[List[str]] = []
+
+class AutoAssignSchema(BaseModel):
+    requests: List[AutoAssignItemSchema] = Field(..., min_length=1, max_length=10000)
+    timeBudgetMs: int = Field(2000, ge=10, le=30000)
+    commit: bool = False  # False - только план, True - создать бронирования
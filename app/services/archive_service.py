@@ -0,0 +1,110 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, delete, func, literal
+from datetime import date, datetime, timedelta
+import os
+import time
+
+from app.models import Booking, BookingArchive
+from app.services.invalidation_service import on_change, publish
+
+ARCHIVE_HORIZON_DAYS = int(os.getenv("ARCHIVE_HORIZON_DAYS", "90"))
+ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", "2000"))
+
+# Самая поздняя дата в архиве. Все, что позже, гарантированно лежит в bookings,
+# поэтому запросы с началом диапазона после этой даты архив не трогают.
+# None - еще не загружена, date.min - архив пуст.
+_archive_last_date = [None]
+
+_COLUMNS = ("id", "room_id", "user_id", "date", "start_time", "end_time", "title", "participants", "created_at")
+
+@on_change("bulk", "reset")
+def _remote_archive_changed(key):
+    # Архивация могла пройти в другом процессе
+    _archive_last_date[0] = None
+
+class ArchiveService:
+    @staticmethod
+    async def archive_last_date(session: AsyncSession) -> date:
+        if _archive_last_date[0] is None:
+            result = await session.execute(select(func.max(BookingArchive.date)))
+            _archive_last_date[0] = result.scalar() or date.min
+        return _archive_last_date[0]
+
+    @staticmethod
+    def reset_cache():
+        _archive_last_date[0] = None
+
+    @staticmethod
+    async def reaches_archive(session: AsyncSession, date_from: date = None) -> bool:
+        """Нужно ли читать архив для диапазона, начинающегося с date_from (None - без нижней границы)"""
+        last_date = await ArchiveService.archive_last_date(session)
+        if last_date == date.min:
+            return False
+        return date_from is None or date_from <= last_date
+
+    @staticmethod
+    def cutoff(horizon_days: int = None) -> date:
+        # Сегодняшние и будущие бронирования не архивируются никогда
+        horizon_days = max(1, ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days)
+        return date.today() - timedelta(days=horizon_days)
+
+    @staticmethod
+    async def archive_old_bookings(session: AsyncSession, horizon_days: int = None, chunk_size: int = ARCHIVE_CHUNK_SIZE,
+                                   progress=None):
+        """Перенос бронирований старше горизонта в bookings_archive.
+        Каждый чанк - отдельная короткая транзакция (INSERT ... SELECT и DELETE по списку id),
+        чтобы не держать блокировку записи SQLite на все время переноса"""
+        started = time.perf_counter()
+        cutoff = ArchiveService.cutoff(horizon_days)
+        moved = 0
+        chunks = 0
+
+        while True:
+            ids = (await session.execute(
+                select(Booking.id).where(Booking.date < cutoff).order_by(Booking.date).limit(chunk_size)
+            )).scalars().all()
+            if not ids:
+                break
+
+            source = select(*(getattr(Booking, column) for column in _COLUMNS), literal(datetime.utcnow())).where(
+                Booking.id.in_(ids)
+            )
+            await session.execute(
+                insert(BookingArchive).from_select(list(_COLUMNS) + ["archived_at"], source).prefix_with("OR REPLACE")
+            )
+            await session.execute(delete(Booking).where(Booking.id.in_(ids)))
+            await session.commit()
+
+            moved += len(ids)
+            chunks += 1
+            if progress:
+                progress(moved)
+
+        if moved:
+            ArchiveService.reset_cache()
+            await publish(session, "bulk")
+            # Удаление шло SQL-запросом в обход ORM - сбрасываем календарные ленты
+            from app.services.calendar_service import invalidate_all
+            invalidate_all()
+
+        return {
+            "cutoff": cutoff.isoformat(),
+            "moved": moved,
+            "chunks": chunks,
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+
+    @staticmethod
+    async def get_archived_bookings(session: AsyncSession, room_id: str = None, user_id: str = None,
+                                    date_from: date = None, date_to: date = None):
+        query = select(BookingArchive)
+        if room_id:
+            query = query.where(BookingArchive.room_id == room_id)
+        if user_id:
+            query = query.where(BookingArchive.user_id == user_id)
+        if date_from:
+            query = query.where(BookingArchive.date >= date_from)
+        if date_to:
+            query = query.where(BookingArchive.date <= date_to)
+        result = await session.execute(query.order_by(BookingArchive.date, BookingArchive.start_time))
+        return result.scalars().unique().all()
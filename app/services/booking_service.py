@@ -1,12 +1,62 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from datetime import datetime, date
-import uuid
+import os
 
 from app.models import Booking, User, Room
-from app.schemes.booking_schema import BookingCreateSchema
+from app.schemes.booking_schema import BookingCreateSchema, BookingUpdateSchema
 from app.exceptions.booking_exceptions import BookingNotFound, TimeSlotNotAvailable, InvalidBookingData
 from app.repositories.booking_repository import BookingRepository
+from app.services.archive_service import ArchiveService
+from app.utils.locks import booking_locks
+from app.utils.ids import new_id
+
+BOOKING_BATCH_MAX = int(os.getenv("BOOKING_BATCH_MAX", "200"))
+
+def _time(value: str) -> str:
+    # Нормализация к HH:MM: время сравнивается как строка
+    try:
+        return datetime.strptime(value, "%H:%M").strftime("%H:%M")
+    except ValueError:
+        raise InvalidBookingData("Invalid time format. Use HH:MM")
+
+def _target(booking: Booking, data: BookingUpdateSchema):
+    """Новое положение бронирования (room_id, date, start, end) с проверкой значений"""
+    new_date = booking.date
+    if data.date:
+        try:
+            new_date = datetime.strptime(data.date, "%Y-%m-%d").date()
+        except ValueError:
+            raise InvalidBookingData("Invalid date format. Use YYYY-MM-DD")
+    target = (
+        data.roomId or booking.room_id,
+        new_date,
+        _time(data.startTime) if data.startTime else booking.start_time,
+        _time(data.endTime) if data.endTime else booking.end_time
+    )
+    if target[3] <= target[2]:
+        raise InvalidBookingData("End time must be after start time")
+    old = (booking.room_id, booking.date, booking.start_time, booking.end_time)
+    if target != old and target[1] < date.today():
+        raise InvalidBookingData("Cannot move booking to a past date")
+    return target
+
+def _delta(old, new):
+    """Часть нового интервала, не покрытая старым. Старый интервал уже ни с кем не
+    пересекается, поэтому проверять нужно только добавленные отрезки"""
+    if old[:2] != new[:2] or new[3] <= old[2] or new[2] >= old[3]:
+        return [new]
+    segments = []
+    if new[2] < old[2]:
+        segments.append((*new[:2], new[2], old[2]))
+    if new[3] > old[3]:
+        segments.append((*new[:2], old[3], new[3]))
+    return segments
+
+def _overlap(a, b) -> bool:
+    return a[:2] == b[:2] and a[2] < b[3] and b[2] < a[3]
 
 class BookingService:
     @staticmethod
@@ -39,54 +89,51 @@ class BookingService:
         if not room:
             raise InvalidBookingData(f"Room with id {booking_data.room_id} not found")
         
-        # Проверяем доступность временного слота
-        conflicting_bookings = await session.execute(
-            select(Booking).where(
-                and_(
-                    Booking.room_id == booking_data.room_id,
-                    Booking.date == booking_data.date,
-                    or_(
-                        and_(
-                            Booking.start_time < booking_data.end_time,
-                            Booking.end_time > booking_data.start_time
-                        )
-                    )
-                )
-            )
-        )
-        
-        if conflicting_bookings.scalar():
-            raise TimeSlotNotAvailable(
-                f"Time slot {booking_data.start_time}-{booking_data.end_time} "
-                f"on {booking_data.date} is not available for room {room.name}"
-            )
-        
         # Проверяем, что дата не в прошлом
         if booking_data.date < date.today():
             raise InvalidBookingData("Cannot book for past dates")
         
-        # Проверяем правильность временного интервала
-        try:
-            start_dt = datetime.strptime(booking_data.start_time, "%H:%M")
-            end_dt = datetime.strptime(booking_data.end_time, "%H:%M")
-            if end_dt <= start_dt:
-                raise InvalidBookingData("End time must be after start time")
-        except ValueError:
-            raise InvalidBookingData("Invalid time format. Use HH:MM")
+        # Проверяем правильность временного интервала; храним только нормализованное "HH:MM"
+        start_time, end_time = _time(booking_data.start_time), _time(booking_data.end_time)
+        if end_time <= start_time:
+            raise InvalidBookingData("End time must be after start time")
         
-        new_booking = Booking(
-            id=f"booking_{uuid.uuid4().hex[:8]}",
-            room_id=booking_data.room_id,
-            user_id=booking_data.user_id,
-            date=booking_data.date,
-            start_time=booking_data.start_time,
-            end_time=booking_data.end_time,
-            title=booking_data.title,
-            participants=booking_data.participants
+        not_available = TimeSlotNotAvailable(
+            f"Time slot {start_time}-{end_time} "
+            f"on {booking_data.date} is not available for room {room.name}"
         )
         
-        session.add(new_booking)
-        await session.commit()
+        # Проверка доступности и вставка сериализуются по (room_id, date)
+        async with booking_locks.lock(booking_data.room_id, booking_data.date):
+            available = await BookingRepository.check_availability(
+                session,
+                booking_data.room_id,
+                booking_data.date,
+                start_time,
+                end_time
+            )
+            if not available:
+                raise not_available
+            
+            new_booking = Booking(
+                id=new_id("booking"),
+                room_id=booking_data.room_id,
+                user_id=booking_data.user_id,
+                date=booking_data.date,
+                start_time=start_time,
+                end_time=end_time,
+                title=booking_data.title,
+                participants=booking_data.participants
+            )
+            
+            session.add(new_booking)
+            try:
+                await session.commit()
+            except IntegrityError as e:
+                await session.rollback()
+                if BookingRepository.is_overlap_error(e):
+                    raise not_available
+                raise
         await session.refresh(new_booking)
         return new_booking
     
@@ -99,8 +146,99 @@ class BookingService:
         return True
     
     @staticmethod
-    async def get_user_bookings(session: AsyncSession, user_id: str):
+    def user_bookings_query(user_id: str, date_from: date = None, date_to: date = None):
+        # Индекс (user_id, date)
+        query = select(Booking).where(Booking.user_id == user_id)
+        if date_from:
+            query = query.where(Booking.date >= date_from)
+        if date_to:
+            query = query.where(Booking.date <= date_to)
+        return query
+    
+    @staticmethod
+    async def get_user_bookings(session: AsyncSession, user_id: str, date_from: date = None, date_to: date = None):
+        query = BookingService.user_bookings_query(user_id, date_from, date_to)
+        bookings = list((await session.execute(query)).scalars().all())
+        # Прошедшие бронирования старше горизонта лежат в bookings_archive
+        if await ArchiveService.reaches_archive(session, date_from):
+            bookings = list(await ArchiveService.get_archived_bookings(session, user_id=user_id, date_from=date_from,
+                                                                      date_to=date_to)) + bookings
+        return bookings
+    
+    @staticmethod
+    async def update_booking(session: AsyncSession, booking_id: str, data: BookingUpdateSchema):
+        """Перенос, изменение длительности или названия одного бронирования"""
+        return (await BookingService.update_bookings(session, [(booking_id, data)]))[0]
+    
+    @staticmethod
+    async def update_bookings(session: AsyncSession, changes):
+        """Пакетный перенос (drag-and-drop нескольких бронирований): changes - список
+        (booking_id, BookingUpdateSchema). Одна транзакция - применяются все изменения или ни одно"""
+        if len(changes) > BOOKING_BATCH_MAX:
+            raise InvalidBookingData(f"Too many bookings in one batch (max {BOOKING_BATCH_MAX})")
+        ids = [booking_id for booking_id, _ in changes]
+        if len(set(ids)) != len(ids):
+            raise InvalidBookingData("Duplicate booking id in batch")
+        
         result = await session.execute(
-            select(Booking).where(Booking.user_id == user_id)
+            select(Booking).where(Booking.id.in_(ids)).options(selectinload(Booking.user))
         )
-        return result.scalars().all()
\ No newline at end of file
+        bookings = {booking.id: booking for booking in result.scalars().all()}
+        missing = [booking_id for booking_id in ids if booking_id not in bookings]
+        if missing:
+            raise BookingNotFound(f"Booking with id {missing[0]} not found")
+        
+        plans = []
+        for booking_id, data in changes:
+            booking = bookings[booking_id]
+            if data.title is not None and not data.title.strip():
+                raise InvalidBookingData("Title cannot be empty")
+            old = (booking.room_id, booking.date, booking.start_time, booking.end_time)
+            plans.append((booking, old, _target(booking, data), data.title))
+        
+        room_ids = {new[0] for _, old, new, _ in plans if new[0] != old[0]}
+        if room_ids:
+            found = set((await session.execute(select(Room.id).where(Room.id.in_(room_ids)))).scalars().all())
+            if room_ids - found:
+                raise InvalidBookingData(f"Room with id {sorted(room_ids - found)[0]} not found")
+        
+        # Пересечения внутри пакета - в памяти
+        for i, (booking, _, new, _) in enumerate(plans):
+            for other, _, other_new, _ in plans[i + 1:]:
+                if _overlap(new, other_new):
+                    raise TimeSlotNotAvailable(f"Bookings {booking.id} and {other.id} overlap after the move")
+        
+        segments = [segment for _, old, new, _ in plans for segment in _delta(old, new)]
+        keys = {old[:2] for _, old, _, _ in plans} | {new[:2] for _, _, new, _ in plans}
+        async with booking_locks.lock_all(*keys):
+            # Остальные бронирования: один запрос по индексу только для добавленных отрезков
+            if segments:
+                conflict = (await session.execute(BookingRepository.conflicts_query(segments, ids).limit(1))).first()
+                if conflict:
+                    raise TimeSlotNotAvailable(
+                        f"Time slot {conflict.start_time}-{conflict.end_time} on {conflict.date} "
+                        f"is already booked in room {conflict.room_id}"
+                    )
+            
+            # Обмен слотами внутри пакета: триггер bookings_no_overlap_update проверяет каждую
+            # строку отдельно и увидел бы промежуточное пересечение. Сначала освобождаем
+            # старые интервалы (пустое время ни с чем не пересекается), затем ставим новые
+            if any(_overlap(new, other_old) for booking, _, new, _ in plans
+                   for other, other_old, _, _ in plans if other is not booking):
+                for booking, *_ in plans:
+                    booking.start_time = booking.end_time = ""
+                await session.flush()
+            
+            for booking, _, new, title in plans:
+                booking.room_id, booking.date, booking.start_time, booking.end_time = new
+                if title is not None:
+                    booking.title = title.strip()
+            try:
+                await session.commit()
+            except IntegrityError as e:
+                # Триггер в БД - окончательная защита (например, запись из другого процесса)
+                await session.rollback()
+                if BookingRepository.is_overlap_error(e):
+                    raise TimeSlotNotAvailable("Time slot is no longer available")
+                raise
+        return [booking for booking, *_ in plans]
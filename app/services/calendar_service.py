@@ -0,0 +1,276 @@
+from sqlalchemy import select, event, inspect, or_, literal, func
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+import hashlib
+import os
+import threading
+
+from app.models import Booking, Room, User, async_session
+from app.services.invalidation_service import on_change
+
+CALENDAR_PAST_DAYS = int(os.getenv("CALENDAR_PAST_DAYS", "30"))
+CALENDAR_FUTURE_DAYS = int(os.getenv("CALENDAR_FUTURE_DAYS", "180"))
+CALENDAR_CACHE_SIZE = int(os.getenv("CALENDAR_CACHE_SIZE", "512"))
+CALENDAR_NAME = os.getenv("APP_NAME", "Совещайка")
+
+# Версии лент: увеличиваются при любом изменении бронирований комнаты/пользователя.
+# Ключ кэша включает версию, поэтому неизменившаяся лента отдается из памяти.
+_room_versions = {}
+_owner_versions = {}
+_email_versions = {}
+_generation = [0]
+_versions_lock = threading.Lock()
+
+# LRU: ключ ленты -> готовое тело .ics
+_feed_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_counters = {"hits": 0, "misses": 0}
+_user_emails = {}
+
+def _bump(versions: dict, key):
+    if key:
+        versions[key] = versions.get(key, 0) + 1
+
+def bump_booking_versions(room_id: str = None, user_id: str = None, participants: str = None):
+    with _versions_lock:
+        _bump(_room_versions, room_id)
+        _bump(_owner_versions, user_id)
+        for email in (participants or "").split(","):
+            _bump(_email_versions, email.strip().lower())
+
+def invalidate_all():
+    """Сброс всех лент (например, после массового удаления SQL-запросом в обход ORM)"""
+    with _versions_lock:
+        _generation[0] += 1
+    with _cache_lock:
+        _feed_cache.clear()
+
+def _collect_bumps(session: Session):
+    """Затронутые ленты из изменений сессии: (room_id, user_id, participants) или None - сбросить все"""
+    bumps = []
+    for target in list(session.new) + list(session.dirty) + list(session.deleted):
+        if target in session.dirty and not session.is_modified(target):
+            continue
+        if isinstance(target, Booking):
+            bumps.append((target.room_id, target.user_id, target.participants))
+            # При переносе в другую комнату или смене владельца старая лента тоже меняется
+            bumps.extend((old_value, None, None) for old_value in _deleted_values(target, "room_id"))
+            bumps.extend((None, old_value, None) for old_value in _deleted_values(target, "user_id"))
+            bumps.extend((None, None, old_value) for old_value in _deleted_values(target, "participants"))
+        elif isinstance(target, Room) and target in session.dirty:
+            # Название комнаты есть в лентах комнаты и участников - переименование бывает редко
+            bumps.append(None)
+    return bumps
+
+# Версии меняются только после commit: лента, построенная между flush и commit,
+# видит старые строки и не должна попасть в кэш под новой версией
+@event.listens_for(Session, "after_flush")
+def _remember_bumps(session, flush_context):
+    bumps = _collect_bumps(session)
+    if bumps:
+        session.info.setdefault("calendar_bumps", []).extend(bumps)
+
+@event.listens_for(Session, "after_commit")
+def _apply_bumps(session):
+    for bump in session.info.pop("calendar_bumps", ()):
+        if bump is None:
+            invalidate_all()
+        else:
+            bump_booking_versions(*bump)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_bumps(session):
+    session.info.pop("calendar_bumps", None)
+
+# Изменения из других процессов
+@on_change("booking")
+def _remote_booking_changed(key: str):
+    room_id, user_id, participants = key.split("|", 2)
+    bump_booking_versions(room_id, user_id, participants)
+
+@on_change("room", "bulk", "reset")
+def _remote_bulk_changed(key):
+    invalidate_all()
+
+@on_change("user")
+def _remote_user_changed(user_id: str):
+    # Email пользователя мог измениться
+    _user_emails.pop(user_id, None)
+
+def _deleted_values(target, attribute: str):
+    return inspect(target).attrs[attribute].history.deleted or ()
+
+def _window(today: date = None):
+    today = today or date.today()
+    return today - timedelta(days=CALENDAR_PAST_DAYS), today + timedelta(days=CALENDAR_FUTURE_DAYS)
+
+def _escape(value: str) -> str:
+    return (value or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def _fold(line: str) -> str:
+    """Перенос строк длиннее 75 октетов (RFC 5545, 3.1)"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    current = ""
+    size = 0
+    limit = 75
+    for char in line:
+        char_size = len(char.encode("utf-8"))
+        if size + char_size > limit:
+            parts.append(current)
+            current = " "
+            size = 1
+            limit = 75
+        current += char
+        size += char_size
+    parts.append(current)
+    return "\r\n".join(parts) + "\r\n"
+
+def _format_dt(day: date, time_value: str) -> str:
+    return f"{day.strftime('%Y%m%d')}T{time_value.replace(':', '')}00"
+
+def _calendar_header(name: str) -> str:
+    return (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        "PRODID:-//Soveshchayka//Room booking//RU\r\n"
+        "CALSCALE:GREGORIAN\r\n"
+        "METHOD:PUBLISH\r\n"
+        + _fold(f"X-WR-CALNAME:{_escape(name)}")
+    )
+
+def _event(booking_id, day, start_time, end_time, title, participants, created_at, room_name) -> str:
+    stamp = (created_at or datetime.utcnow()).strftime("%Y%m%dT%H%M%SZ")
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{booking_id}@soveshchayka",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{_format_dt(day, start_time)}",
+        f"DTEND:{_format_dt(day, end_time)}",
+        f"SUMMARY:{_escape(title)}",
+    ]
+    if room_name:
+        lines.append(f"LOCATION:{_escape(room_name)}")
+    if participants:
+        lines.append(f"DESCRIPTION:{_escape('Участники: ' + participants)}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+class CalendarService:
+    @staticmethod
+    def room_feed_key(room_id: str, today: date = None):
+        window_start, _ = _window(today)
+        return ("room", room_id, _room_versions.get(room_id, 0), _generation[0], window_start.isoformat())
+
+    @staticmethod
+    async def user_feed_key(session, user_id: str, today: date = None):
+        """Ключ ленты пользователя; None - пользователь не найден"""
+        email = _user_emails.get(user_id)
+        if email is None:
+            user = await session.get(User, user_id)
+            if not user:
+                return None
+            email = _user_emails[user_id] = user.email.lower()
+        window_start, _ = _window(today)
+        return (
+            "user", user_id, _owner_versions.get(user_id, 0), _email_versions.get(email, 0),
+            _generation[0], window_start.isoformat(), email
+        )
+
+    @staticmethod
+    def etag(key) -> str:
+        return '"' + hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + '"'
+
+    @staticmethod
+    def get_cached(key):
+        with _cache_lock:
+            body = _feed_cache.get(key)
+            if body is not None:
+                _feed_cache.move_to_end(key)
+                _cache_counters["hits"] += 1
+            else:
+                _cache_counters["misses"] += 1
+            return body
+
+    @staticmethod
+    def store(key, body: bytes):
+        with _cache_lock:
+            _feed_cache[key] = body
+            _feed_cache.move_to_end(key)
+            while len(_feed_cache) > CALENDAR_CACHE_SIZE:
+                _feed_cache.popitem(last=False)
+
+    @staticmethod
+    def cache_stats():
+        return {"entries": len(_feed_cache), "maxEntries": CALENDAR_CACHE_SIZE,
+                "bytes": sum(len(body) for body in _feed_cache.values()), **_cache_counters}
+
+    @staticmethod
+    def _room_query(room_id: str, room_name: str, window_start: date, window_end: date):
+        # Индекс (room_id, date)
+        return (
+            select(Booking.id, Booking.date, Booking.start_time, Booking.end_time, Booking.title,
+                   Booking.participants, Booking.created_at, literal(room_name))
+            .where(Booking.room_id == room_id, Booking.date.between(window_start, window_end))
+            .order_by(Booking.date, Booking.start_time)
+        )
+
+    @staticmethod
+    def _user_query(user_id: str, email: str, window_start: date, window_end: date):
+        normalized = literal(",") + func.lower(func.replace(func.coalesce(Booking.participants, ""), " ", "")) + literal(",")
+        escaped = email.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return (
+            select(Booking.id, Booking.date, Booking.start_time, Booking.end_time, Booking.title,
+                   Booking.participants, Booking.created_at, Room.name)
+            .outerjoin(Room, Room.id == Booking.room_id)
+            .where(
+                Booking.date.between(window_start, window_end),
+                or_(Booking.user_id == user_id, normalized.like(f"%,{escaped},%", escape="\\"))
+            )
+            .order_by(Booking.date, Booking.start_time)
+        )
+
+    @staticmethod
+    async def stream_feed(key, calendar_name: str, query):
+        """Потоковая генерация .ics: строки идут клиенту по мере чтения курсора,
+        по окончании готовое тело кладется в кэш"""
+        chunks = []
+        header = _calendar_header(calendar_name).encode("utf-8")
+        chunks.append(header)
+        yield header
+
+        async with async_session() as session:
+            result = await session.stream(query.execution_options(yield_per=500))
+            async for row in result:
+                chunk = _event(*row).encode("utf-8")
+                chunks.append(chunk)
+                yield chunk
+
+        footer = b"END:VCALENDAR\r\n"
+        chunks.append(footer)
+        yield footer
+        CalendarService.store(key, b"".join(chunks))
+
+    @staticmethod
+    async def room_feed(session, room_id: str, key):
+        """Генератор ленты комнаты; None - комната не найдена"""
+        room = await session.get(Room, room_id)
+        if not room:
+            return None
+        window_start, window_end = _window()
+        return CalendarService.stream_feed(
+            key, f"{CALENDAR_NAME}: {room.name}",
+            CalendarService._room_query(room_id, room.name, window_start, window_end)
+        )
+
+    @staticmethod
+    def user_feed(user_id: str, key):
+        email = key[-1]
+        window_start, window_end = _window()
+        return CalendarService.stream_feed(
+            key, f"{CALENDAR_NAME}: {email}",
+            CalendarService._user_query(user_id, email, window_start, window_end)
+        )
@@ -0,0 +1,88 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+import asyncio
+import os
+import time
+
+from app.models import Booking, BookingArchive, Room, User
+from app.services.invalidation_service import publish
+
+DELETE_CHUNK_SIZE = int(os.getenv("DELETE_CHUNK_SIZE", "5000"))
+# Пауза между чанками: другие запросы на запись успевают получить блокировку
+DELETE_CHUNK_PAUSE_MS = float(os.getenv("DELETE_CHUNK_PAUSE_MS", "10"))
+
+# Владелец -> (модель, колонка бронирований)
+_OWNERS = {
+    "room": (Room, "room_id"),
+    "user": (User, "user_id"),
+}
+
+class DeletionService:
+    """Удаление пользователя или комнаты вместе с бронированиями SQL-запросами по множеству.
+    ORM-каскад загружал все бронирования в память и удалял их по одному в одной транзакции"""
+
+    @staticmethod
+    async def _delete_chunk(session: AsyncSession, model, column: str, owner_id: str, chunk_size: int) -> int:
+        ids = select(model.id).where(getattr(model, column) == owner_id).limit(chunk_size).scalar_subquery()
+        result = await session.execute(delete(model).where(model.id.in_(ids)))
+        return result.rowcount or 0
+
+    @staticmethod
+    def _invalidate_local():
+        # Локальные кэши: календарные ленты и граница архива
+        from app.services.calendar_service import invalidate_all
+        from app.services.archive_service import ArchiveService
+        invalidate_all()
+        ArchiveService.reset_cache()
+
+    @staticmethod
+    async def delete_owner(session: AsyncSession, kind: str, owner_id: str, chunk_size: int = DELETE_CHUNK_SIZE,
+                           progress=None):
+        """Удаление комнаты (kind="room") или пользователя (kind="user").
+        Бронирования и архив удаляются чанками, каждый чанк - своя короткая транзакция
+        с записью "bulk" в change_log; сам владелец - последней транзакцией вместе
+        с остатком бронирований и архива.
+        None - владелец не найден"""
+        model, column = _OWNERS[kind]
+        if await session.scalar(select(model.id).where(model.id == owner_id)) is None:
+            return None
+
+        started = time.perf_counter()
+        stats = {"kind": kind, "id": owner_id, "bookings": 0, "archived": 0, "chunks": 0}
+        for table, counter in ((Booking, "bookings"), (BookingArchive, "archived")):
+            while True:
+                deleted = await DeletionService._delete_chunk(session, table, column, owner_id, chunk_size)
+                if not deleted:
+                    await session.commit()
+                    break
+                # Удаленные бронирования не должны отдаваться из кэшей до конца удаления
+                await publish(session, "bulk", commit=False)
+                await session.commit()
+                DeletionService._invalidate_local()
+                stats[counter] += deleted
+                stats["chunks"] += 1
+                if progress:
+                    progress(dict(stats))
+                if deleted < chunk_size:
+                    break
+                if DELETE_CHUNK_PAUSE_MS > 0:
+                    await asyncio.sleep(DELETE_CHUNK_PAUSE_MS / 1000)
+
+        # Бронирования, созданные или заархивированные за время удаления, уходят вместе с владельцем
+        stats["bookings"] += (await session.execute(
+            delete(Booking).where(getattr(Booking, column) == owner_id)
+        )).rowcount or 0
+        stats["archived"] += (await session.execute(
+            delete(BookingArchive).where(getattr(BookingArchive, column) == owner_id)
+        )).rowcount or 0
+        await session.execute(delete(model).where(model.id == owner_id))
+        # Запись в обход ORM: другие процессы сбрасывают кэши по change_log
+        await publish(session, kind, owner_id, commit=False)
+        await publish(session, "bulk", commit=False)
+        await session.commit()
+        DeletionService._invalidate_local()
+
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        if progress:
+            progress(dict(stats))
+        return stats
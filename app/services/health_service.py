@@ -0,0 +1,97 @@
+from sqlalchemy import text
+import asyncio
+import os
+import time
+
+from app.models import engine
+from app.utils.locks import booking_locks
+from app.utils.loop_lag import loop_lag_monitor
+
+# Пороги готовности: при превышении любого /ready отвечает 503, и балансировщик
+# перестает направлять запросы в этот процесс
+READY_DB_TIMEOUT_MS = float(os.getenv("READY_DB_TIMEOUT_MS", "1000"))
+READY_DB_MAX_MS = float(os.getenv("READY_DB_MAX_MS", "250"))
+READY_LOOP_LAG_MS = float(os.getenv("READY_LOOP_LAG_MS", "500"))
+READY_WRITER_QUEUE_MAX = int(os.getenv("READY_WRITER_QUEUE_MAX", "50"))
+
+_inflight_probe = [None]
+
+class HealthService:
+    @staticmethod
+    async def probe_db():
+        """Получение соединения из пула и SELECT по sqlite_master с таймаутом.
+        Голый SELECT 1 в SQLite не читает файл и не заметит заблокированную БД"""
+        timings = {}
+
+        async def probe():
+            started = time.perf_counter()
+            async with engine.connect() as conn:
+                acquired = time.perf_counter()
+                timings["acquireMs"] = round((acquired - started) * 1000, 2)
+                await conn.execute(text("SELECT 1 FROM sqlite_master LIMIT 1"))
+                timings["queryMs"] = round((time.perf_counter() - acquired) * 1000, 2)
+
+        started = time.perf_counter()
+        task = _inflight_probe[0]
+        if task is not None and not task.done():
+            # Предыдущая проверка еще висит на БД - новую не начинаем, чтобы не занимать пул
+            return {"ok": False, "latencyMs": 0.0, "error": "previous probe still running"}
+
+        task = _inflight_probe[0] = asyncio.ensure_future(probe())
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        # Зависшую проверку не отменяем и не ждем: выход из engine.connect() ждал бы ту же блокировку
+        done, _ = await asyncio.wait({task}, timeout=READY_DB_TIMEOUT_MS / 1000)
+        if not done:
+            error = f"timeout after {READY_DB_TIMEOUT_MS:.0f} ms"
+        else:
+            error = str(task.exception()) if task.exception() else None
+        return {"ok": error is None, "latencyMs": round((time.perf_counter() - started) * 1000, 2),
+                "error": error, **timings}
+
+    @staticmethod
+    def pool_stats():
+        pool = engine.pool
+        stats = {"class": type(pool).__name__}
+        if hasattr(pool, "checkedout"):
+            size, max_overflow = pool.size(), getattr(pool, "_max_overflow", 0)
+            stats.update({
+                "size": size,
+                "maxOverflow": max_overflow,
+                "checkedOut": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "timeout": pool.timeout(),
+                # Все соединения выданы - новые запросы ждут освобождения
+                "exhausted": max_overflow >= 0 and pool.checkedout() >= size + max_overflow
+            })
+        return stats
+
+    @staticmethod
+    async def readiness():
+        """Отчет о готовности и список нарушенных порогов"""
+        db = await HealthService.probe_db()
+        pool = HealthService.pool_stats()
+        loop_lag = loop_lag_monitor.stats()
+        writers = booking_locks.stats()
+
+        failures = []
+        if not db["ok"]:
+            failures.append(f"db: {db['error']}")
+        elif db["latencyMs"] > READY_DB_MAX_MS:
+            failures.append(f"db latency {db['latencyMs']} ms > {READY_DB_MAX_MS:.0f} ms")
+        if pool.get("exhausted"):
+            failures.append("connection pool exhausted")
+        if loop_lag["lastMs"] > READY_LOOP_LAG_MS:
+            failures.append(f"event loop lag {loop_lag['lastMs']} ms > {READY_LOOP_LAG_MS:.0f} ms")
+        if writers["waiting"] > READY_WRITER_QUEUE_MAX:
+            failures.append(f"writer queue {writers['waiting']} > {READY_WRITER_QUEUE_MAX}")
+
+        return {
+            "status": "ready" if not failures else "unavailable",
+            "failures": failures,
+            "pid": os.getpid(),
+            "db": db,
+            "pool": pool,
+            "eventLoop": loop_lag,
+            "writerQueue": writers,
+        }
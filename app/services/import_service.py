@@ -0,0 +1,312 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, and_, or_
+from sqlalchemy.exc import IntegrityError
+from collections import defaultdict
+from datetime import datetime
+import asyncio
+import bisect
+import csv
+import time
+
+from app.models import Booking, Room, User
+from app.utils.ids import new_id
+from app.utils.intervals import to_minutes, from_minutes, merge_intervals
+
+IMPORT_CHUNK_SIZE = 5000
+# Запрос занятых интервалов: комнат (слагаемых OR) и пар (комната, дата) на запрос.
+# Глубина выражения в SQLite ограничена 1000, число параметров - 32766
+EXISTING_ROOMS_PER_QUERY = 200
+EXISTING_KEYS_PER_QUERY = 5000
+MAX_ERROR_SAMPLES = 50
+
+class ImportRowError(ValueError):
+    pass
+
+def iter_csv(lines):
+    """Строки CSV: room, email, date (YYYY-MM-DD), start_time, end_time, title, participants (через ;)"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield {
+            "room": (row.get("room") or "").strip(),
+            "email": (row.get("email") or row.get("user") or "").strip(),
+            "date": (row.get("date") or "").strip(),
+            "start_time": (row.get("start_time") or "").strip(),
+            "end_time": (row.get("end_time") or "").strip(),
+            "title": (row.get("title") or "").strip(),
+            "participants": [p.strip() for p in (row.get("participants") or "").split(";") if p.strip()]
+        }
+
+def _unfold(lines):
+    """Склейка перенесенных строк iCalendar (продолжение начинается с пробела или табуляции)"""
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+def _ics_unescape(value: str) -> str:
+    return value.replace("\\n", "\n").replace("\\N", "\n").replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\")
+
+def _ics_mailto(value: str) -> str:
+    return value[7:] if value.lower().startswith("mailto:") else value
+
+def iter_ics(lines):
+    """События VEVENT: LOCATION - комната, ORGANIZER - владелец, ATTENDEE - участники"""
+    event = None
+    for line in _unfold(lines):
+        if line == "BEGIN:VEVENT":
+            event = {"participants": []}
+            continue
+        if event is None:
+            continue
+        if line == "END:VEVENT":
+            start = event.get("DTSTART", "")
+            end = event.get("DTEND", "")
+            yield {
+                "room": event.get("LOCATION", ""),
+                "email": event.get("ORGANIZER", ""),
+                "date": f"{start[0:4]}-{start[4:6]}-{start[6:8]}" if len(start) >= 8 else "",
+                "start_time": f"{start[9:11]}:{start[11:13]}" if len(start) >= 13 else "",
+                "end_time": f"{end[9:11]}:{end[11:13]}" if len(end) >= 13 and end[:8] == start[:8] else "",
+                "title": event.get("SUMMARY", ""),
+                "participants": event["participants"]
+            }
+            event = None
+            continue
+        name, _, value = line.partition(":")
+        name = name.split(";", 1)[0].upper()
+        if name in ("DTSTART", "DTEND"):
+            event[name] = value.strip()
+        elif name in ("SUMMARY", "LOCATION"):
+            event[name] = _ics_unescape(value).strip()
+        elif name == "ORGANIZER":
+            event[name] = _ics_mailto(value.strip())
+        elif name == "ATTENDEE":
+            event["participants"].append(_ics_mailto(value.strip()))
+
+def _chunks(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _is_free(intervals, start: int, end: int) -> bool:
+    position = bisect.bisect_left(intervals, (end,))
+    return position == 0 or intervals[position - 1][1] <= start
+
+class ImportService:
+    @staticmethod
+    async def load_lookups(session: AsyncSession):
+        """Справочники для сопоставления: комнаты по id и названию, пользователи по id и email"""
+        rooms = {}
+        for room_id, name in (await session.execute(select(Room.id, Room.name))).all():
+            rooms[room_id.lower()] = room_id
+            rooms[name.strip().lower()] = room_id
+        users = {}
+        for user_id, email in (await session.execute(select(User.id, User.email))).all():
+            users[user_id.lower()] = user_id
+            users[email.strip().lower()] = user_id
+        return rooms, users
+
+    @staticmethod
+    def _resolve(row: dict, rooms: dict, users: dict) -> dict:
+        room_id = rooms.get(row["room"].lower())
+        if not room_id:
+            raise ImportRowError(f"Unknown room '{row['room']}'")
+        user_id = users.get(row["email"].lower())
+        if not user_id:
+            raise ImportRowError(f"Unknown user '{row['email']}'")
+        try:
+            booking_date = datetime.strptime(row["date"], "%Y-%m-%d").date()
+            start, end = to_minutes(row["start_time"]), to_minutes(row["end_time"])
+        except ValueError:
+            raise ImportRowError("Invalid date or time")
+        if not 0 <= start < 24 * 60 or not 0 < end <= 24 * 60:
+            raise ImportRowError("Invalid date or time")
+        if end <= start:
+            raise ImportRowError("End time must be after start time")
+        return {
+            "room_id": room_id,
+            "user_id": user_id,
+            "date": booking_date,
+            # Хранится каноническое "HH:MM": триггер и проверки занятости сравнивают строки
+            "start_time": from_minutes(start),
+            "end_time": from_minutes(end),
+            "start": start,
+            "end": end,
+            "title": (row["title"] or "Импортированное бронирование")[:255],
+            "participants": ",".join(row["participants"])
+        }
+
+    @staticmethod
+    async def _existing_intervals(session: AsyncSession, keys):
+        """Уже занятые интервалы только для пар (комната, дата) из чанка - по индексу (room_id, date).
+        Диапазон дат чанка не используется: в неотсортированной выгрузке это вся история"""
+        dates_by_room = defaultdict(list)
+        for room_id, booking_date in sorted(keys):
+            dates_by_room[room_id].append(booking_date)
+
+        batches, batch, size = [], [], 0
+        for room_id, dates in dates_by_room.items():
+            if batch and (len(batch) >= EXISTING_ROOMS_PER_QUERY or size + len(dates) > EXISTING_KEYS_PER_QUERY):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append((room_id, dates))
+            size += len(dates)
+        if batch:
+            batches.append(batch)
+
+        existing = defaultdict(list)
+        for batch in batches:
+            # OR по комнатам: каждое слагаемое - поиск по индексу (room_id = ? AND date IN (...));
+            # (room_id, date) IN (VALUES ...) SQLite выполняет полным просмотром
+            result = await session.execute(
+                select(Booking.room_id, Booking.date, Booking.start_time, Booking.end_time).where(or_(*(
+                    and_(Booking.room_id == room_id, Booking.date.in_(dates)) for room_id, dates in batch
+                )))
+            )
+            for room_id, booking_date, start_time, end_time in result.all():
+                existing[(room_id, booking_date)].append((to_minutes(start_time), to_minutes(end_time)))
+        return {key: [tuple(i) for i in merge_intervals(sorted(v))] for key, v in existing.items()}
+
+    @staticmethod
+    def _sweep(bookings, existing):
+        """Сортировка по (комната, дата, начало) и проход: строка принимается, если не пересекается
+        ни с уже принятыми строками чанка, ни с бронированиями в БД"""
+        bookings.sort(key=lambda b: (b["room_id"], b["date"], b["start"]))
+        accepted = []
+        conflicts = 0
+        last_key = None
+        last_end = 0
+        for booking in bookings:
+            key = (booking["room_id"], booking["date"])
+            if key != last_key:
+                last_key = key
+                last_end = 0
+            if booking["start"] < last_end or not _is_free(existing.get(key, ()), booking["start"], booking["end"]):
+                conflicts += 1
+                continue
+            last_end = booking["end"]
+            accepted.append(booking)
+        return accepted, conflicts
+
+    @staticmethod
+    async def import_rows(session: AsyncSession, rows, chunk_size: int = IMPORT_CHUNK_SIZE, dry_run: bool = False,
+                          progress=None):
+        """Потоковый импорт: строки читаются и обрабатываются чанками, в памяти - один чанк.
+        Чтение и разбор файла идут в потоке, цикл событий не блокируется.
+
+        Пробный режим (dry_run) не потоковый: принятые интервалы не пишутся в БД и
+        хранятся в памяти (слитыми по паре комната-дата), чтобы следующие чанки видели
+        их как занятые - память растет с числом различных пар (комната, дата) в файле"""
+        started = time.perf_counter()
+        rooms, users = await ImportService.load_lookups(session)
+        stats = {"read": 0, "imported": 0, "conflicts": 0, "errors": 0, "errorSamples": []}
+        pending = {} if dry_run else None
+
+        chunks = _chunks(rows, chunk_size)
+        while True:
+            # Блокирующее чтение (UploadFile, файл на диске) и разбор строк - в потоке
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            bookings = []
+            for row in chunk:
+                stats["read"] += 1
+                try:
+                    bookings.append(ImportService._resolve(row, rooms, users))
+                except ImportRowError as e:
+                    stats["errors"] += 1
+                    if len(stats["errorSamples"]) < MAX_ERROR_SAMPLES:
+                        stats["errorSamples"].append({"row": stats["read"], "error": str(e)})
+            if not bookings:
+                continue
+
+            keys = {(b["room_id"], b["date"]) for b in bookings}
+            existing = await ImportService._existing_intervals(session, keys)
+            if pending:
+                for key in keys & pending.keys():
+                    existing[key] = [tuple(i) for i in merge_intervals(sorted(existing.get(key, []) + pending[key]))]
+            accepted, conflicts = ImportService._sweep(bookings, existing)
+            stats["conflicts"] += conflicts
+
+            if accepted and not dry_run:
+                values = [{
+                    "id": new_id("booking"),
+                    "room_id": b["room_id"],
+                    "user_id": b["user_id"],
+                    "date": b["date"],
+                    "start_time": b["start_time"],
+                    "end_time": b["end_time"],
+                    "title": b["title"],
+                    "participants": b["participants"],
+                    "created_at": datetime.utcnow()
+                } for b in accepted]
+                try:
+                    # Пакетная вставка одним executemany в одной транзакции на чанк
+                    await session.execute(insert(Booking), values)
+                    await session.commit()
+                except IntegrityError:
+                    # Параллельная запись заняла слот - вставляем чанк построчно, пропуская конфликты
+                    await session.rollback()
+                    inserted = 0
+                    for value in values:
+                        try:
+                            await session.execute(insert(Booking), [value])
+                            await session.commit()
+                            inserted += 1
+                        except IntegrityError:
+                            await session.rollback()
+                            stats["conflicts"] += 1
+                    stats["imported"] += inserted
+                else:
+                    stats["imported"] += len(accepted)
+            elif dry_run:
+                added = defaultdict(list)
+                for b in accepted:
+                    added[(b["room_id"], b["date"])].append((b["start"], b["end"]))
+                # Смежные и пересекающиеся интервалы сливаются - на пару хранится минимум отрезков
+                for key, intervals in added.items():
+                    pending[key] = [tuple(i) for i in merge_intervals(sorted(pending.get(key, []) + intervals))]
+                stats["imported"] += len(accepted)
+
+            if progress:
+                progress(stats)
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 3)
+        stats["rowsPerSecond"] = round(stats["read"] / elapsed) if elapsed > 0 else stats["read"]
+        stats["dryRun"] = dry_run
+
+        if stats["imported"] and not dry_run:
+            # Вставка шла через Core в обход событий ORM - сбрасываем кэш календарных лент
+            # здесь и сообщаем другим процессам
+            from app.services.calendar_service import invalidate_all
+            from app.services.invalidation_service import publish
+            invalidate_all()
+            await publish(session, "bulk")
+        return stats
+
+    @staticmethod
+    def parse(lines, file_format: str):
+        if file_format == "csv":
+            return iter_csv(lines)
+        if file_format == "ics":
+            return iter_ics(lines)
+        raise ValueError("Supported formats: csv, ics")
+
+    @staticmethod
+    def detect_format(filename: str, file_format: str = None) -> str:
+        if file_format:
+            return file_format.lower()
+        return "ics" if (filename or "").lower().endswith(".ics") else "csv"
@@ -0,0 +1,134 @@
+from sqlalchemy import select, func, text
+from datetime import date, timedelta
+import os
+
+from app.models import engine, async_session, Room, User
+from app.repositories.booking_repository import BookingRepository
+from app.services.booking_service import BookingService
+
+# Горячие запросы: имя -> построитель по образцовым значениям. Запросы строятся
+# теми же функциями, что и в рабочем коде, поэтому план совпадает с реальным.
+HOT_QUERIES = {
+    "conflict_check": lambda sample: BookingRepository.availability_query(
+        sample["room_id"], sample["date"], "10:00", "11:00"
+    ),
+    "update_delta_check": lambda sample: BookingRepository.conflicts_query(
+        [(sample["room_id"], sample["date"], "09:00", "10:00"), (sample["room_id"], sample["date"], "11:00", "12:00")],
+        ["booking"]
+    ).limit(1),
+    "date_listing": lambda sample: BookingRepository.bookings_by_date_query(sample["date"]),
+    "user_bookings": lambda sample: BookingService.user_bookings_query(
+        sample["user_id"], sample["date"], sample["date"] + timedelta(days=30)
+    ),
+}
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _db_path():
+    path = engine.url.database
+    if engine.url.get_backend_name() != "sqlite" or not path or path == ":memory:":
+        return None
+    return path
+
+class IntrospectionService:
+    @staticmethod
+    async def tables(conn):
+        """Число строк по каждой таблице"""
+        names = (await conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        ))).scalars().all()
+        return {name: (await conn.execute(text(f"SELECT count(*) FROM {_quote(name)}"))).scalar() for name in names}
+
+    @staticmethod
+    async def pages(conn):
+        """Страницы и байты по таблицам и индексам; None - SQLite собран без dbstat"""
+        try:
+            rows = (await conn.execute(text(
+                "SELECT name, count(*), sum(pgsize), sum(unused) FROM dbstat GROUP BY name ORDER BY sum(pgsize) DESC"
+            ))).all()
+        except Exception:
+            return None
+        return {name: {"pages": pages, "bytes": size, "unusedBytes": unused} for name, pages, size, unused in rows}
+
+    @staticmethod
+    async def indexes(conn):
+        """Индексы по таблицам: колонки, уникальность и статистика ANALYZE (sqlite_stat1)"""
+        rows = (await conn.execute(text(
+            "SELECT m.tbl_name, m.name, m.sql IS NULL, ii.name "
+            "FROM sqlite_master m, pragma_index_info(m.name) ii "
+            "WHERE m.type = 'index' ORDER BY m.tbl_name, m.name, ii.seqno"
+        ))).all()
+        try:
+            stat = dict((await conn.execute(text("SELECT idx, stat FROM sqlite_stat1 WHERE idx IS NOT NULL"))).all())
+        except Exception:
+            stat = {}
+
+        tables = {}
+        for table, index, automatic, column in rows:
+            entries = tables.setdefault(table, {})
+            entry = entries.setdefault(index, {"name": index, "columns": [], "automatic": bool(automatic),
+                                               "stat": stat.get(index)})
+            entry["columns"].append(column)
+        return {table: list(entries.values()) for table, entries in tables.items()}
+
+    @staticmethod
+    async def storage(conn):
+        """Размер файла и WAL, настройки страничного кэша SQLite"""
+        report = {}
+        for pragma in ("journal_mode", "page_size", "page_count", "freelist_count", "cache_size", "mmap_size"):
+            report[pragma] = (await conn.execute(text(f"PRAGMA {pragma}"))).scalar()
+        cache_size = report["cache_size"]
+        # Отрицательное значение cache_size - размер в КиБ, положительное - в страницах
+        report["cacheBytes"] = -cache_size * 1024 if cache_size < 0 else cache_size * report["page_size"]
+        path = _db_path()
+        report["path"] = path
+        report["fileBytes"] = os.path.getsize(path) if path and os.path.exists(path) else None
+        report["walBytes"] = os.path.getsize(path + "-wal") if path and os.path.exists(path + "-wal") else 0
+        return report
+
+    @staticmethod
+    async def sample_values(session):
+        """Реальные идентификаторы для построения горячих запросов"""
+        return {
+            "room_id": await session.scalar(select(func.min(Room.id))) or "room",
+            "user_id": await session.scalar(select(func.min(User.id))) or "user",
+            "date": date.today(),
+        }
+
+    @staticmethod
+    async def query_plans(session):
+        """EXPLAIN QUERY PLAN для реестра горячих запросов"""
+        sample = await IntrospectionService.sample_values(session)
+        conn = await session.connection()
+        plans = {}
+        for name, build in HOT_QUERIES.items():
+            compiled = build(sample).compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+            statement = str(compiled)
+            try:
+                rows = (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement)).all()
+                plan = [row[-1] for row in rows]
+            except Exception as e:
+                plan = [f"explain failed: {e}"]
+            plans[name] = {
+                "sql": " ".join(statement.split()),
+                "plan": plan,
+                # SCAN без индекса по таблице - полный перебор строк
+                "fullScan": any(step.startswith("SCAN") and "INDEX" not in step for step in plan)
+            }
+        return plans
+
+    @staticmethod
+    async def report():
+        from app.services.calendar_service import CalendarService
+
+        async with async_session() as session:
+            conn = await session.connection()
+            return {
+                "storage": await IntrospectionService.storage(conn),
+                "rowCounts": await IntrospectionService.tables(conn),
+                "pages": await IntrospectionService.pages(conn),
+                "indexes": await IntrospectionService.indexes(conn),
+                "queryPlans": await IntrospectionService.query_plans(session),
+                "caches": {"calendarFeeds": CalendarService.cache_stats()},
+            }
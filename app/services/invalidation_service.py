@@ -0,0 +1,175 @@
+"""
+Сброс кэшей в памяти между процессами-воркерами без внешнего брокера.
+
+Каждый flush сессии, затрагивающий бронирования, комнаты, пользователей или
+роли, добавляет строки в change_log в той же транзакции. Каждый процесс держит
+отдельное соединение sqlite3 и раз в CHANGE_POLL_INTERVAL проверяет
+PRAGMA data_version - число меняется, только когда другое соединение
+зафиксировало транзакцию, и проверка почти ничего не стоит. При изменении
+читаются новые строки журнала и вызываются обработчики, зарегистрированные
+владельцами кэшей через on_change(topic). Свои изменения процесс пропускает:
+локальные кэши обновляются сразу в месте записи.
+"""
+from sqlalchemy import event, inspect, insert, delete
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import asyncio
+import inspect as pyinspect
+import os
+import sqlite3
+import traceback
+
+from app.models import engine, Booking, Room, User, Role, ChangeLog
+
+CHANGE_POLL_INTERVAL = float(os.getenv("CHANGE_POLL_INTERVAL", "0.05"))
+CHANGE_LOG_TTL_SECONDS = int(os.getenv("CHANGE_LOG_TTL_SECONDS", "3600"))
+
+# Темы: booking (ключ "room_id|user_id|participants"), room, user, role (ключ - id),
+# bulk (массовые изменения бронирований в обход ORM), reset (сброс демо-данных)
+_handlers = {}
+
+def on_change(*topics):
+    """Регистрация обработчика изменений из других процессов; обработчик получает ключ"""
+    def decorator(func):
+        for topic in topics:
+            _handlers.setdefault(topic, []).append(func)
+        return func
+    return decorator
+
+def current_origin() -> str:
+    # После fork у воркеров разные pid, поэтому значение не кэшируется при импорте
+    return str(os.getpid())
+
+def _booking_key(room_id, user_id, participants) -> str:
+    return f"{room_id or ''}|{user_id or ''}|{participants or ''}"
+
+def _history(target, attribute: str):
+    return inspect(target).attrs[attribute].history.deleted or ()
+
+def _collect_changes(session: Session):
+    changes = set()
+    for target in list(session.new) + list(session.dirty) + list(session.deleted):
+        if target in session.dirty and not session.is_modified(target):
+            continue
+        if isinstance(target, Booking):
+            changes.add(("booking", _booking_key(target.room_id, target.user_id, target.participants)))
+            old_values = [_history(target, a) for a in ("room_id", "user_id", "participants")]
+            if any(old_values):
+                changes.add(("booking", _booking_key(*(v[0] if v else None for v in old_values))))
+        elif isinstance(target, Room):
+            changes.add(("room", target.id))
+        elif isinstance(target, User):
+            changes.add(("user", target.id))
+        elif isinstance(target, Role):
+            changes.add(("role", str(target.id)))
+    return changes
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session, flush_context):
+    changes = _collect_changes(session)
+    if changes:
+        origin = current_origin()
+        now = datetime.utcnow()
+        session.connection().execute(insert(ChangeLog), [
+            {"topic": topic, "key": key, "origin": origin, "created_at": now} for topic, key in changes
+        ])
+
+async def publish(session, topic: str, key: str = None, commit: bool = True):
+    """Запись об изменении, сделанном в обход ORM (Core insert/delete, сырой SQL)"""
+    await session.execute(insert(ChangeLog).values(topic=topic, key=key, origin=current_origin()))
+    if commit:
+        await session.commit()
+
+async def purge_change_log(session, ttl_seconds: int = CHANGE_LOG_TTL_SECONDS) -> int:
+    threshold = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+    result = await session.execute(delete(ChangeLog).where(ChangeLog.created_at < threshold))
+    await session.commit()
+    return result.rowcount or 0
+
+class ChangeWatcher:
+    def __init__(self, poll_interval: float = CHANGE_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._conn = None
+        self._task = None
+        self._data_version = None
+        self._last_id = 0
+        self.applied = 0
+        self.polls = 0
+
+    def _connect(self):
+        path = engine.url.database
+        if engine.url.get_backend_name() != "sqlite" or not path or path == ":memory:":
+            return None
+        # Автокоммит: между опросами не остается открытой читающей транзакции
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        self._last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM change_log").fetchone()[0]
+        return conn
+
+    def start(self):
+        if self._task:
+            return
+        self._conn = self._connect()
+        if self._conn is None:
+            print("⚠️ Сброс кэшей между процессами недоступен: БД не файловая SQLite")
+            return
+        self._task = asyncio.create_task(self._loop(), name="change-watcher")
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    def _poll(self):
+        """Новые записи журнала из других процессов; пустой список - изменений не было"""
+        self.polls += 1
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return []
+        self._data_version = data_version
+        rows = self._conn.execute(
+            "SELECT id, topic, key, origin FROM change_log WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        if rows:
+            self._last_id = rows[-1][0]
+        else:
+            # Журнал пересоздан (сброс данных) - начинаем с текущего конца
+            self._last_id = min(self._last_id, self._conn.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM change_log").fetchone()[0])
+        origin = current_origin()
+        # Повторы одной и той же пары (тема, ключ) обрабатываются один раз
+        return list(dict.fromkeys((topic, key) for _, topic, key, row_origin in rows if row_origin != origin))
+
+    async def _apply(self, changes):
+        for topic, key in changes:
+            for handler in _handlers.get(topic, ()):
+                try:
+                    result = handler(key)
+                    if pyinspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    print(f"❌ Ошибка сброса кэша ({topic}, {key}): {e}")
+                    traceback.print_exc()
+            self.applied += 1
+
+    async def _loop(self):
+        while True:
+            try:
+                # В потоке: при заблокированной БД sqlite3 ждет busy timeout, цикл событий не должен
+                changes = await asyncio.to_thread(self._poll)
+                if changes:
+                    await self._apply(changes)
+            except sqlite3.Error as e:
+                print(f"❌ Ошибка опроса change_log: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> dict:
+        return {"running": self._task is not None, "pollInterval": self.poll_interval,
+                "lastId": self._last_id, "applied": self.applied, "polls": self.polls,
+                "topics": sorted(_handlers)}
+
+change_watcher = ChangeWatcher()
@@ -0,0 +1,123 @@
+from sqlalchemy import select, func, text
+import os
+
+from app.models import engine, async_session, User, Room
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.utils.idempotency import IDEMPOTENCY_TTL_SECONDS
+from app.utils.scheduler import Scheduler
+from app.services.invalidation_service import purge_change_log
+
+MAINTENANCE_ENABLED = os.getenv("MAINTENANCE_ENABLED", "True").lower() == "true"
+MAINTENANCE_JITTER = float(os.getenv("MAINTENANCE_JITTER", "0.1"))
+MAINTENANCE_INITIAL_DELAY = float(os.getenv("MAINTENANCE_INITIAL_DELAY", "60"))
+# Интервалы в секундах; 0 - задача отключена
+OPTIMIZE_INTERVAL = float(os.getenv("MAINTENANCE_OPTIMIZE_INTERVAL", str(60 * 60)))
+ANALYZE_INTERVAL = float(os.getenv("MAINTENANCE_ANALYZE_INTERVAL", str(24 * 60 * 60)))
+VACUUM_INTERVAL = float(os.getenv("MAINTENANCE_VACUUM_INTERVAL", str(6 * 60 * 60)))
+VACUUM_PAGES = int(os.getenv("MAINTENANCE_VACUUM_PAGES", "1000"))
+CHECKPOINT_INTERVAL = float(os.getenv("MAINTENANCE_CHECKPOINT_INTERVAL", str(5 * 60)))
+RECONCILE_INTERVAL = float(os.getenv("MAINTENANCE_RECONCILE_INTERVAL", str(15 * 60)))
+WARM_INTERVAL = float(os.getenv("MAINTENANCE_WARM_INTERVAL", str(10 * 60)))
+WARM_ROOMS_LIMIT = int(os.getenv("MAINTENANCE_WARM_ROOMS", "50"))
+
+async def _pragma(statement: str):
+    async with engine.connect() as conn:
+        result = await conn.execute(text(statement))
+        return result.fetchall()
+
+class MaintenanceService:
+    @staticmethod
+    async def optimize():
+        await _pragma("PRAGMA optimize")
+        return {"status": "ok"}
+
+    @staticmethod
+    async def analyze():
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE"))
+        return {"status": "ok"}
+
+    @staticmethod
+    async def incremental_vacuum():
+        # Работает только при auto_vacuum = INCREMENTAL (2); перевод существующей БД
+        # в этот режим требует полного VACUUM, поэтому здесь он не делается
+        auto_vacuum = (await _pragma("PRAGMA auto_vacuum"))[0][0]
+        free_pages = (await _pragma("PRAGMA freelist_count"))[0][0]
+        if auto_vacuum != 2:
+            return {"status": "skipped", "reason": "auto_vacuum is not INCREMENTAL", "freePages": free_pages}
+        await _pragma(f"PRAGMA incremental_vacuum({int(VACUUM_PAGES)})")
+        return {"status": "ok", "freePagesBefore": free_pages,
+                "freePagesAfter": (await _pragma("PRAGMA freelist_count"))[0][0]}
+
+    @staticmethod
+    async def wal_checkpoint():
+        journal_mode = (await _pragma("PRAGMA journal_mode"))[0][0]
+        if str(journal_mode).lower() != "wal":
+            return {"status": "skipped", "reason": f"journal_mode is {journal_mode}"}
+        # PASSIVE не ждет читателей и писателей - безопасно на работающем приложении
+        busy, log_frames, checkpointed = (await _pragma("PRAGMA wal_checkpoint(PASSIVE)"))[0]
+        return {"status": "ok", "busy": busy, "logFrames": log_frames, "checkpointed": checkpointed}
+
+    @staticmethod
+    async def reconcile():
+        """Сверка производного состояния в памяти с БД: индексы поиска пользователей и комнат
+        перестраиваются при расхождении; заодно удаляются просроченные ключи идемпотентности
+        и старые записи change_log"""
+        from app.services.user_service import UserService, user_search_index
+        from app.services.room_service import RoomService, room_search_index
+        from app.services.archive_service import ArchiveService
+
+        report = {}
+        async with async_session() as session:
+            users_count = (await session.execute(select(func.count(User.id)))).scalar() or 0
+            if users_count != len(user_search_index):
+                await UserService.load_search_index(session)
+                report["usersIndexRebuilt"] = True
+            rooms_count = (await session.execute(select(func.count(Room.id)))).scalar() or 0
+            if rooms_count != len(room_search_index):
+                await RoomService.load_search_index(session)
+                report["roomsIndexRebuilt"] = True
+            # Архив мог пополниться из другого процесса
+            ArchiveService.reset_cache()
+            report["idempotencyKeysPurged"] = await IdempotencyRepository.purge_expired(session, IDEMPOTENCY_TTL_SECONDS)
+            report["changeLogPurged"] = await purge_change_log(session)
+        report["users"] = users_count
+        report["rooms"] = rooms_count
+        return report
+
+    @staticmethod
+    async def warm_caches():
+        """Прогрев календарных лент комнат: готовые тела попадают в кэш до первого запроса"""
+        from app.services.calendar_service import CalendarService
+
+        warmed = 0
+        async with async_session() as session:
+            room_ids = (await session.execute(select(Room.id).order_by(Room.id).limit(WARM_ROOMS_LIMIT))).scalars().all()
+            for room_id in room_ids:
+                key = CalendarService.room_feed_key(room_id)
+                if CalendarService.get_cached(key) is not None:
+                    continue
+                feed = await CalendarService.room_feed(session, room_id, key)
+                if feed is None:
+                    continue
+                async for _ in feed:
+                    pass
+                warmed += 1
+        return {"rooms": len(room_ids), "warmed": warmed}
+
+def build_scheduler() -> Scheduler:
+    scheduler = Scheduler()
+    jobs = [
+        ("optimize", MaintenanceService.optimize, OPTIMIZE_INTERVAL),
+        ("analyze", MaintenanceService.analyze, ANALYZE_INTERVAL),
+        ("incremental_vacuum", MaintenanceService.incremental_vacuum, VACUUM_INTERVAL),
+        ("wal_checkpoint", MaintenanceService.wal_checkpoint, CHECKPOINT_INTERVAL),
+        ("reconcile", MaintenanceService.reconcile, RECONCILE_INTERVAL),
+        ("warm_caches", MaintenanceService.warm_caches, WARM_INTERVAL),
+    ]
+    for name, job_func, interval in jobs:
+        scheduler.add_job(name, job_func, interval, jitter=MAINTENANCE_JITTER,
+                          initial_delay=min(interval, MAINTENANCE_INITIAL_DELAY))
+    return scheduler
+
+maintenance_scheduler = build_scheduler()
@@ -1,11 +1,45 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-import uuid
 
-from app.models import Room
-from app.schemes.room_schema import RoomCreateSchema
+from app.models import Room, async_session
 from app.exceptions.room_exceptions import RoomNotFound, InvalidRoomData
 from app.repositories.room_repository import RoomRepository
+from app.utils.ids import new_id
+from app.utils.bitset_index import BitsetIndex
+from app.services.invalidation_service import on_change
+from app.services.deletion_service import DeletionService, DELETE_CHUNK_SIZE
+
+# Инвертированный индекс удобств: токен -> битовое множество комнат
+room_search_index = BitsetIndex()
+
+def amenity_tokens(amenities: str):
+    """Токены удобств: каждый пункт списка через запятую целиком и его отдельные слова"""
+    tokens = set()
+    for item in (amenities or "").split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        tokens.add(item)
+        tokens.update(item.split())
+    return tokens
+
+def _index_room(room: Room):
+    room_search_index.add(room.id, amenity_tokens(room.amenities), room.to_dict())
+
+@on_change("room")
+async def _room_changed(room_id: str):
+    # Комната изменена или удалена в другом процессе
+    async with async_session() as session:
+        room = await session.get(Room, room_id)
+    if room:
+        _index_room(room)
+    else:
+        room_search_index.remove(room_id)
+
+@on_change("reset")
+async def _rooms_reset(key):
+    async with async_session() as session:
+        await RoomService.load_search_index(session)
 
 class RoomService:
     @staticmethod
@@ -41,9 +75,8 @@ class RoomService:
         if price < 0:
             raise InvalidRoomData("Room price cannot be negative")
     
-        import uuid
         new_room = Room(
-            id=f"room_{uuid.uuid4().hex[:8]}",
+            id=new_id("room"),
             name=name,
             capacity=capacity,
             amenities=amenities,
@@ -53,46 +86,109 @@ class RoomService:
         session.add(new_room)
         await session.commit()
         await session.refresh(new_room)
+        _index_room(new_room)
     
         print(f"✅ Комната создана: {new_room.name} за {new_room.price} руб/час")
         return new_room
     
     @staticmethod
-    async def update_room(session: AsyncSession, room_id: str, room_data: RoomCreateSchema):
+    async def update_room(session: AsyncSession, room_id: str, name: str = None, capacity: int = None,
+                          amenities: str = None, price: float = None):
         room = await RoomService.get_room_by_id(session, room_id)
         
-        if not room_data.name:
-            raise InvalidRoomData("Room name is required")
+        if name is not None:
+            if not name:
+                raise InvalidRoomData("Room name is required")
+            
+            # Проверяем, не занято ли это имя другим помещением
+            existing = await session.execute(
+                select(Room).where(
+                    Room.name == name,
+                    Room.id != room_id
+                )
+            )
+            if existing.scalar():
+                raise InvalidRoomData(f"Room with name '{name}' already exists")
+            room.name = name
         
-        if room_data.capacity <= 0:
-            raise InvalidRoomData("Room capacity must be positive")
+        if capacity is not None:
+            if int(capacity) <= 0:
+                raise InvalidRoomData("Room capacity must be positive")
+            room.capacity = int(capacity)
         
-        # Проверяем, не занято ли это имя другим помещением
-        existing = await session.execute(
-            select(Room).where(
-                Room.name == room_data.name,
-                Room.id != room_id
-            )
-        )
-        if existing.scalar():
-            raise InvalidRoomData(f"Room with name '{room_data.name}' already exists")
+        if amenities is not None:
+            room.amenities = amenities
         
-        room.name = room_data.name
-        room.capacity = room_data.capacity
-        room.amenities = room_data.amenities
-        room.price = room_data.price
+        if price is not None:
+            if float(price) < 0:
+                raise InvalidRoomData("Room price cannot be negative")
+            room.price = float(price)
         
         await session.commit()
         await session.refresh(room)
+        _index_room(room)
         return room
     
     @staticmethod
-    async def delete_room(session: AsyncSession, room_id: str):
-        room = await RoomService.get_room_by_id(session, room_id)
+    async def update_room_price(session: AsyncSession, room_id: str, price: float):
+        if price is None:
+            raise InvalidRoomData("Room price is required")
+        return await RoomService.update_room(session, room_id, price=price)
+    
+    @staticmethod
+    async def delete_room(session: AsyncSession, room_id: str, chunk_size: int = DELETE_CHUNK_SIZE, progress=None):
+        """Удаление комнаты и ее бронирований чанками (см. DeletionService)"""
+        stats = await DeletionService.delete_owner(session, "room", room_id, chunk_size, progress)
+        if stats is None:
+            raise RoomNotFound(f"Room with id {room_id} not found")
+        room_search_index.remove(room_id)
+        return stats
+    
+    @staticmethod
+    async def load_search_index(session: AsyncSession):
+        """Построение индекса поиска комнат одним запросом (при старте приложения)"""
+        result = await session.execute(select(Room))
+        room_search_index.clear()
+        for room in result.scalars().all():
+            _index_room(room)
+        print(f"🔎 Индекс поиска комнат построен: {len(room_search_index)} комнат")
+        return len(room_search_index)
+    
+    @staticmethod
+    async def search_rooms(session: AsyncSession, min_capacity: int = None, min_price: float = None,
+                           max_price: float = None, amenities: list = None, booking_date=None,
+                           start_time: str = None, end_time: str = None):
+        """Поиск комнат по вместимости, цене, удобствам и свободному времени"""
+        required = [a.strip().lower() for a in (amenities or []) if a and a.strip()]
+        mask = room_search_index.match_all(required)
         
-        await session.delete(room)
-        await session.commit()
-        return True
+        rooms = []
+        for room in room_search_index.values(mask):
+            if min_capacity is not None and room["capacity"] < min_capacity:
+                continue
+            if min_price is not None and (room["price"] or 0) < min_price:
+                continue
+            if max_price is not None and (room["price"] or 0) > max_price:
+                continue
+            rooms.append(room)
+        
+        # Занятые в указанное окно комнаты - один запрос по индексу (room_id, date),
+        # только среди подходящих комнат. Время - нормализованное "HH:MM" (сравнение строк)
+        if rooms and booking_date and start_time and end_time:
+            from app.models import Booking
+            busy = await session.execute(
+                select(Booking.room_id).where(
+                    Booking.room_id.in_([room["id"] for room in rooms]),
+                    Booking.date == booking_date,
+                    Booking.start_time < end_time,
+                    Booking.end_time > start_time
+                ).distinct()
+            )
+            busy_ids = set(busy.scalars().all())
+            rooms = [room for room in rooms if room["id"] not in busy_ids]
+        
+        rooms.sort(key=lambda r: (r["capacity"], r["price"] or 0))
+        return rooms
     
     @staticmethod
     async def get_available_rooms(session: AsyncSession, date, start_time, end_time):
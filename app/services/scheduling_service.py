@@ -0,0 +1,431 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_, literal, func
+from sqlalchemy.exc import IntegrityError
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+import bisect
+import heapq
+import os
+import time
+
+from app.models import Booking, BookingArchive, Room, User
+from app.exceptions.booking_exceptions import InvalidBookingData, TimeSlotNotAvailable
+from app.exceptions.user_exceptions import UserNotFound
+from app.utils.intervals import to_minutes, from_minutes, merge_intervals, merge_sorted_streams, free_gaps
+from app.utils.ids import new_id
+from app.utils.locks import booking_locks
+from app.repositories.booking_repository import BookingRepository
+
+BUSINESS_DAY_START = os.getenv("BUSINESS_DAY_START", "09:00")
+BUSINESS_DAY_END = os.getenv("BUSINESS_DAY_END", "18:00")
+MAX_SEARCH_DAYS = int(os.getenv("MAX_SEARCH_DAYS", "92"))
+TIMELINE_MAX_DAYS = int(os.getenv("TIMELINE_MAX_DAYS", "62"))
+SLOT_ROUNDING_MINUTES = 5
+
+def _validate_window(date_from: date, date_to: date, day_start: str, day_end: str):
+    if date_to < date_from:
+        raise InvalidBookingData("date_to must not be earlier than date_from")
+    if (date_to - date_from).days + 1 > MAX_SEARCH_DAYS:
+        raise InvalidBookingData(f"Search window cannot exceed {MAX_SEARCH_DAYS} days")
+    try:
+        start, end = to_minutes(day_start), to_minutes(day_end)
+    except ValueError:
+        raise InvalidBookingData("Invalid time format. Use HH:MM")
+    if end <= start:
+        raise InvalidBookingData("End of business day must be after its start")
+    return start, end
+
+def _days(date_from: date, date_to: date, include_weekends: bool):
+    day = date_from
+    while day <= date_to:
+        if include_weekends or day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+def _intersect(first, second, min_length: int):
+    """Пересечение двух отсортированных списков непересекающихся интервалов (два указателя)"""
+    result = []
+    i = j = 0
+    while i < len(first) and j < len(second):
+        start = max(first[i][0], second[j][0])
+        end = min(first[i][1], second[j][1])
+        if end - start >= min_length:
+            result.append((start, end))
+        if first[i][1] < second[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+def _is_free(intervals, start: int, end: int) -> bool:
+    """Свободен ли [start, end) в отсортированном списке непересекающихся интервалов"""
+    position = bisect.bisect_left(intervals, (end,))
+    return position == 0 or intervals[position - 1][1] <= start
+
+def _earliest_start(day: date, day_start: int, now: datetime) -> int:
+    """Для сегодняшнего дня слоты не могут начинаться в прошлом"""
+    if day != now.date():
+        return day_start
+    minutes = now.hour * 60 + now.minute
+    minutes += -minutes % SLOT_ROUNDING_MINUTES
+    return max(day_start, minutes)
+
+class SchedulingService:
+    @staticmethod
+    async def load_busy_intervals(session: AsyncSession, date_from: date, date_to: date):
+        """Занятые интервалы по (дата, комната) за окно - один запрос по диапазону дат"""
+        result = await session.execute(
+            select(Booking.room_id, Booking.date, Booking.start_time, Booking.end_time)
+            .where(Booking.date.between(date_from, date_to))
+        )
+        busy = defaultdict(list)
+        for room_id, booking_date, start_time, end_time in result.all():
+            busy[(booking_date, room_id)].append((to_minutes(start_time), to_minutes(end_time)))
+        for intervals in busy.values():
+            intervals.sort()
+        return busy
+
+    @staticmethod
+    async def find_free_slots(session: AsyncSession, duration: int, date_from: date = None, date_to: date = None,
+                              min_capacity: int = 1, count: int = 3, day_start: str = BUSINESS_DAY_START,
+                              day_end: str = BUSINESS_DAY_END, include_weekends: bool = False, now: datetime = None):
+        """Ближайшие `count` свободных окон длительностью `duration` минут в любой подходящей комнате"""
+        now = now or datetime.now()
+        date_from = date_from or now.date()
+        date_to = date_to or date_from + timedelta(days=6)
+        start_minutes, end_minutes = _validate_window(date_from, date_to, day_start, day_end)
+        if duration <= 0 or duration > end_minutes - start_minutes:
+            raise InvalidBookingData("Duration must fit into the business day")
+
+        rooms_result = await session.execute(
+            select(Room.id, Room.name, Room.capacity, Room.price).where(Room.capacity >= min_capacity)
+        )
+        rooms = rooms_result.all()
+        if not rooms:
+            return []
+
+        busy = await SchedulingService.load_busy_intervals(session, date_from, date_to)
+
+        slots = []
+        for day in _days(date_from, date_to, include_weekends):
+            earliest = _earliest_start(day, start_minutes, now)
+            if earliest + duration > end_minutes:
+                continue
+
+            day_candidates = []
+            for room_id, name, capacity, price in rooms:
+                merged = merge_intervals(busy.get((day, room_id), ()))
+                for gap_start, gap_end in free_gaps(merged, earliest, end_minutes, duration):
+                    # Меньшая подходящая комната при равном времени идет первой
+                    day_candidates.append((gap_start, capacity, price or 0, room_id, name, gap_end))
+
+            for gap_start, capacity, price, room_id, name, gap_end in heapq.nsmallest(count - len(slots), day_candidates):
+                slots.append({
+                    "roomId": room_id,
+                    "roomName": name,
+                    "capacity": capacity,
+                    "price": price,
+                    "date": day.isoformat(),
+                    "startTime": from_minutes(gap_start),
+                    "endTime": from_minutes(gap_start + duration),
+                    "freeUntil": from_minutes(gap_end)
+                })
+            # Дни обходятся по порядку: следующие дни не дадут более ранних окон
+            if len(slots) >= count:
+                break
+
+        return slots
+
+    @staticmethod
+    async def resolve_participants(session: AsyncSession, participants):
+        """id и email участников; неизвестные участники - ошибка"""
+        keys = {p.strip() for p in participants if p and p.strip()}
+        emails = {k.lower() for k in keys if "@" in k}
+        ids = keys - {k for k in keys if "@" in k}
+        result = await session.execute(
+            select(User.id, User.email).where(or_(User.id.in_(ids), func.lower(User.email).in_(emails)))
+        )
+        users = {user_id: email.lower() for user_id, email in result.all()}
+        missing = (ids - set(users)) | (emails - set(users.values()))
+        if missing:
+            raise UserNotFound(f"Users not found: {', '.join(sorted(missing))}")
+        return users
+
+    @staticmethod
+    async def load_participant_busy(session: AsyncSession, users: dict, date_from: date, date_to: date):
+        """Занятость участников за окно одним запросом: свои бронирования и те, где участник в списке"""
+        # participants хранится строкой "a@x.ru, b@y.ru" - ищем ",email," в нормализованной строке
+        normalized = literal(",") + func.lower(func.replace(func.coalesce(Booking.participants, ""), " ", "")) + literal(",")
+        conditions = [Booking.user_id.in_(list(users))]
+        for email in set(users.values()):
+            escaped = email.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append(normalized.like(f"%,{escaped},%", escape="\\"))
+
+        result = await session.execute(
+            select(Booking.user_id, Booking.participants, Booking.date, Booking.start_time, Booking.end_time)
+            .where(Booking.date.between(date_from, date_to), or_(*conditions))
+        )
+
+        email_to_id = {email: user_id for user_id, email in users.items()}
+        # (дата, участник) -> интервалы; сортируются отдельно, затем сливаются кучей
+        busy = defaultdict(lambda: defaultdict(list))
+        for owner_id, participants, booking_date, start_time, end_time in result.all():
+            interval = (to_minutes(start_time), to_minutes(end_time))
+            attendees = set()
+            if owner_id in users:
+                attendees.add(owner_id)
+            for email in (participants or "").split(","):
+                user_id = email_to_id.get(email.strip().lower())
+                if user_id:
+                    attendees.add(user_id)
+            for user_id in attendees:
+                busy[booking_date][user_id].append(interval)
+        for per_user in busy.values():
+            for intervals in per_user.values():
+                intervals.sort()
+        return busy
+
+    @staticmethod
+    async def find_common_free_time(session: AsyncSession, participants, date_from: date, date_to: date,
+                                    min_duration: int = 30, day_start: str = None, day_end: str = None,
+                                    include_weekends: bool = False, min_capacity: int = None,
+                                    now: datetime = None):
+        """Общие свободные окна участников; при min_capacity - вместе со свободными комнатами"""
+        now = now or datetime.now()
+        start_minutes, end_minutes = _validate_window(
+            date_from, date_to, day_start or BUSINESS_DAY_START, day_end or BUSINESS_DAY_END
+        )
+
+        users = await SchedulingService.resolve_participants(session, participants)
+        busy = await SchedulingService.load_participant_busy(session, users, date_from, date_to)
+
+        rooms = []
+        room_busy = {}
+        if min_capacity:
+            rooms_result = await session.execute(
+                select(Room.id, Room.name, Room.capacity).where(Room.capacity >= min_capacity).order_by(Room.capacity)
+            )
+            rooms = rooms_result.all()
+            room_busy = await SchedulingService.load_busy_intervals(session, date_from, date_to)
+
+        windows = []
+        for day in _days(date_from, date_to, include_weekends):
+            earliest = _earliest_start(day, start_minutes, now)
+            streams = busy.get(day, {}).values()
+            merged = merge_sorted_streams(streams)
+            for gap_start, gap_end in free_gaps(merged, earliest, end_minutes, min_duration):
+                window = {
+                    "date": day.isoformat(),
+                    "startTime": from_minutes(gap_start),
+                    "endTime": from_minutes(gap_end),
+                    "minutes": gap_end - gap_start
+                }
+                if min_capacity:
+                    window["rooms"] = []
+                    for room_id, name, capacity in rooms:
+                        room_gaps = free_gaps(
+                            merge_intervals(room_busy.get((day, room_id), ())), gap_start, gap_end, min_duration
+                        )
+                        for start, end in _intersect([(gap_start, gap_end)], room_gaps, min_duration):
+                            window["rooms"].append({
+                                "roomId": room_id,
+                                "roomName": name,
+                                "capacity": capacity,
+                                "startTime": from_minutes(start),
+                                "endTime": from_minutes(end)
+                            })
+                windows.append(window)
+        return windows
+
+    @staticmethod
+    async def auto_assign(session: AsyncSession, requests, time_budget_ms: int = 2000, commit: bool = False):
+        """Жадное распределение встреч по комнатам (best-fit): сначала самые большие встречи,
+        каждой - свободная комната с минимальным запасом мест, при равенстве - самая дешевая"""
+        started = time.perf_counter()
+        deadline = started + time_budget_ms / 1000
+
+        rooms_result = await session.execute(select(Room.id, Room.name, Room.capacity, Room.price))
+        # Комнаты по (вместимость, цена): первая свободная подходящая - лучшая
+        rooms = sorted(rooms_result.all(), key=lambda r: (r.capacity, r.price or 0))
+        capacities = [room.capacity for room in rooms]
+
+        unplaceable = []
+        items = []
+        for index, request in enumerate(requests):
+            try:
+                start, end = to_minutes(request.startTime), to_minutes(request.endTime)
+            except ValueError:
+                unplaceable.append({"index": index, "reason": "Invalid time format. Use HH:MM"})
+                continue
+            if not 0 <= start < 24 * 60 or not 0 < end <= 24 * 60:
+                unplaceable.append({"index": index, "reason": "Invalid time format. Use HH:MM"})
+                continue
+            if end <= start:
+                unplaceable.append({"index": index, "reason": "End time must be after start time"})
+                continue
+            items.append((index, request, start, end))
+
+        occupied = {}
+        if items:
+            date_from = min(item[1].date for item in items)
+            date_to = max(item[1].date for item in items)
+            busy = await SchedulingService.load_busy_intervals(session, date_from, date_to)
+            occupied = {key: [tuple(i) for i in merge_intervals(intervals)] for key, intervals in busy.items()}
+
+        # Крупные и длинные встречи размещаем первыми - для них меньше вариантов
+        items.sort(key=lambda item: (-item[1].size, -(item[3] - item[2]), item[1].date, item[2]))
+
+        assigned = []
+        for position, (index, request, start, end) in enumerate(items):
+            if time.perf_counter() > deadline:
+                unplaceable.extend(
+                    {"index": rest[0], "reason": "Time budget exceeded"} for rest in items[position:]
+                )
+                break
+
+            placed = False
+            for room in rooms[bisect.bisect_left(capacities, request.size):]:
+                intervals = occupied.setdefault((request.date, room.id), [])
+                if not _is_free(intervals, start, end):
+                    continue
+                bisect.insort(intervals, (start, end))
+                cost = round((room.price or 0) * (end - start) / 60, 2)
+                assigned.append({
+                    "index": index,
+                    "roomId": room.id,
+                    "roomName": room.name,
+                    "capacity": room.capacity,
+                    "date": request.date.isoformat(),
+                    "startTime": from_minutes(start),
+                    "endTime": from_minutes(end),
+                    "wastedSeats": room.capacity - request.size,
+                    "cost": cost
+                })
+                placed = True
+                break
+
+            if not placed:
+                reason = "No room with enough capacity" if not capacities or capacities[-1] < request.size \
+                    else "All suitable rooms are busy"
+                unplaceable.append({"index": index, "reason": reason})
+
+        assigned.sort(key=lambda a: a["index"])
+        unplaceable.sort(key=lambda u: u["index"])
+
+        if commit and assigned:
+            user_ids = {requests[a["index"]].userId for a in assigned}
+            users_result = await session.execute(select(User.id).where(User.id.in_(user_ids)))
+            missing = user_ids - set(users_result.scalars().all())
+            if missing:
+                raise UserNotFound(f"Users not found: {', '.join(sorted(missing))}")
+
+            bookings = []
+            for assignment in assigned:
+                request = requests[assignment["index"]]
+                booking = Booking(
+                    id=new_id("booking"),
+                    room_id=assignment["roomId"],
+                    user_id=request.userId,
+                    date=request.date,
+                    # Каноническое "HH:MM": триггер и проверки занятости сравнивают строки
+                    start_time=assignment["startTime"],
+                    end_time=assignment["endTime"],
+                    title=request.title,
+                    participants=",".join(request.participants) if request.participants else ""
+                )
+                assignment["bookingId"] = booking.id
+                bookings.append(booking)
+
+            # Те же блокировки (комната, дата), что у создания и переноса бронирований
+            async with booking_locks.lock_all(*{(b.room_id, b.date) for b in bookings}):
+                session.add_all(bookings)
+                try:
+                    await session.commit()
+                except IntegrityError as e:
+                    await session.rollback()
+                    if BookingRepository.is_overlap_error(e):
+                        # Параллельно кто-то занял один из слотов - план устарел, его нужно пересчитать
+                        raise TimeSlotNotAvailable("Rooms changed while assigning, please retry")
+                    raise
+
+        return {
+            "assigned": assigned,
+            "unplaceable": unplaceable,
+            "stats": {
+                "requests": len(requests),
+                "assigned": len(assigned),
+                "unplaceable": len(unplaceable),
+                "wastedSeats": sum(a["wastedSeats"] for a in assigned),
+                "totalCost": round(sum(a["cost"] for a in assigned), 2),
+                "elapsedMs": round((time.perf_counter() - started) * 1000, 2),
+                "committed": bool(commit and assigned)
+            }
+        }
+    
+    @staticmethod
+    def _timeline_query(model, date_from: date, date_to: date):
+        # Индекс по дате; имя владельца - тем же запросом
+        return (
+            select(model.id, model.room_id, model.date, model.start_time, model.end_time, model.title,
+                   model.user_id, User.first_name, User.last_name)
+            .outerjoin(User, User.id == model.user_id)
+            .where(model.date.between(date_from, date_to))
+            .order_by(model.date, model.start_time)
+        )
+    
+    @staticmethod
+    async def timeline(session: AsyncSession, date_from: date, date_to: date):
+        """Все комнаты с бронированиями за период в колоночном виде: список комнат и один
+        запрос по диапазону дат. Бронирования комнаты i - срез [offset[i], offset[i] + count[i])
+        колонок bookings, отсортированный по дню и времени начала; day - номер дня от dateFrom"""
+        if date_to < date_from:
+            raise InvalidBookingData("date_to must not be earlier than date_from")
+        if (date_to - date_from).days + 1 > TIMELINE_MAX_DAYS:
+            raise InvalidBookingData(f"Timeline window cannot exceed {TIMELINE_MAX_DAYS} days")
+        
+        rooms = (await session.execute(
+            select(Room.id, Room.name, Room.capacity).order_by(Room.name, Room.id)
+        )).all()
+        position = {room.id: index for index, room in enumerate(rooms)}
+        
+        rows = (await session.execute(SchedulingService._timeline_query(Booking, date_from, date_to))).all()
+        # Прошедшие бронирования старше горизонта лежат в архиве
+        from app.services.archive_service import ArchiveService
+        if await ArchiveService.reaches_archive(session, date_from):
+            archived = (await session.execute(SchedulingService._timeline_query(BookingArchive, date_from, date_to))).all()
+            rows = sorted(archived + rows, key=lambda row: (row.date, row.start_time))
+        
+        buckets = [[] for _ in rooms]
+        for row in rows:
+            index = position.get(row.room_id)
+            if index is not None:
+                buckets[index].append(row)
+        
+        columns = {"id": [], "day": [], "startTime": [], "endTime": [], "title": [], "userId": []}
+        offsets, counts, users = [], [], {}
+        for bucket in buckets:
+            offsets.append(len(columns["id"]))
+            counts.append(len(bucket))
+            for row in bucket:
+                columns["id"].append(row.id)
+                columns["day"].append((row.date - date_from).days)
+                columns["startTime"].append(row.start_time)
+                columns["endTime"].append(row.end_time)
+                columns["title"].append(row.title)
+                columns["userId"].append(row.user_id)
+                if row.user_id not in users:
+                    users[row.user_id] = f"{row.first_name} {row.last_name}" if row.first_name else ""
+        
+        return {
+            "dateFrom": date_from.isoformat(),
+            "dateTo": date_to.isoformat(),
+            "rooms": {
+                "id": [room.id for room in rooms],
+                "name": [room.name for room in rooms],
+                "capacity": [room.capacity for room in rooms],
+                "offset": offsets,
+                "count": counts
+            },
+            "bookings": columns,
+            "users": users
+        }
@@ -1,18 +1,65 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import Optional
-import uuid
-import bcrypt
+import math
+import os
 
-from app.models import User, Role
+from app.models import User, Role, async_session
 from app.schemes.user_schema import UserCreateSchema
-from app.exceptions.user_exceptions import UserAlreadyExists, UserNotFound, InvalidUserData
+from app.exceptions.user_exceptions import UserAlreadyExists, UserNotFound, InvalidUserData, TooManyLoginAttempts
 from app.repositories.user_repository import UserRepository
+from app.utils.ids import new_id
+from app.utils.prefix_index import PrefixIndex
+from app.utils.rate_limit import RateLimiter
+from app.services.invalidation_service import on_change
+from app.services.deletion_service import DeletionService, DELETE_CHUNK_SIZE
+
+LOGIN_RATE_LIMIT_ENABLED = os.getenv("LOGIN_RATE_LIMIT_ENABLED", "True").lower() == "true"
+# Лимит по IP считается по request.client.host. За обратным прокси это адрес
+# прокси, если он не указан в FORWARDED_ALLOW_IPS (см. serve.py) - тогда uvicorn
+# подставляет адрес клиента из X-Forwarded-For
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "30"))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "10"))
+LOGIN_EMAIL_PER_MINUTE = float(os.getenv("LOGIN_EMAIL_PER_MINUTE", "5"))
+LOGIN_EMAIL_BURST = int(os.getenv("LOGIN_EMAIL_BURST", "5"))
+
+# Каждая попытка входа - полная проверка bcrypt, поэтому попытки ограничиваются
+# по IP и по email до обращения к БД
+login_ip_limiter = RateLimiter(LOGIN_IP_PER_MINUTE, LOGIN_IP_BURST)
+login_email_limiter = RateLimiter(LOGIN_EMAIL_PER_MINUTE, LOGIN_EMAIL_BURST)
+
+# Индекс для автодополнения участников: email, имя, фамилия, "имя фамилия"
+user_search_index = PrefixIndex()
+
+def _search_entry(user_id: str, first_name: str, last_name: str, email: str):
+    keys = [email, first_name, last_name, f"{first_name} {last_name}"]
+    value = {"id": user_id, "name": f"{first_name} {last_name}", "email": email}
+    return user_id, keys, value
+
+@on_change("user")
+async def _user_changed(user_id: str):
+    # Пользователь изменен или удален в другом процессе
+    async with async_session() as session:
+        result = await session.execute(
+            select(User.id, User.first_name, User.last_name, User.email).where(User.id == user_id)
+        )
+        row = result.first()
+    if row:
+        user_search_index.add(*_search_entry(*row))
+    else:
+        user_search_index.remove(user_id)
+
+@on_change("reset")
+async def _users_reset(key):
+    async with async_session() as session:
+        await UserService.load_search_index(session)
 
 class UserService:
     @staticmethod
     def hash_password(password: str) -> str:
         """Хеширование пароля"""
+        # bcrypt загружается при первом обращении, а не при старте приложения
+        import bcrypt
         salt = bcrypt.gensalt()
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
@@ -20,6 +67,7 @@ class UserService:
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Проверка пароля"""
+        import bcrypt
         try:
             return bcrypt.checkpw(
                 plain_password.encode('utf-8'), 
@@ -29,6 +77,17 @@ class UserService:
             print(f"❌ Ошибка проверки пароля: {e}")
             return False
     
+    @staticmethod
+    def check_login_rate(client_ip: str, email: str):
+        """Учет попытки входа; TooManyLoginAttempts - лимит исчерпан"""
+        if not LOGIN_RATE_LIMIT_ENABLED:
+            return
+        retry_after = login_ip_limiter.hit(client_ip or "unknown")
+        if not retry_after:
+            retry_after = login_email_limiter.hit((email or "").strip().lower())
+        if retry_after:
+            raise TooManyLoginAttempts(math.ceil(retry_after))
+
     @staticmethod
     async def authenticate_user(session: AsyncSession, email: str, password: str):
         """Аутентификация пользователя с проверкой пароля через bcrypt"""
@@ -56,6 +115,7 @@ class UserService:
             print(f"🔑 Проверка пароля через bcrypt...")
             
             # Проверяем пароль через bcrypt
+            import bcrypt
             is_valid = bcrypt.checkpw(
                 password.encode('utf-8'), 
                 user.password.encode('utf-8')
@@ -134,6 +194,7 @@ class UserService:
         
         # Хешируем пароль ПРАВИЛЬНО
         print(f"🔐 Хеширование пароля...")
+        import bcrypt
         hashed_password = bcrypt.hashpw(
             user_data.password.encode('utf-8'),
             bcrypt.gensalt()
@@ -143,7 +204,7 @@ class UserService:
         
         # Создаем пользователя
         new_user = User(
-            id=f"user_{uuid.uuid4().hex[:8]}",
+            id=new_id("user"),
             first_name=user_data.firstName,
             last_name=user_data.lastName,
             email=user_data.email,
@@ -155,11 +216,27 @@ class UserService:
         await session.commit()
         await session.refresh(new_user)
         await session.refresh(new_user, ['role'])
+        user_search_index.add(*_search_entry(new_user.id, new_user.first_name, new_user.last_name, new_user.email))
         
         print(f"✅ Пользователь успешно создан: {new_user.first_name} {new_user.last_name}")
         
         return new_user
     
+    @staticmethod
+    async def load_search_index(session: AsyncSession):
+        """Построение индекса автодополнения одним запросом (при старте приложения)"""
+        result = await session.execute(
+            select(User.id, User.first_name, User.last_name, User.email)
+        )
+        user_search_index.build(_search_entry(*row) for row in result.all())
+        print(f"🔎 Индекс поиска пользователей построен: {len(user_search_index)} записей")
+        return len(user_search_index)
+    
+    @staticmethod
+    def search_users(query: str, limit: int = 10):
+        """Поиск пользователей по префиксу email, имени или фамилии - без обращения к БД"""
+        return user_search_index.search(query, limit)
+    
     @staticmethod
     async def update_user_role(session: AsyncSession, user_id: str, role_name: str):
         user = await UserService.get_user_by_id(session, user_id)
@@ -176,9 +253,10 @@ class UserService:
         return user
     
     @staticmethod
-    async def delete_user(session: AsyncSession, user_id: str):
-        user = await UserService.get_user_by_id(session, user_id)
-        
-        await session.delete(user)
-        await session.commit()
-        return True
\ No newline at end of file
+    async def delete_user(session: AsyncSession, user_id: str, chunk_size: int = DELETE_CHUNK_SIZE, progress=None):
+        """Удаление пользователя и его бронирований чанками (см. DeletionService)"""
+        stats = await DeletionService.delete_owner(session, "user", user_id, chunk_size, progress)
+        if stats is None:
+            raise UserNotFound(f"User with id {user_id} not found")
+        user_search_index.remove(user_id)
+        return stats
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Инвертированный индекс с битовыми множествами.
+
+Каждой записи выделяется номер бита; для каждого токена хранится целое число,
+в котором установлены биты записей с этим токеном. Запрос "все токены сразу"
+сводится к побитовому AND, исключение - к AND NOT. Python int работает как
+битовое множество произвольной длины, так что тысячи записей - это десятки
+машинных слов на токен.
+"""
+import threading
+
+
+def iter_bits(mask: int):
+    """Номера установленных битов по возрастанию"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BitsetIndex:
+    def __init__(self):
+        self._bits = {}         # id записи -> номер бита
+        self._ids = []          # номер бита -> id записи (None - свободен)
+        self._free = []         # освобожденные номера битов
+        self._tokens = {}       # токен -> битовая маска
+        self._tokens_by_id = {} # id записи -> ее токены
+        self._values = {}       # номер бита -> данные записи
+        self.all_mask = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._bits)
+
+    def clear(self):
+        with self._lock:
+            self._bits.clear()
+            self._ids.clear()
+            self._free.clear()
+            self._tokens.clear()
+            self._tokens_by_id.clear()
+            self._values.clear()
+            self.all_mask = 0
+
+    def add(self, item_id, tokens, value):
+        """Добавление или замена записи"""
+        with self._lock:
+            self._remove_locked(item_id)
+            if self._free:
+                bit = self._free.pop()
+                self._ids[bit] = item_id
+            else:
+                bit = len(self._ids)
+                self._ids.append(item_id)
+            self._bits[item_id] = bit
+            flag = 1 << bit
+            tokens = set(tokens)
+            for token in tokens:
+                self._tokens[token] = self._tokens.get(token, 0) | flag
+            self._tokens_by_id[item_id] = tokens
+            self._values[bit] = value
+            self.all_mask |= flag
+
+    def remove(self, item_id):
+        with self._lock:
+            self._remove_locked(item_id)
+
+    def _remove_locked(self, item_id):
+        bit = self._bits.pop(item_id, None)
+        if bit is None:
+            return
+        flag = 1 << bit
+        for token in self._tokens_by_id.pop(item_id, ()):
+            mask = self._tokens.get(token, 0) & ~flag
+            if mask:
+                self._tokens[token] = mask
+            else:
+                self._tokens.pop(token, None)
+        self._values.pop(bit, None)
+        self._ids[bit] = None
+        self._free.append(bit)
+        self.all_mask &= ~flag
+
+    def match_all(self, tokens) -> int:
+        """Маска записей, содержащих все токены (пустой список - все записи)"""
+        mask = self.all_mask
+        for token in tokens:
+            mask &= self._tokens.get(token, 0)
+            if not mask:
+                break
+        return mask
+
+    def mask_for(self, item_ids) -> int:
+        mask = 0
+        for item_id in item_ids:
+            bit = self._bits.get(item_id)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def values(self, mask: int):
+        return [self._values[bit] for bit in iter_bits(mask)]
@@ -0,0 +1,193 @@
+"""
+Поддержка заголовка Idempotency-Key для POST-запросов.
+
+Ответ на первый запрос с данным ключом сохраняется в таблице idempotency_keys.
+Повторы (например, ретраи мобильных клиентов по таймауту) получают сохраненный
+ответ за один поиск по первичному ключу, без повторной обработки запроса.
+Тело ответа хранится в base64 - повтор отдает его байт в байт.
+
+Ключ действует только для JSON-эндпоинтов из списка IDEMPOTENT_PATHS (тело
+буферизуется для хэша, поэтому загрузки файлов сюда не входят) и только в пределах
+клиента: в таблицу пишется хэш адреса клиента и ключа. Перед выполнением запроса
+вставляется строка "в работе" - одновременный повтор в любом процессе упирается
+в первичный ключ и ждет сохраненного ответа.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from app.models import async_session
+from app.repositories.idempotency_repository import IdempotencyRepository, IN_PROGRESS
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60)))
+# Создающие JSON-эндпоинты; multipart /api/admin/import и прочие POST проходят мимо
+IDEMPOTENT_PATHS = (
+    "/api/bookings/",
+    "/api/rooms/",
+    "/api/roles/",
+    "/api/users/register",
+    "/api/scheduling/auto-assign",
+)
+IDEMPOTENCY_MAX_BODY_BYTES = int(os.getenv("IDEMPOTENCY_MAX_BODY_BYTES", str(1024 * 1024)))
+# Сколько повтор ждет ответа на запрос, который еще выполняется, и когда строка "в работе" считается зависшей
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+IDEMPOTENCY_STALE_SECONDS = int(os.getenv("IDEMPOTENCY_STALE_SECONDS", "300"))
+IDEMPOTENCY_POLL_SECONDS = 0.05
+MAX_KEY_LENGTH = 255
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware: повторяет сохраненный ответ для уже обработанного ключа"""
+
+    def __init__(self, app, methods=("POST",), paths=IDEMPOTENT_PATHS, ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS,
+                 max_body_bytes: int = IDEMPOTENCY_MAX_BODY_BYTES):
+        self.app = app
+        self.methods = set(methods)
+        self.paths = {path.rstrip("/") for path in paths}
+        self.ttl_seconds = ttl_seconds
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] not in self.methods
+                or scope["path"].rstrip("/") not in self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        key = headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            await self.app(scope, receive, send)
+            return
+
+        key = key.decode("latin-1").strip()
+        if len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, {"detail": f"Idempotency-Key не должен превышать {MAX_KEY_LENGTH} символов"})
+            return
+
+        too_large = {"detail": f"Тело запроса с Idempotency-Key не должно превышать {self.max_body_bytes} байт"}
+        if int(headers.get(b"content-length") or 0) > self.max_body_bytes:
+            await _send_json(send, 413, too_large)
+            return
+        try:
+            body = await _read_body(receive, self.max_body_bytes)
+        except BodyTooLarge:
+            await _send_json(send, 413, too_large)
+            return
+
+        # Параметры запроса тоже часть запроса: ?background=true с тем же ключом - другой запрос
+        request_hash = hashlib.sha256(
+            scope["method"].encode() + b" " + scope["path"].encode() + b"?" + scope.get("query_string", b"")
+            + b"\n" + body
+        ).hexdigest()
+        # Ключи разных клиентов не пересекаются: хранится хэш адреса клиента и ключа
+        client = scope.get("client")
+        stored_key = hashlib.sha256(f"{client[0] if client else ''}\n{key}".encode("utf-8")).hexdigest()
+
+        await self._handle(scope, send, stored_key, request_hash, body)
+
+    async def _handle(self, scope, send, key, request_hash, body):
+        deadline = asyncio.get_running_loop().time() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            async with async_session() as session:
+                stored = await IdempotencyRepository.get_key(session, key, self.ttl_seconds)
+                if stored is None:
+                    if await IdempotencyRepository.claim_key(session, key, request_hash):
+                        break
+                    # Ключ только что занял другой запрос - читаем его строку заново
+                    continue
+
+                if stored.request_hash != request_hash:
+                    await _send_json(send, 422, {"detail": "Idempotency-Key уже использован для другого запроса"})
+                    return
+
+                if stored.status_code != IN_PROGRESS:
+                    await send({
+                        "type": "http.response.start",
+                        "status": stored.status_code,
+                        "headers": [
+                            (b"content-type", (stored.content_type or "application/json").encode("latin-1")),
+                            (b"idempotent-replayed", b"true"),
+                        ],
+                    })
+                    await send({"type": "http.response.body", "body": base64.b64decode(stored.response_body or "")})
+                    return
+
+                # Первый запрос еще выполняется (в этом или другом процессе)
+                stale = stored.created_at < datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_STALE_SECONDS)
+                if stale and await IdempotencyRepository.reclaim_stale(session, key, stored.created_at):
+                    break
+
+            if asyncio.get_running_loop().time() >= deadline:
+                await _send_json(send, 409, {"detail": "Запрос с этим Idempotency-Key еще выполняется"})
+                return
+            await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+
+        response = {"status": 500, "content_type": None, "chunks": []}
+
+        async def replay_receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        response["content_type"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response["chunks"].append(message.get("body", b""))
+            await send(message)
+
+        saved = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+
+            # Ошибки сервера не запоминаем - клиент должен иметь возможность повторить запрос
+            if response["status"] < 500:
+                async with async_session() as session:
+                    await IdempotencyRepository.save_key(
+                        session,
+                        key,
+                        request_hash,
+                        response["status"],
+                        response["content_type"],
+                        base64.b64encode(b"".join(response["chunks"])).decode("ascii")
+                    )
+                saved = True
+        finally:
+            if not saved:
+                # Снимаем строку "в работе" и при исключении/отмене, иначе повторы ждали бы ее устаревания
+                async with async_session() as session:
+                    await IdempotencyRepository.release_key(session, key)
+
+
+async def _read_body(receive, max_bytes: int) -> bytes:
+    chunks = []
+    size = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > max_bytes:
+            raise BodyTooLarge()
+        chunks.append(chunk)
+        more_body = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+async def _send_json(send, status_code: int, content: dict):
+    payload = json.dumps(content, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json")],
+    })
+    await send({"type": "http.response.body", "body": payload})
@@ -0,0 +1,75 @@
+"""
+Упорядоченные по времени идентификаторы в стиле ULID.
+
+Формат: <префикс>_<26 символов Crockford base32>, где первые 10 символов - время
+в миллисекундах (48 бит), остальные 16 - случайная часть (80 бит). Новые ключи
+всегда больше предыдущих, поэтому вставки идут в конец B-дерева, а сортировка
+по id совпадает с порядком создания (удобно для пагинации).
+
+Внутри одной миллисекунды случайная часть увеличивается на единицу - порядок
+сохраняется даже при очень частой генерации.
+"""
+import os
+import threading
+import time
+
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_DECODE = {char: index for index, char in enumerate(CROCKFORD_ALPHABET)}
+
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+_lock = threading.Lock()
+_last_timestamp = 0
+_last_random = 0
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(CROCKFORD_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def ulid(timestamp_ms: int = None) -> str:
+    """26-символьный ULID; монотонно возрастает в пределах процесса"""
+    global _last_timestamp, _last_random
+
+    with _lock:
+        if timestamp_ms is None:
+            timestamp_ms = time.time_ns() // 1_000_000
+
+        if timestamp_ms <= _last_timestamp:
+            # Та же (или отставшая) миллисекунда - продолжаем последовательность
+            timestamp_ms = _last_timestamp
+            random_part = _last_random + 1
+            if random_part > _RANDOM_MAX:
+                timestamp_ms += 1
+                random_part = int.from_bytes(os.urandom(10), "big")
+        else:
+            random_part = int.from_bytes(os.urandom(10), "big")
+
+        _last_timestamp = timestamp_ms
+        _last_random = random_part
+
+    return _encode(timestamp_ms, 10) + _encode(random_part, 16)
+
+
+def new_id(prefix: str, timestamp_ms: int = None) -> str:
+    """Новый идентификатор сущности, например new_id("booking") -> booking_01J..."""
+    return f"{prefix}_{ulid(timestamp_ms)}"
+
+
+def id_timestamp_ms(entity_id: str):
+    """Время создания (мс) из идентификатора нового формата; None для старых ключей"""
+    suffix = entity_id.rsplit("_", 1)[-1]
+    if len(suffix) != 26:
+        return None
+    try:
+        value = 0
+        for char in suffix[:10]:
+            value = value * 32 + _DECODE[char]
+    except KeyError:
+        return None
+    return value
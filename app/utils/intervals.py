@@ -0,0 +1,51 @@
+"""
+Операции над временными интервалами в минутах от начала суток.
+
+Бронирования хранят время строками "HH:MM"; здесь они переводятся в целые
+минуты, чтобы слияние и поиск промежутков были простыми сравнениями чисел.
+Интервалы полуоткрытые: [start, end).
+"""
+import heapq
+
+
+def to_minutes(value: str) -> int:
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def from_minutes(value: int) -> str:
+    return f"{value // 60:02d}:{value % 60:02d}"
+
+
+def merge_intervals(intervals):
+    """Слияние интервалов, отсортированных по началу (sweep-line за один проход)"""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def merge_sorted_streams(streams):
+    """k-way слияние нескольких отсортированных списков интервалов через кучу"""
+    return merge_intervals(heapq.merge(*streams))
+
+
+def free_gaps(merged, day_start: int, day_end: int, min_length: int = 1):
+    """Свободные промежутки внутри [day_start, day_end) между слитыми занятыми интервалами"""
+    gaps = []
+    cursor = day_start
+    for start, end in merged:
+        if end <= cursor:
+            continue
+        if start >= day_end:
+            break
+        if start - cursor >= min_length:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if day_end - cursor >= min_length:
+        gaps.append((cursor, day_end))
+    return gaps
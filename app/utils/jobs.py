@@ -0,0 +1,90 @@
+"""
+Фоновые задачи с отчетом о прогрессе (например, удаление комнаты с большим
+числом бронирований).
+
+Задача - корутина, принимающая функцию progress(dict). Состояние хранится в
+памяти процесса: последние JOBS_HISTORY задач доступны через get/list. Одна и
+та же цель (kind, target) не выполняется параллельно - повторный submit
+возвращает уже идущую задачу. При остановке приложения задачи отменяются;
+работа, закоммиченная по частям, сохраняется, и задачу можно запустить снова.
+"""
+import asyncio
+import traceback
+from collections import OrderedDict
+from datetime import datetime
+import os
+
+from app.utils.ids import new_id
+
+JOBS_HISTORY = int(os.getenv("JOBS_HISTORY", "100"))
+
+
+class BackgroundJobs:
+    def __init__(self, history: int = JOBS_HISTORY):
+        self.history = history
+        self._jobs = OrderedDict()
+        self._tasks = {}
+
+    def _running(self, kind: str, target: str):
+        for job in self._jobs.values():
+            if job["kind"] == kind and job["target"] == target and job["status"] == "running":
+                return job
+        return None
+
+    def submit(self, kind: str, target: str, func) -> dict:
+        """Запуск func(progress) в фоне; возвращает описание задачи"""
+        job = self._running(kind, target)
+        if job:
+            return job
+
+        job = {
+            "id": new_id("job"),
+            "kind": kind,
+            "target": target,
+            "status": "running",
+            "progress": {},
+            "result": None,
+            "error": None,
+            "startedAt": datetime.utcnow().isoformat(),
+            "finishedAt": None
+        }
+
+        async def run():
+            try:
+                job["result"] = await func(job["progress"].update)
+                job["status"] = "done"
+            except asyncio.CancelledError:
+                job["status"] = "cancelled"
+                raise
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                print(f"❌ Фоновая задача {kind} {target} завершилась ошибкой: {e}")
+                traceback.print_exc()
+            finally:
+                job["finishedAt"] = datetime.utcnow().isoformat()
+                self._tasks.pop(job["id"], None)
+
+        self._jobs[job["id"]] = job
+        while len(self._jobs) > self.history:
+            oldest = next(iter(self._jobs))
+            if oldest in self._tasks:
+                break
+            self._jobs.pop(oldest)
+        self._tasks[job["id"]] = asyncio.create_task(run(), name=f"job:{kind}:{target}")
+        return job
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        return list(reversed(self._jobs.values()))
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+background_jobs = BackgroundJobs()
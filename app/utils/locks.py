@@ -0,0 +1,51 @@
+"""
+Полосатые (striped) блокировки для сериализации операций над одним ресурсом.
+
+Ключ (например, room_id и дата) хешируется в одну из N блокировок: запросы к одной
+комнате на одну дату выполняются последовательно, а к разным комнатам - параллельно
+(с точностью до редких коллизий хеша). Память не растет с числом комнат.
+"""
+import asyncio
+import contextlib
+import os
+
+BOOKING_LOCK_STRIPES = int(os.getenv("BOOKING_LOCK_STRIPES", "256"))
+
+
+class StripedLock:
+    def __init__(self, stripes: int = BOOKING_LOCK_STRIPES):
+        if stripes <= 0:
+            raise ValueError("Количество полос должно быть положительным")
+        self._locks = [asyncio.Lock() for _ in range(stripes)]
+
+    def lock(self, *key) -> asyncio.Lock:
+        """Блокировка для ключа; использовать как `async with striped.lock(room_id, date)`"""
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextlib.asynccontextmanager
+    async def lock_all(self, *keys):
+        """Блокировки сразу для нескольких ключей (перенос между комнатами и датами).
+        Берутся без повторов и в порядке номера полосы - без взаимных блокировок"""
+        indexes = sorted({hash(key) % len(self._locks) for key in keys})
+        async with contextlib.AsyncExitStack() as stack:
+            for index in indexes:
+                await stack.enter_async_context(self._locks[index])
+            yield
+
+    @property
+    def stripes(self) -> int:
+        return len(self._locks)
+
+    def stats(self) -> dict:
+        """Занятые полосы и число задач, ожидающих блокировку (очередь записей)"""
+        held = waiting = 0
+        for lock in self._locks:
+            if lock.locked():
+                held += 1
+                # _waiters - очередь ожидающих в asyncio.Lock (CPython), None до первого ожидания
+                waiting += len(getattr(lock, "_waiters", None) or ())
+        return {"stripes": len(self._locks), "held": held, "waiting": waiting}
+
+
+# Общие блокировки для создания/изменения бронирований по (room_id, date)
+booking_locks = StripedLock()
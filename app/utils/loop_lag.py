@@ -0,0 +1,54 @@
+"""
+Задержка цикла событий (event loop lag).
+
+Фоновая задача засыпает на interval и замеряет, насколько позже она проснулась.
+Задержка - время, которое цикл был занят синхронным кодом (CPU-тяжелый
+обработчик, блокирующий вызов) и не мог обслуживать другие запросы.
+Хранится последнее значение и максимум за последние window замеров.
+"""
+import asyncio
+import collections
+import os
+
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+LOOP_LAG_WINDOW = int(os.getenv("LOOP_LAG_WINDOW", "20"))
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, window: int = LOOP_LAG_WINDOW):
+        self.interval = interval
+        self.samples = collections.deque(maxlen=window)
+        self._task = None
+
+    def start(self):
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._loop(), name="loop-lag-monitor")
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval) * 1000)
+
+    @property
+    def last_ms(self) -> float:
+        return self.samples[-1] if self.samples else 0.0
+
+    @property
+    def max_ms(self) -> float:
+        return max(self.samples, default=0.0)
+
+    def stats(self) -> dict:
+        return {"running": self._task is not None, "intervalMs": self.interval * 1000,
+                "lastMs": round(self.last_ms, 2), "maxMs": round(self.max_ms, 2), "samples": len(self.samples)}
+
+
+loop_lag_monitor = LoopLagMonitor()
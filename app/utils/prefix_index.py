@@ -0,0 +1,81 @@
+"""
+Индекс для поиска по префиксу в памяти.
+
+Ключи хранятся в отсортированном списке пар (ключ, id); поиск - бинарный поиск
+начала диапазона и проход по ключам с нужным префиксом, O(log n + k).
+Одна запись может иметь несколько ключей (email, имя, фамилия).
+"""
+import bisect
+import threading
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._entries = []      # отсортированный список (ключ, id)
+        self._keys_by_id = {}   # id -> ключи записи, для удаления
+        self._items = {}        # id -> данные, которые отдаются в результатах
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    @staticmethod
+    def _normalize(value: str) -> str:
+        return (value or "").strip().lower()
+
+    def build(self, items):
+        """Полная перестройка из итератора (id, [ключи], данные)"""
+        entries = []
+        keys_by_id = {}
+        values = {}
+        for item_id, keys, value in items:
+            normalized = sorted({self._normalize(k) for k in keys if k})
+            keys_by_id[item_id] = normalized
+            values[item_id] = value
+            entries.extend((key, item_id) for key in normalized)
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._keys_by_id = keys_by_id
+            self._items = values
+
+    def add(self, item_id, keys, value):
+        with self._lock:
+            self._remove_locked(item_id)
+            normalized = sorted({self._normalize(k) for k in keys if k})
+            for key in normalized:
+                bisect.insort(self._entries, (key, item_id))
+            self._keys_by_id[item_id] = normalized
+            self._items[item_id] = value
+
+    def remove(self, item_id):
+        with self._lock:
+            self._remove_locked(item_id)
+
+    def _remove_locked(self, item_id):
+        for key in self._keys_by_id.pop(item_id, []):
+            position = bisect.bisect_left(self._entries, (key, item_id))
+            if position < len(self._entries) and self._entries[position] == (key, item_id):
+                del self._entries[position]
+        self._items.pop(item_id, None)
+
+    def search(self, prefix: str, limit: int = 10):
+        prefix = self._normalize(prefix)
+        if not prefix:
+            return []
+        entries = self._entries
+        items = self._items
+        position = bisect.bisect_left(entries, (prefix,))
+        found = []
+        seen = set()
+        while position < len(entries) and len(found) < limit:
+            key, item_id = entries[position]
+            if not key.startswith(prefix):
+                break
+            if item_id not in seen:
+                seen.add(item_id)
+                value = items.get(item_id)
+                if value is not None:
+                    found.append(value)
+            position += 1
+        return found
@@ -0,0 +1,185 @@
+"""
+Профилирование отдельных запросов по требованию.
+
+Запрос профилируется, если в нем передан заголовок X-Profile с секретом
+PROFILE_TOKEN, или случайно с вероятностью PROFILE_SAMPLE_RATE. Два режима:
+cprofile (детерминированный, скачивается как .pstats для snakeviz/pstats) и
+sample (поток раз в PROFILE_SAMPLE_INTERVAL_MS снимает стек потока цикла
+событий; скачивается в формате collapsed stacks для flamegraph.pl/speedscope).
+Последние PROFILE_BUFFER_SIZE профилей хранятся в памяти.
+
+Middleware подключается в main.py, только если задан токен или вероятность,
+поэтому в обычном режиме накладных расходов нет. Одновременно профилируется
+один запрос; цикл событий общий, поэтому в профиль попадают и другие
+запросы, выполнявшиеся в это время.
+"""
+import cProfile
+import collections
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import secrets
+import sys
+import threading
+import time
+from datetime import datetime
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "20"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "2"))
+PROFILING_ENABLED = bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_MODE_HEADER = b"x-profile-mode"
+MODES = ("cprofile", "sample")
+
+profiles = collections.deque(maxlen=PROFILE_BUFFER_SIZE)
+_ids = itertools.count(1)
+_busy = threading.Lock()
+
+
+class StackSampler:
+    """Периодический снимок стека одного потока в отдельном потоке"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+def _wanted(scope):
+    """Режим профилирования для запроса или None"""
+    headers = dict(scope["headers"])
+    token = headers.get(PROFILE_HEADER)
+    if token is not None:
+        if not PROFILE_TOKEN or not secrets.compare_digest(token.decode("latin-1"), PROFILE_TOKEN):
+            return None
+    elif not (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE):
+        return None
+    mode = headers.get(PROFILE_MODE_HEADER, PROFILE_MODE.encode()).decode("latin-1")
+    return mode if mode in MODES else PROFILE_MODE
+
+
+class ProfilingMiddleware:
+    """ASGI middleware: профилирует выбранные запросы и кладет результат в кольцевой буфер"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/api/debug/profiles"):
+            await self.app(scope, receive, send)
+            return
+        mode = _wanted(scope)
+        # Занято другим профилируемым запросом - выполняем без профилирования
+        if mode is None or not _busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = next(_ids)
+        status = [None]
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-profile-id", str(profile_id).encode())
+                ]}
+            await send(message)
+
+        profiler = sampler = None
+        started = time.perf_counter()
+        try:
+            if mode == "cprofile":
+                profiler = cProfile.Profile()
+                profiler.enable()
+            else:
+                sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000)
+                sampler.start()
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if profiler:
+                profiler.disable()
+            if sampler:
+                sampler.stop()
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            _busy.release()
+            _store(profile_id, scope, status[0], duration_ms, mode, profiler, sampler)
+
+
+def _store(profile_id, scope, status, duration_ms, mode, profiler, sampler):
+    entry = {
+        "id": profile_id,
+        "method": scope["method"],
+        "path": scope["path"],
+        "query": scope.get("query_string", b"").decode("latin-1"),
+        "status": status,
+        "durationMs": duration_ms,
+        "mode": mode,
+        "createdAt": datetime.utcnow().isoformat()
+    }
+    if profiler:
+        profiler.create_stats()
+        entry["_pstats"] = marshal.dumps(profiler.stats)
+    else:
+        entry["samples"] = sum(sampler.counts.values())
+        entry["_collapsed"] = sampler.collapsed()
+    profiles.append(entry)
+
+
+def list_profiles():
+    return [{k: v for k, v in entry.items() if not k.startswith("_")} for entry in reversed(profiles)]
+
+
+def get_profile(profile_id: int):
+    for entry in profiles:
+        if entry["id"] == profile_id:
+            return entry
+    return None
+
+
+def render_text(entry, limit: int = 40) -> str:
+    """Текстовый отчет: для cprofile - топ по суммарному времени"""
+    if "_collapsed" in entry:
+        return entry["_collapsed"]
+    out = io.StringIO()
+    pstats.Stats(_SavedStats(entry["_pstats"]), stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+class _SavedStats:
+    """Обертка сохраненной статистики для pstats.Stats (ожидает объект с create_stats и stats)"""
+
+    def __init__(self, data: bytes):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self):
+        pass
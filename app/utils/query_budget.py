@@ -0,0 +1,101 @@
+"""
+Бюджет SQL-запросов для обработчика или участка кода.
+
+    @bookings_router.get("/")
+    @query_budget(3)
+    async def get_all_bookings(...): ...
+
+    with query_budget(2):
+        await BookingService.get_user_bookings(session, user_id)
+
+Запросы считаются слушателями движка (app/models/database.py). При
+превышении в строгом режиме (SQL_STRICT_LOADING, тесты и staging) бросается
+QueryBudgetExceeded со списком отпечатков - так N+1 ломает проверку в CI
+(tests/test_query_budgets.py; отчет - benchmarks/query_budgets.py). В обычном режиме пишется предупреждение.
+"""
+import functools
+import inspect
+from contextvars import ContextVar
+
+from app.models.base import SQL_STRICT_LOADING
+from app.models.database import RequestQueryStats, current_query_stats
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, name: str, budget: int, stats: RequestQueryStats):
+        top = sorted(stats.fingerprints.items(), key=lambda item: -item[1])
+        details = "\n".join(f"  {count} x {fingerprint}" for fingerprint, count in top)
+        super().__init__(f"{name}: {stats.count} SQL queries, budget {budget}\n{details}")
+        self.name = name
+        self.budget = budget
+        self.count = stats.count
+
+
+class query_budget:
+    """Контекстный менеджер и декоратор: не больше max_queries SQL-запросов"""
+
+    def __init__(self, max_queries: int, name: str = None, strict: bool = None):
+        self.max_queries = max_queries
+        self.name = name or "block"
+        self.strict = SQL_STRICT_LOADING if strict is None else strict
+        self._stack = ContextVar(f"query_budget_{id(self)}", default=())
+
+    def _start(self):
+        stats = RequestQueryStats()
+        return stats, current_query_stats.get(), current_query_stats.set(stats)
+
+    def _finish(self, state, exc_type):
+        stats, outer, token = state
+        current_query_stats.reset(token)
+        # Запросы внутри бюджета учитываются и в статистике всего запроса к API
+        if outer is not None:
+            outer.count += stats.count
+            outer.db_ms += stats.db_ms
+            for fingerprint, count in stats.fingerprints.items():
+                outer.fingerprints[fingerprint] = outer.fingerprints.get(fingerprint, 0) + count
+        if exc_type is None and stats.count > self.max_queries:
+            error = QueryBudgetExceeded(self.name, self.max_queries, stats)
+            if self.strict:
+                raise error
+            print(f"⚠️ {error}")
+
+    def __enter__(self):
+        # Состояние - в contextvar: один экземпляр может работать в разных задачах
+        state = self._start()
+        self._stack.set(self._stack.get() + (state,))
+        return state[0]
+
+    def __exit__(self, exc_type, exc, tb):
+        stack = self._stack.get()
+        self._stack.set(stack[:-1])
+        self._finish(stack[-1], exc_type)
+        return False
+
+    def __call__(self, func):
+        if self.name == "block":
+            self.name = func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                # Декоратор разделяется всеми запросами к обработчику - состояние только в локальных
+                state = self._start()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e:
+                    self._finish(state, type(e))
+                    raise
+                self._finish(state, None)
+                return result
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                state = self._start()
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException as e:
+                    self._finish(state, type(e))
+                    raise
+                self._finish(state, None)
+                return result
+        return wrapper
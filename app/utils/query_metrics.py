@@ -0,0 +1,54 @@
+"""
+Число SQL-запросов и время в БД для каждого запроса к API.
+
+Middleware создает RequestQueryStats в contextvar, слушатели движка
+(app/models/database.py) заполняют его, а в ответ добавляются заголовки
+X-Query-Count и X-DB-Time-Ms. Сводки последних запросов хранятся в памяти
+и доступны в /api/debug/queries.
+"""
+import collections
+import os
+
+from app.models.database import RequestQueryStats, current_query_stats
+
+RECENT_REQUESTS_BUFFER = int(os.getenv("QUERY_STATS_RECENT_REQUESTS", "100"))
+
+recent_requests = collections.deque(maxlen=RECENT_REQUESTS_BUFFER)
+
+
+class QueryMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = current_query_stats.set(stats)
+        status = [None]
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-query-count", str(stats.count).encode()),
+                    (b"x-db-time-ms", f"{stats.db_ms:.2f}".encode()),
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_query_stats.reset(token)
+            if stats.count:
+                top = sorted(stats.fingerprints.items(), key=lambda item: -item[1])[:5]
+                recent_requests.append({
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status[0],
+                    "queries": stats.count,
+                    "dbMs": round(stats.db_ms, 2),
+                    "topFingerprints": [{"fingerprint": f, "count": c} for f, c in top]
+                })
@@ -0,0 +1,60 @@
+"""
+Ограничение частоты запросов по ключу (IP, email) в памяти процесса.
+
+Token bucket в форме GCRA: для каждого ключа хранится одно число - момент,
+когда корзина снова станет полной. Запрос разрешен, если этот момент не дальше
+burst интервалов от текущего времени; каждый разрешенный запрос сдвигает его
+на один интервал. Ключи с уже полной корзиной ничем не отличаются от
+отсутствующих и удаляются периодической очисткой. Если ключей все равно больше
+max_keys (много разных IP), вытесняются те, что дольше всех не обращались.
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    def __init__(self, per_minute: float, burst: int, sweep_seconds: float = 60.0, max_keys: int = 100000):
+        self.interval = 60.0 / per_minute
+        self.tolerance = self.interval * max(0, burst - 1)
+        self.sweep_seconds = sweep_seconds
+        self.max_keys = max_keys
+        self._full_at = {}
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._full_at)
+
+    def hit(self, key, now: float = None) -> float:
+        """Попытка израсходовать токен: 0 - разрешено, иначе через сколько секунд повторить"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # Переполнение ускоряет очистку, но не чаще раза в секунду
+            since_sweep = now - self._last_sweep
+            if since_sweep >= self.sweep_seconds or (len(self._full_at) >= self.max_keys and since_sweep >= 1.0):
+                self._sweep_locked(now)
+            full_at = max(self._full_at.get(key, now), now)
+            wait = full_at - now - self.tolerance
+            if wait > 0:
+                return wait
+            # Порядок словаря - по последнему обращению: первым вытесняется самый давний ключ
+            self._full_at.pop(key, None)
+            self._full_at[key] = full_at + self.interval
+            while len(self._full_at) > self.max_keys:
+                del self._full_at[next(iter(self._full_at))]
+            return 0.0
+
+    def sweep(self, now: float = None) -> int:
+        with self._lock:
+            return self._sweep_locked(time.monotonic() if now is None else now)
+
+    def _sweep_locked(self, now: float) -> int:
+        expired = [key for key, full_at in self._full_at.items() if full_at <= now]
+        for key in expired:
+            del self._full_at[key]
+        self._last_sweep = now
+        return len(expired)
+
+    def reset(self):
+        with self._lock:
+            self._full_at.clear()
@@ -0,0 +1,117 @@
+"""
+Легковесный планировщик периодических задач на asyncio.
+
+Каждая задача крутится в своем asyncio.Task: ждет интервал со случайным
+разбросом (jitter, чтобы несколько процессов не запускали обслуживание
+одновременно), выполняется и снова засыпает. Один и тот же job не может
+выполняться параллельно сам с собой - ни по расписанию, ни при ручном запуске.
+При остановке задачи отменяются и дожидаются завершения.
+"""
+import asyncio
+import random
+import time
+import traceback
+from datetime import datetime
+
+
+class Job:
+    def __init__(self, name: str, func, interval: float, jitter: float = 0.1, initial_delay: float = None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.initial_delay = interval if initial_delay is None else initial_delay
+        self.lock = asyncio.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = None
+        self.last_run_at = None
+        self.last_result = None
+        self.last_error = None
+
+    def next_delay(self, base: float) -> float:
+        spread = base * self.jitter
+        return max(0.0, base + random.uniform(-spread, spread))
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "running": self.lock.locked(),
+            "lastMs": self.last_ms,
+            "avgMs": round(self.total_ms / self.runs, 2) if self.runs else None,
+            "maxMs": self.max_ms,
+            "lastRunAt": self.last_run_at,
+            "lastResult": self.last_result,
+            "lastError": self.last_error
+        }
+
+
+class Scheduler:
+    def __init__(self, shutdown_timeout: float = 10.0):
+        self.jobs = {}
+        self.shutdown_timeout = shutdown_timeout
+        self._tasks = []
+
+    def add_job(self, name: str, func, interval: float, jitter: float = 0.1, initial_delay: float = None):
+        self.jobs[name] = Job(name, func, interval, jitter, initial_delay)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        if self._tasks:
+            return
+        for job in self.jobs.values():
+            if job.interval > 0:
+                self._tasks.append(asyncio.create_task(self._loop(job), name=f"maintenance:{job.name}"))
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            # Задача, прерванная посреди запроса, получает CancelledError внутри await
+            await asyncio.wait(tasks, timeout=self.shutdown_timeout)
+
+    async def run_job(self, name: str):
+        """Выполнение задачи; None - задача уже выполняется (повторный запуск пропущен)"""
+        job = self.jobs[name]
+        if job.lock.locked():
+            job.skipped += 1
+            return None
+        async with job.lock:
+            started = time.perf_counter()
+            job.last_run_at = datetime.utcnow().isoformat()
+            try:
+                job.last_result = await job.func()
+                job.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.failures += 1
+                job.last_error = str(e)
+                print(f"❌ Ошибка задачи обслуживания {name}: {e}")
+                traceback.print_exc()
+            finally:
+                elapsed = round((time.perf_counter() - started) * 1000, 2)
+                job.runs += 1
+                job.total_ms += elapsed
+                job.last_ms = elapsed
+                job.max_ms = max(job.max_ms, elapsed)
+            return job.last_result
+
+    async def _loop(self, job: Job):
+        await asyncio.sleep(job.next_delay(job.initial_delay))
+        while True:
+            await self.run_job(job.name)
+            await asyncio.sleep(job.next_delay(job.interval))
+
+    def stats(self) -> dict:
+        return {"running": self.running, "jobs": {name: job.stats() for name, job in self.jobs.items()}}
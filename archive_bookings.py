@@ -0,0 +1,38 @@
+"""
+Перенос прошедших бронирований в таблицу bookings_archive
+(см. app/services/archive_service.py).
+
+Переносятся бронирования старше горизонта (ARCHIVE_HORIZON_DAYS, по умолчанию
+90 дней) чанками по ARCHIVE_CHUNK_SIZE строк, каждый чанк - своя транзакция,
+поэтому приложение может работать во время переноса. Запуск можно повторять.
+
+    python archive_bookings.py
+    python archive_bookings.py --horizon-days 30 --chunk-size 5000
+"""
+import argparse
+import asyncio
+
+from app.models import async_session, init_db
+from app.services.archive_service import ArchiveService, ARCHIVE_CHUNK_SIZE
+
+
+async def run(horizon_days: int, chunk_size: int) -> dict:
+    await init_db()
+    async with async_session() as session:
+        return await ArchiveService.archive_old_bookings(
+            session, horizon_days, chunk_size, progress=lambda moved: print(f"  ... перенесено {moved}")
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Архивация прошедших бронирований")
+    parser.add_argument("--horizon-days", type=int, default=None, help="по умолчанию ARCHIVE_HORIZON_DAYS")
+    parser.add_argument("--chunk-size", type=int, default=ARCHIVE_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    stats = asyncio.run(run(args.horizon_days, args.chunk_size))
+    print(f"🗄️ Перенесено {stats['moved']} бронирований до {stats['cutoff']} за {stats['seconds']} с")
+
+
+if __name__ == "__main__":
+    main()
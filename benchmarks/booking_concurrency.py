@@ -0,0 +1,122 @@
+"""
+Нагрузочная проверка создания бронирований под конкуренцией.
+
+1. Много одновременных запросов на одну комнату и один слот - успешным должен быть ровно один.
+2. Одновременные пересекающиеся интервалы, записанные по-разному ("9:00" и "09:30") -
+   тоже ровно один; интервал с концом раньше начала отклоняется.
+3. Одновременные запросы на разные комнаты - все должны пройти.
+
+В конце в БД проверяется настоящее пересечение интервалов, а не совпадение начала.
+
+Работает на временной копии БД, основную базу не трогает:
+
+    python benchmarks/booking_concurrency.py --requests 50 --rooms 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+TMP_DIR = tempfile.mkdtemp(prefix="soveshchayka_bench_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR}/bench.db"
+sys.path.insert(0, str(BASE_DIR))
+
+import httpx  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.models import async_session, init_db, Booking, Room  # noqa: E402
+
+
+def booking_payload(room_id: str, day: date, start: str = "10:00", end: str = "11:00") -> dict:
+    return {
+        "roomId": room_id,
+        "userId": "user_001",
+        "date": day.isoformat(),
+        "startTime": start,
+        "endTime": end,
+        "title": "Нагрузочный тест",
+    }
+
+
+async def run(requests: int, rooms: int):
+    from main import app
+
+    await init_db(force=True)
+    async with async_session() as session:
+        session.add_all([
+            Room(id=f"bench_room_{i}", name=f"Bench {i}", capacity=4, amenities="", price=0)
+            for i in range(rooms)
+        ])
+        await session.commit()
+
+    day = date.today() + timedelta(days=7)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Одна комната - все запросы на один и тот же слот
+        started = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/api/bookings/", json=booking_payload("bench_room_0", day))
+            for _ in range(requests)
+        ])
+        one_room = time.perf_counter() - started
+        created = sum(1 for r in responses if r.status_code == 200)
+        print(f"🔒 Одна комната: {requests} запросов, создано {created}, {one_room * 1000:.1f} мс")
+        assert created == 1, "двойное бронирование одного слота"
+
+        # Пересекающиеся интервалы без ведущего нуля: строки "9:00" и "10:00" сравниваются
+        # неверно, поэтому время должно нормализоваться до проверки
+        # (все интервалы содержат 9:55 - попарно пересекаются)
+        intervals = [("9:00", "11:00"), ("9:50", "10:30"), ("9:30", "9:58"), ("08:30", "10:00"), ("9:55", "12:00")]
+        responses = await asyncio.gather(*[
+            client.post("/api/bookings/", json=booking_payload("bench_room_1", day, start, end))
+            for start, end in intervals * max(1, requests // len(intervals))
+        ])
+        created = sum(1 for r in responses if r.status_code == 200)
+        print(f"🕘 Пересекающиеся интервалы без ведущего нуля: {len(responses)} запросов, создано {created}")
+        assert created == 1, "двойное бронирование пересекающихся интервалов"
+
+        response = await client.post("/api/bookings/", json=booking_payload("bench_room_2", day, "11:00", "10:00"))
+        assert response.status_code == 400, "интервал с концом раньше начала должен отклоняться"
+
+        # Разные комнаты - конфликтов быть не должно
+        started = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/api/bookings/", json=booking_payload(f"bench_room_{i}", day + timedelta(days=1)))
+            for i in range(rooms)
+        ])
+        many_rooms = time.perf_counter() - started
+        created = sum(1 for r in responses if r.status_code == 200)
+        print(f"🏢 Разные комнаты: {rooms} запросов, создано {created}, {many_rooms * 1000:.1f} мс")
+        assert created == rooms, "запросы к разным комнатам не должны конфликтовать"
+
+    async with async_session() as session:
+        bookings = (await session.execute(
+            select(Booking.id, Booking.room_id, Booking.date, Booking.start_time, Booking.end_time)
+        )).all()
+    for booking in bookings:
+        # Сохраненное время - только каноническое "HH:MM"
+        assert all(len(t) == 5 and t[2] == ":" for t in (booking.start_time, booking.end_time)), booking
+    overlaps = [
+        (a.id, b.id) for a in bookings for b in bookings
+        if a.id < b.id and a.room_id == b.room_id and a.date == b.date
+        and a.start_time < b.end_time and b.start_time < a.end_time
+    ]
+    assert not overlaps, f"в БД есть пересекающиеся бронирования: {overlaps[:5]}"
+    print("✅ Двойных бронирований нет")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Booking concurrency check")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--rooms", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.rooms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Сравнение случайных ключей (booking_<uuid4[:8]>) и упорядоченных по времени
+(booking_<ULID>) при массовой вставке в таблицу, повторяющую bookings.
+
+Для каждой схемы выводится скорость вставки, размер файла в страницах, доля
+заполнения страниц индекса первичного ключа (через dbstat, если он есть в сборке
+SQLite) и число промахов страничного кэша при ограниченном cache_size.
+
+    python benchmarks/id_benchmark.py --rows 1000000 --cache-kb 2048
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.ids import new_id  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE bookings (
+    id VARCHAR(36) NOT NULL PRIMARY KEY,
+    room_id VARCHAR(36) NOT NULL,
+    user_id VARCHAR(36) NOT NULL,
+    date DATE NOT NULL,
+    start_time VARCHAR(5) NOT NULL,
+    end_time VARCHAR(5) NOT NULL,
+    title VARCHAR(255) NOT NULL
+)
+"""
+
+
+def random_id() -> str:
+    # uuid4().hex[:8] дает коллизии на миллионах строк, поэтому берем полный hex
+    return f"booking_{uuid.uuid4().hex}"
+
+
+def ordered_id() -> str:
+    return new_id("booking")
+
+
+def run_scheme(name: str, make_id, rows: int, batch: int, cache_kb: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(prefix="ids_bench_"), f"{name}.db")
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA cache_size = -{cache_kb}")
+    conn.execute(SCHEMA)
+
+    started = time.perf_counter()
+    inserted = 0
+    while inserted < rows:
+        size = min(batch, rows - inserted)
+        conn.executemany(
+            "INSERT INTO bookings VALUES (?, 'room_1', 'user_1', '2026-01-01', '09:00', '10:00', 'bench')",
+            [(make_id(),) for _ in range(size)]
+        )
+        conn.commit()
+        inserted += size
+    elapsed = time.perf_counter() - started
+
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    fill = None
+    try:
+        fill = conn.execute(
+            "SELECT 1.0 - SUM(unused) * 1.0 / SUM(pgsize) FROM dbstat WHERE name = 'sqlite_autoindex_bookings_1'"
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        pass
+
+    # Промахи кэша при чтении первой страницы результатов (последние созданные записи)
+    conn.execute("PRAGMA cache_size = -256")
+    started = time.perf_counter()
+    conn.execute("SELECT id FROM bookings ORDER BY id DESC LIMIT 1000").fetchall()
+    page_scan_ms = (time.perf_counter() - started) * 1000
+    conn.close()
+    os.remove(path)
+
+    return {
+        "name": name,
+        "rows_per_sec": rows / elapsed,
+        "seconds": elapsed,
+        "pages": page_count,
+        "index_fill": fill,
+        "last_page_ms": page_scan_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Random vs time-ordered primary keys")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--cache-kb", type=int, default=2048)
+    args = parser.parse_args()
+
+    for name, make_id in (("random", random_id), ("ulid", ordered_id)):
+        result = run_scheme(name, make_id, args.rows, args.batch, args.cache_kb)
+        fill = f"{result['index_fill'] * 100:.0f}%" if result["index_fill"] is not None else "n/a"
+        print(
+            f"{result['name']:>7}: {result['rows_per_sec']:,.0f} строк/с ({result['seconds']:.1f} с), "
+            f"страниц {result['pages']:,}, заполнение индекса {fill}, "
+            f"последние 1000 по id: {result['last_page_ms']:.1f} мс"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Проверка бюджетов SQL-запросов (защита от N+1) для CI.
+
+Приложение запускается в строгом режиме (SQL_STRICT_LOADING=True) на временной
+копии БД с дополнительными данными: неявная ленивая загрузка связей падает
+сразу, а обработчики с @query_budget при превышении отвечают ошибкой.
+Для каждого запроса печатается число SQL-запросов из заголовка X-Query-Count;
+код выхода 1 - есть ошибки или превышения.
+
+    python benchmarks/query_budgets.py
+    python benchmarks/query_budgets.py --bookings 500
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+TMP_DIR = tempfile.mkdtemp(prefix="soveshchayka_budget_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR}/budget.db"
+os.environ["SQL_STRICT_LOADING"] = "True"
+os.environ["SQL_INSTRUMENTATION"] = "True"
+os.environ["MAINTENANCE_ENABLED"] = "False"
+os.environ["LOGIN_RATE_LIMIT_ENABLED"] = "False"
+sys.path.insert(0, str(BASE_DIR))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+def seed(client: TestClient, bookings: int):
+    """Дополнительные пользователи и бронирования: N+1 проявляется только на многих строках"""
+    rooms = client.get("/api/rooms/").json()
+    users = []
+    for i in range(10):
+        response = client.post("/api/users/register", json={
+            "firstName": "Бюджет" + "абвгдежзик"[i], "lastName": "Тест", "email": f"budget{i}@example.com", "password": "password123"
+        })
+        if response.status_code < 300:
+            users.append(response.json()["id"])
+    start = date.today() + timedelta(days=1)
+    for i in range(bookings):
+        client.post("/api/bookings/", json={
+            "roomId": rooms[i % len(rooms)]["id"],
+            "userId": users[i % len(users)],
+            "date": (start + timedelta(days=i // 40)).isoformat(),
+            "startTime": f"{8 + (i // len(rooms)) % 10:02d}:00",
+            "endTime": f"{8 + (i // len(rooms)) % 10:02d}:30",
+            "title": f"Бюджет {i}",
+        })
+    return rooms, users
+
+
+async def concurrent_check(app, paths, parallel: int) -> int:
+    """Одновременные запросы к обработчикам с @query_budget: состояние бюджета
+    не должно разделяться между запросами. Возвращает число ошибок"""
+    import asyncio
+    import httpx
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://budget") as client:
+        failures = 0
+        for path in paths:
+            responses = await asyncio.gather(*(client.get(path) for _ in range(parallel)))
+            bad = [r for r in responses if r.status_code >= 400]
+            failures += len(bad)
+            print(f"{'✅' if not bad else '❌'} {parallel} x GET {path} одновременно: ошибок {len(bad)}")
+            if bad:
+                print(f"   {bad[0].text[:300]}")
+        return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка бюджетов SQL-запросов")
+    parser.add_argument("--bookings", type=int, default=200)
+    parser.add_argument("--parallel", type=int, default=20)
+    args = parser.parse_args()
+
+    from main import app
+
+    failures = 0
+    try:
+        with TestClient(app, raise_server_exceptions=False) as client:
+            rooms, users = seed(client, args.bookings)
+            booking_id = client.get("/api/bookings/").json()[0]["id"]
+            checks = [
+                ("GET", "/api/bookings/", None),
+                ("GET", f"/api/bookings/?user_id={users[0]}", None),
+                ("GET", f"/api/bookings/{booking_id}", None),
+                ("GET", "/api/users/", None),
+                ("GET", f"/api/users/{users[0]}", None),
+                ("GET", "/api/rooms/", None),
+                ("GET", f"/api/rooms/timeline?date_from={date.today().isoformat()}", None),
+                ("GET", "/api/admin/users", None),
+                ("GET", "/api/admin/stats", None),
+                ("POST", "/api/users/login", {"email": "budget0@example.com", "password": "password123"}),
+            ]
+            for method, path, body in checks:
+                response = client.request(method, path, json=body)
+                ok = response.status_code < 400
+                failures += not ok
+                print(f"{'✅' if ok else '❌'} {method} {path}: {response.status_code}, "
+                      f"SQL-запросов {response.headers.get('x-query-count', '?')}")
+                if not ok:
+                    print(f"   {response.text[:300]}")
+            # В цикле событий приложения (запущенном TestClient) - как под uvicorn
+            failures += client.portal.call(concurrent_check, app, [
+                "/api/bookings/", "/api/users/", "/api/rooms/",
+                f"/api/rooms/timeline?date_from={date.today().isoformat()}",
+            ], args.parallel)
+    finally:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+    print("Превышений и ошибок нет" if not failures else f"Ошибок: {failures}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
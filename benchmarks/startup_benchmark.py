@@ -0,0 +1,62 @@
+"""
+Замер времени до первого успешного запроса (time-to-first-request).
+
+Запускает uvicorn в отдельном процессе, опрашивает /health до первого ответа 200
+и повторяет замер несколько раз. Первый прогон обычно выполняет полную
+инициализацию БД, последующие идут по быстрому пути (схема уже актуальна).
+
+    python benchmarks/startup_benchmark.py --runs 5 --port 8765
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+
+
+def wait_first_request(port: int, timeout: float) -> float:
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=0.5) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"Сервер не ответил за {timeout} с")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-first-request benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    results = []
+    for run in range(args.runs):
+        elapsed = wait_first_request(args.port, args.timeout)
+        results.append(elapsed * 1000)
+        print(f"  прогон {run + 1}: {elapsed * 1000:.1f} мс")
+
+    print(f"⏱️ time-to-first-request: медиана {statistics.median(results):.1f} мс, "
+          f"мин {min(results):.1f} мс, макс {max(results):.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Пропускная способность serve.py при разном числе воркеров.
+
+Для каждого значения WEB_CONCURRENCY запускается serve.py на временной копии
+БД, после чего несколько процессов-клиентов в течение заданного времени
+шлют запросы по keep-alive соединениям. Клиенты - отдельные процессы, чтобы
+генератор нагрузки сам не упирался в GIL.
+
+    python benchmarks/worker_throughput.py
+    python benchmarks/worker_throughput.py --workers 1 2 4 8 --duration 10 --clients 32 --path /api/rooms/
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port: int, path: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", path)
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"serve.py не ответил за {timeout} с")
+
+
+def client(port: int, path: str, duration: float, connections: int, results):
+    """Один процесс-клиент: несколько keep-alive соединений по кругу"""
+    pool = [http.client.HTTPConnection("127.0.0.1", port, timeout=10) for _ in range(connections)]
+    done = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        for i, conn in enumerate(pool):
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    done += 1
+                else:
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                pool[i] = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    results.put((done, errors))
+
+
+def measure(workers: int, args, db_path: Path) -> dict:
+    port = free_port()
+    env = dict(os.environ,
+               WEB_CONCURRENCY=str(workers), PORT=str(port), HOST="127.0.0.1",
+               DATABASE_URL=f"sqlite+aiosqlite:///{db_path}", MAINTENANCE_ENABLED="False",
+               LOGIN_RATE_LIMIT_ENABLED="False", LOG_LEVEL="error")
+    server = subprocess.Popen([sys.executable, str(BASE_DIR / "serve.py")], cwd=BASE_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port, args.path)
+        results = multiprocessing.Queue()
+        per_process = max(1, args.clients // args.processes)
+        processes = [
+            multiprocessing.Process(target=client, args=(port, args.path, args.duration, per_process, results))
+            for _ in range(args.processes)
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - started
+        for process in processes:
+            process.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+    done = sum(t[0] for t in totals)
+    errors = sum(t[1] for t in totals)
+    return {"workers": workers, "requests": done, "errors": errors, "rps": done / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пропускная способность serve.py по числу воркеров")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=32, help="всего keep-alive соединений")
+    parser.add_argument("--processes", type=int, default=min(8, os.cpu_count() or 1), help="процессов-клиентов")
+    parser.add_argument("--path", default="/api/rooms/")
+    args = parser.parse_args()
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="soveshchayka_bench_"))
+    db_path = tmp_dir / "bench.db"
+    source = BASE_DIR / "database" / "soveshchayka.db"
+    if source.exists():
+        shutil.copy(source, db_path)
+
+    print(f"GET {args.path}, {args.duration} с, {args.clients} соединений в {args.processes} процессах, "
+          f"CPU: {os.cpu_count()}")
+    baseline = None
+    try:
+        for workers in args.workers:
+            result = measure(workers, args, db_path)
+            baseline = baseline or result["rps"]
+            print(f"  воркеров {workers:>2}: {result['rps']:8.0f} запр/с  "
+                  f"(x{result['rps'] / baseline:.2f}, ошибок {result['errors']})")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
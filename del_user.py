@@ -1,21 +1,44 @@
-import sqlite3
+"""
+Удаление пользователя вместе с его бронированиями (включая архив).
 
-# Подключитесь к базе
-conn = sqlite3.connect('database/soveshchayka.db')
-cursor = conn.cursor()
+Бронирования удаляются чанками по DELETE_CHUNK_SIZE строк, каждый чанк - своя
+транзакция, поэтому приложение может работать во время удаления. Другие
+процессы приложения сбрасывают кэши по change_log.
 
-# Проверьте
-cursor.execute("SELECT * FROM users WHERE id = ?", ('user_b63c11a9',))
-user = cursor.fetchone()
-print(f"Найден пользователь: {user}")
+    python del_user.py user_b63c11a9
+    python del_user.py user_b63c11a9 --chunk-size 10000
+"""
+import argparse
+import asyncio
 
-# Удалите
-cursor.execute("DELETE FROM users WHERE id = ?", ('user_b63c11a9',))
-cursor.execute("DELETE FROM bookings WHERE user_id = ?", ('user_b63c11a9',))
+from app.models import async_session, init_db
+from app.exceptions.user_exceptions import UserNotFound
+from app.services.deletion_service import DELETE_CHUNK_SIZE
+from app.services.user_service import UserService
 
-# Сохраните изменения
-conn.commit()
-print("✅ Пользователь удален")
 
-# Закройте соединение
-conn.close()
\ No newline at end of file
+async def run(user_id: str, chunk_size: int) -> dict:
+    await init_db()
+    async with async_session() as session:
+        return await UserService.delete_user(
+            session, user_id, chunk_size,
+            progress=lambda stats: print(f"  ... удалено бронирований {stats['bookings']}, из архива {stats['archived']}")
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Удаление пользователя и его бронирований")
+    parser.add_argument("user_id")
+    parser.add_argument("--chunk-size", type=int, default=DELETE_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    try:
+        stats = asyncio.run(run(args.user_id, args.chunk_size))
+    except UserNotFound:
+        print(f"❌ Пользователь {args.user_id} не найден")
+        raise SystemExit(1)
+    print(f"✅ Пользователь удален: бронирований {stats['bookings']}, из архива {stats['archived']} за {stats['seconds']} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Массовый импорт бронирований из CSV или ICS (см. app/services/import_service.py).
+
+Файл читается построчно и обрабатывается чанками: комнаты сопоставляются по
+названию или id, пользователи - по email или id. Строки, пересекающиеся с уже
+существующими бронированиями или друг с другом, пропускаются и считаются
+конфликтами. В пробном режиме (--dry-run) принятые интервалы держатся в памяти -
+она растет с числом различных пар (комната, дата) в файле.
+
+CSV: room,email,date,start_time,end_time,title,participants (участники через ;)
+ICS: VEVENT с LOCATION (комната), ORGANIZER (владелец), DTSTART/DTEND, ATTENDEE
+
+    python import_bookings.py bookings.csv
+    python import_bookings.py export.ics --chunk-size 10000 --dry-run
+"""
+import argparse
+import asyncio
+
+from app.models import async_session, init_db
+from app.services.import_service import ImportService, IMPORT_CHUNK_SIZE
+
+
+def print_progress(stats: dict):
+    print(f"  ... прочитано {stats['read']}, импортировано {stats['imported']}, "
+          f"конфликтов {stats['conflicts']}, ошибок {stats['errors']}")
+
+
+async def run(path: str, file_format: str, chunk_size: int, dry_run: bool) -> dict:
+    await init_db()
+    with open(path, encoding="utf-8-sig", newline="") as lines:
+        async with async_session() as session:
+            return await ImportService.import_rows(
+                session, ImportService.parse(lines, ImportService.detect_format(path, file_format)),
+                chunk_size=chunk_size, dry_run=dry_run, progress=print_progress
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт бронирований из CSV/ICS")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ics"], help="по умолчанию - по расширению файла")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="только проверка, без записи")
+    args = parser.parse_args()
+
+    stats = asyncio.run(run(args.path, args.format, args.chunk_size, args.dry_run))
+    print(f"📥 Прочитано {stats['read']}, импортировано {stats['imported']}, "
+          f"конфликтов {stats['conflicts']}, ошибок {stats['errors']}")
+    print(f"⏱️ {stats['seconds']} с, {stats['rowsPerSecond']} строк/с")
+    for sample in stats["errorSamples"][:10]:
+        print(f"  строка {sample['row']}: {sample['error']}")
+
+
+if __name__ == "__main__":
+    main()
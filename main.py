@@ -1,12 +1,13 @@
+import time
+STARTUP_T0 = time.perf_counter()
+
 import logging
 from fastapi import FastAPI, Request, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
-import uvicorn
 from pathlib import Path
 import mimetypes
 from dotenv import load_dotenv
@@ -20,8 +21,19 @@ from app.exceptions.role_exceptions import RoleNotFound, InvalidRoleData
 from app.api import debug_router
 
 # Импортируем роутеры из app
-from app.api import users_router, rooms_router, bookings_router, admin_router, roles_router
-from app.models import init_db
+from app.api import users_router, rooms_router, bookings_router, admin_router, roles_router, scheduling_router, calendar_router
+from app.models import init_db, async_session
+from app.services.user_service import UserService
+from app.services.room_service import RoomService
+from app.services.maintenance_service import maintenance_scheduler, MAINTENANCE_ENABLED
+from app.services.invalidation_service import change_watcher
+from app.services.health_service import HealthService
+from app.utils.loop_lag import loop_lag_monitor
+from app.utils.jobs import background_jobs
+from app.utils.idempotency import IdempotencyMiddleware
+from app.utils.profiling import ProfilingMiddleware, PROFILING_ENABLED
+from app.utils.query_metrics import QueryMetricsMiddleware
+from app.models.database import SQL_INSTRUMENTATION
 
 load_dotenv()
 
@@ -33,18 +45,45 @@ PORT = int(os.getenv("PORT", "8000"))
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+IMPORT_DONE = time.perf_counter()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 Инициализация базы данных...")
+    report = {"imports_ms": round((IMPORT_DONE - STARTUP_T0) * 1000, 2)}
+    init_started = time.perf_counter()
     try:
-        await init_db()
+        report["init_db"] = await init_db()
         print("✅ База данных инициализирована")
     except Exception as e:
         print(f"❌ Ошибка инициализации БД: {e}")
         import traceback
         traceback.print_exc()
+    report["init_db_ms"] = round((time.perf_counter() - init_started) * 1000, 2)
+
+    index_started = time.perf_counter()
+    try:
+        async with async_session() as session:
+            await UserService.load_search_index(session)
+            await RoomService.load_search_index(session)
+    except Exception as e:
+        print(f"❌ Ошибка построения индекса поиска: {e}")
+    report["search_index_ms"] = round((time.perf_counter() - index_started) * 1000, 2)
+    report["total_ms"] = round((time.perf_counter() - STARTUP_T0) * 1000, 2)
+    app.state.startup_report = report
+    print(f"⏱️ Время запуска: импорты {report['imports_ms']} мс, "
+          f"БД {report['init_db_ms']} мс, всего {report['total_ms']} мс")
+    change_watcher.start()
+    loop_lag_monitor.start()
+    if MAINTENANCE_ENABLED:
+        maintenance_scheduler.start()
+        print(f"🧹 Планировщик обслуживания запущен: {', '.join(maintenance_scheduler.jobs)}")
     yield
     print("🛑 Приложение завершает работу...")
+    await background_jobs.stop()
+    await maintenance_scheduler.stop()
+    await change_watcher.stop()
+    await loop_lag_monitor.stop()
 
 app = FastAPI(
     title="Совещайка - Система бронирования переговорных комнат",
@@ -53,6 +92,17 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Повтор ответа для POST-запросов с заголовком Idempotency-Key
+app.add_middleware(IdempotencyMiddleware)
+
+# Число SQL-запросов и время в БД для каждого запроса (заголовки X-Query-Count, X-DB-Time-Ms)
+if SQL_INSTRUMENTATION:
+    app.add_middleware(QueryMetricsMiddleware)
+
+# Профилирование по заголовку X-Profile или выборочно; без настроек не подключается
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 # Настройка CORS
 app.add_middleware(
     CORSMiddleware,
@@ -75,8 +125,15 @@ app.mount("/static", StaticFiles(directory=APP_DIR / "static"), name="static")
 app.mount("/static", StaticFiles(directory=APP_DIR / "static"), name="static")
 app.mount("/icons", StaticFiles(directory=APP_DIR / "icons"), name="icons")
 
-# Настройка шаблонов
-templates = Jinja2Templates(directory=APP_DIR / "templates")
+# Шаблоны нужны только главной странице - создаем их при первом обращении
+_templates = None
+
+def get_templates():
+    global _templates
+    if _templates is None:
+        from fastapi.templating import Jinja2Templates
+        _templates = Jinja2Templates(directory=APP_DIR / "templates")
+    return _templates
 
 # Подключение API роутеров
 app.include_router(users_router, prefix="/api/users", tags=["Users"])
@@ -84,6 +141,8 @@ app.include_router(rooms_router, prefix="/api/rooms", tags=["Rooms"])
 app.include_router(bookings_router, prefix="/api/bookings", tags=["Bookings"])
 app.include_router(admin_router, prefix="/api/admin", tags=["Admin"])
 app.include_router(roles_router, prefix="/api/roles", tags=["Roles"])
+app.include_router(scheduling_router, prefix="/api/scheduling", tags=["Scheduling"])
+app.include_router(calendar_router, prefix="/api/calendar", tags=["Calendar"])
 app.include_router(debug_router, prefix="/api/debug", tags=["Debug"])
 
 # Обработчики исключений
@@ -119,14 +178,21 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 # Главная страница
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return get_templates().TemplateResponse("index.html", {"request": request})
 
 # Здоровье приложения
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "soveshaika"}
 
+# Готовность принимать запросы: БД отвечает, пул не исчерпан, цикл событий не перегружен
+@app.get("/ready")
+async def readiness_check():
+    report = await HealthService.readiness()
+    return JSONResponse(report, status_code=200 if report["status"] == "ready" else 503)
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
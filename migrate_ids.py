@@ -0,0 +1,90 @@
+"""
+Перевод существующих ключей комнат, пользователей и бронирований на
+упорядоченные по времени идентификаторы (см. app/utils/ids.py).
+
+Новые записи и так получают новые ключи - скрипт нужен, только если требуется
+единый порядок для старых данных. Новый ключ строится из created_at записи,
+ссылки room_id/user_id в bookings и bookings_archive обновляются в той же
+транзакции; архивные бронирования получают ключи так же, как действующие.
+Записи, уже имеющие ключ нового формата, пропускаются, поэтому запуск можно
+повторять. После миграции пользователям нужно войти заново (в браузере
+сохранен старый id).
+
+    python migrate_ids.py --dry-run
+    python migrate_ids.py --db database/soveshchayka.db
+"""
+import argparse
+import sqlite3
+from datetime import datetime, timezone
+
+from app.utils.ids import new_id, id_timestamp_ms
+
+# таблица -> (префикс, [(дочерняя таблица, столбец-ссылка)])
+TABLES = {
+    "rooms": ("room", [("bookings", "room_id"), ("bookings_archive", "room_id")]),
+    "users": ("user", [("bookings", "user_id"), ("bookings_archive", "user_id")]),
+    "bookings": ("booking", []),
+    "bookings_archive": ("booking", []),
+}
+
+
+def created_at_ms(value) -> int:
+    if not value:
+        return None
+    created = datetime.fromisoformat(str(value))
+    if created.tzinfo is None:
+        # created_at хранится как datetime.utcnow()
+        created = created.replace(tzinfo=timezone.utc)
+    return int(created.timestamp() * 1000)
+
+
+def migrate(conn: sqlite3.Connection, dry_run: bool) -> dict:
+    stats = {}
+    # bookings_archive нет в базах до появления архива
+    existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table, (prefix, references) in TABLES.items():
+        if table not in existing:
+            continue
+        rows = conn.execute(f"SELECT id, created_at FROM {table} ORDER BY created_at, id").fetchall()
+        mapping = {}
+        for old_id, created_at in rows:
+            if id_timestamp_ms(old_id) is not None:
+                continue
+            mapping[old_id] = new_id(prefix, created_at_ms(created_at))
+
+        stats[table] = len(mapping)
+        print(f"📦 {table}: {len(mapping)} из {len(rows)} ключей к переводу")
+        if dry_run:
+            for old_id, new in list(mapping.items())[:5]:
+                print(f"   {old_id} -> {new}")
+            continue
+
+        conn.executemany(f"UPDATE {table} SET id = ? WHERE id = ?", [(new, old) for old, new in mapping.items()])
+        for child_table, column in references:
+            if child_table not in existing:
+                continue
+            conn.executemany(
+                f"UPDATE {child_table} SET {column} = ? WHERE {column} = ?",
+                [(new, old) for old, new in mapping.items()]
+            )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate primary keys to time-ordered ids")
+    parser.add_argument("--db", default="database/soveshchayka.db")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        with conn:
+            migrate(conn, args.dry_run)
+        if not args.dry_run:
+            print("✅ Ключи переведены на новый формат")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
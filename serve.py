@@ -0,0 +1,186 @@
+"""
+Запуск для продакшена: несколько процессов-воркеров uvicorn.
+
+Главный процесс один раз импортирует приложение и инициализирует БД (preload),
+открывает слушающий сокет и порождает воркеры через fork - они наследуют
+уже импортированные модули и общий сокет. Воркер завершается после
+MAX_REQUESTS запросов (с разбросом MAX_REQUESTS_JITTER, чтобы воркеры не
+перезапускались одновременно) и заменяется новым - это ограничивает рост
+памяти. Фоновое обслуживание (app/services/maintenance_service.py) работает
+только в воркере 0.
+
+uvloop и httptools используются, если установлены.
+
+    WEB_CONCURRENCY=4 python serve.py
+
+Переменные окружения: HOST, PORT, WEB_CONCURRENCY, MAX_REQUESTS,
+MAX_REQUESTS_JITTER, GRACEFUL_TIMEOUT, BACKLOG, LOG_LEVEL, FORWARDED_ALLOW_IPS.
+За обратным прокси укажите его адрес в FORWARDED_ALLOW_IPS: тогда адрес клиента
+берется из X-Forwarded-For (иначе все клиенты прокси делят один лимит входа).
+Для разработки по-прежнему: python main.py (один процесс с перезагрузкой).
+"""
+import asyncio
+import importlib.util
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "10000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+BACKLOG = int(os.getenv("BACKLOG", "2048"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "warning")
+# Прокси, которым доверяется X-Forwarded-For (через запятую, "*" - любым)
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+LOOP = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+HTTP = "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def create_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in HOST else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """Импорт приложения и инициализация схемы в главном процессе, до fork"""
+    import main
+    from app.models import init_db, engine
+
+    async def prepare():
+        await init_db()
+        # Соединения не должны переходить в дочерние процессы
+        await engine.dispose()
+
+    asyncio.run(prepare())
+    return main
+
+
+def run_worker(main_module, sock: socket.socket, slot: int) -> int:
+    import uvicorn
+
+    # Обслуживание БД достаточно выполнять в одном процессе
+    if slot != 0:
+        main_module.MAINTENANCE_ENABLED = False
+
+    limit = MAX_REQUESTS + random.randint(0, MAX_REQUESTS_JITTER) if MAX_REQUESTS > 0 else None
+    config = uvicorn.Config(
+        main_module.app,
+        loop=LOOP,
+        http=HTTP,
+        log_level=LOG_LEVEL,
+        limit_max_requests=limit,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+    )
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    return 0
+
+
+class Master:
+    def __init__(self, main_module, sock: socket.socket, workers: int):
+        self.main_module = main_module
+        self.sock = sock
+        self.workers = workers
+        self.children = {}  # pid -> номер слота
+        self.stopping = False
+        self.recycled = 0
+
+    def spawn(self, slot: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 1
+            try:
+                code = run_worker(self.main_module, self.sock, slot)
+            finally:
+                os._exit(code)
+        self.children[pid] = slot
+
+    def stop(self, signum, frame):
+        if not self.stopping:
+            print(f"🛑 Остановка воркеров ({signal.Signals(signum).name})...")
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            slot = self.children.pop(pid, None)
+            if slot is None:
+                continue
+            if not self.stopping:
+                code = os.waitstatus_to_exitcode(status)
+                if code == 0:
+                    self.recycled += 1
+                else:
+                    print(f"⚠️ Воркер {pid} завершился с кодом {code}, перезапуск")
+                    # Защита от быстрого цикла падений при ошибке в коде
+                    time.sleep(1)
+                self.spawn(slot)
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        for slot in range(self.workers):
+            self.spawn(slot)
+        print(f"🚀 {self.workers} воркеров на {HOST}:{PORT} (loop={LOOP}, http={HTTP}, "
+              f"max_requests={MAX_REQUESTS}±{MAX_REQUESTS_JITTER})")
+
+        while not self.stopping:
+            self.reap()
+            time.sleep(0.2)
+
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            print(f"⚠️ Воркер {pid} не завершился за {GRACEFUL_TIMEOUT} с, принудительная остановка")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        print(f"✅ Остановлено, воркеров перезапущено по лимиту запросов: {self.recycled}")
+
+
+def main():
+    if not hasattr(os, "fork"):
+        # Windows: без fork - обычный многопроцессный режим uvicorn
+        import uvicorn
+        uvicorn.run("main:app", host=HOST, port=PORT, workers=WEB_CONCURRENCY, loop=LOOP, http=HTTP,
+                    log_level=LOG_LEVEL, limit_max_requests=MAX_REQUESTS or None,
+                    proxy_headers=True, forwarded_allow_ips=FORWARDED_ALLOW_IPS)
+        return
+
+    main_module = preload()
+    sock = create_socket()
+    Master(main_module, sock, max(1, WEB_CONCURRENCY)).run()
+    sock.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
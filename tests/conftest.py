@@ -0,0 +1,71 @@
+"""
+Общие фикстуры тестов.
+
+Приложение запускается в строгом режиме (SQL_STRICT_LOADING=True) на временной БД:
+неявная ленивая загрузка связей и превышение @query_budget ломают запрос.
+Переменные окружения задаются до импорта приложения - настройки читаются при импорте.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+BASE_DIR = Path(__file__).parent.parent
+TMP_DIR = tempfile.mkdtemp(prefix="soveshchayka_tests_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR}/test.db"
+os.environ["SQL_STRICT_LOADING"] = "True"
+os.environ["SQL_INSTRUMENTATION"] = "True"
+os.environ["MAINTENANCE_ENABLED"] = "False"
+os.environ["LOGIN_RATE_LIMIT_ENABLED"] = "False"
+sys.path.insert(0, str(BASE_DIR))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+SEED_USERS = 10
+SEED_BOOKINGS = 200
+
+
+def seed(client: TestClient, bookings: int = SEED_BOOKINGS):
+    """Дополнительные пользователи и бронирования: N+1 проявляется только на многих строках"""
+    rooms = client.get("/api/rooms/").json()
+    users = []
+    for i in range(SEED_USERS):
+        response = client.post("/api/users/register", json={
+            "firstName": "Тест" + "абвгдежзик"[i], "lastName": "Бюджет", "email": f"budget{i}@example.com",
+            "password": "password123"
+        })
+        assert response.status_code < 300, response.text
+        users.append(response.json()["id"])
+    # Демо-данные занимают сегодня и завтра; неделя от послезавтра попадает в ленту по умолчанию
+    start = date.today() + timedelta(days=2)
+    booking_ids = []
+    for i in range(bookings):
+        response = client.post("/api/bookings/", json={
+            "roomId": rooms[i % len(rooms)]["id"],
+            "userId": users[i % len(users)],
+            "date": (start + timedelta(days=i // 40)).isoformat(),
+            "startTime": f"{8 + (i // len(rooms)) % 10:02d}:00",
+            "endTime": f"{8 + (i // len(rooms)) % 10:02d}:30",
+            "title": f"Бюджет {i}",
+        })
+        assert response.status_code < 300, response.text
+        booking_ids.append(response.json()["id"])
+    return rooms, users, booking_ids
+
+
+@pytest.fixture(scope="session")
+def app():
+    from main import app
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    with TestClient(app) as client:
+        client.rooms, client.users, client.booking_ids = seed(client)
+        yield client
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
@@ -0,0 +1,71 @@
+"""
+Бюджеты SQL-запросов (защита от N+1): обработчики с @query_budget вызываются
+через TestClient в строгом режиме, превышение бюджета - ошибка запроса.
+Вывод числа запросов по каждому обработчику - benchmarks/query_budgets.py.
+"""
+import asyncio
+from datetime import date
+
+import httpx
+import pytest
+
+from app.models import async_session, Booking
+from app.utils.query_budget import query_budget, QueryBudgetExceeded
+from sqlalchemy import select
+
+TIMELINE = f"/api/rooms/timeline?date_from={date.today().isoformat()}"
+
+
+def budget_checks(client):
+    booking_id = client.booking_ids[0]
+    user_id = client.users[0]
+    return {
+        "bookings": ("GET", "/api/bookings/", None),
+        "bookings_by_user": ("GET", f"/api/bookings/?user_id={user_id}", None),
+        "booking": ("GET", f"/api/bookings/{booking_id}", None),
+        "users": ("GET", "/api/users/", None),
+        "user": ("GET", f"/api/users/{user_id}", None),
+        "rooms": ("GET", "/api/rooms/", None),
+        "timeline": ("GET", TIMELINE, None),
+        "admin_users": ("GET", "/api/admin/users", None),
+        "admin_stats": ("GET", "/api/admin/stats", None),
+        "login": ("POST", "/api/users/login", {"email": "budget0@example.com", "password": "password123"}),
+    }
+
+
+@pytest.mark.parametrize("name", [
+    "bookings", "bookings_by_user", "booking", "users", "user", "rooms", "timeline",
+    "admin_users", "admin_stats", "login",
+])
+def test_endpoint_within_budget(client, name):
+    method, path, body = budget_checks(client)[name]
+    response = client.request(method, path, json=body)
+    assert response.status_code < 400, response.text
+    # Без счетчика запросов бюджеты не проверяются - тест прошел бы впустую
+    assert "x-query-count" in response.headers
+    # Список бронирований перехватывает ошибки и отдает [] - пустой ответ тоже поломка
+    if name in ("bookings", "bookings_by_user"):
+        assert response.json()
+
+
+def test_budget_state_not_shared_between_requests(client, app):
+    """Одновременные запросы к одному обработчику: бюджет считается для каждого отдельно"""
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://budget") as http:
+            for path in ("/api/bookings/", "/api/users/", "/api/rooms/", TIMELINE):
+                responses = await asyncio.gather(*(http.get(path) for _ in range(20)))
+                assert [r.status_code for r in responses] == [200] * 20, path
+
+    client.portal.call(run)
+
+
+def test_budget_exceeded_raises(client):
+    async def run():
+        async with async_session() as session:
+            with query_budget(1, name="two_queries"):
+                await session.execute(select(Booking.id).limit(1))
+                await session.execute(select(Booking.id).limit(1))
+
+    with pytest.raises(QueryBudgetExceeded, match="two_queries: 2 SQL queries, budget 1"):
+        client.portal.call(run)